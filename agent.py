@@ -1,7 +1,14 @@
+import asyncio
 import logging
 from dotenv import load_dotenv
 import os
-from tools.room_context import set_current_room_name  # Use the module
+from tools.room_context import SessionContext, set_session_context, get_user_id_from_room, get_user_id_from_metadata
+from tools.supabase_client import get_supabase_client, write_queue
+from tools.google_api import load_services
+from tools.executor import run_blocking
+from tools.email_tools import email_outbox
+from tools.token_refresher import token_refresher
+from tools.google_calendar_tools import start_calendar_sync
 from livekit.agents import (
     Agent,
     AgentSession,
@@ -17,18 +24,30 @@ from tools import (
     get_weather, 
     search_web, 
     send_email, 
+    send_bulk_email,
+    resolve_contact,
     open_chrome_tab, 
     open_tabs_sequentially,
     add_calendar_event_google,
     view_calendar_events_google,
     update_calendar_event_google,
     delete_calendar_event_google,
-    list_all_events_google
+    list_all_events_google,
+    find_free_slots_google,
+    add_calendar_events_bulk_google,
+    update_calendar_events_bulk_google,
+    delete_calendar_events_bulk_google
 )
 
 logger = logging.getLogger("agent")
 load_dotenv()
 
+# How long an agent waits in a pre-created room for its user before leaving (seconds)
+POOLED_ROOM_WAIT = float(os.getenv("POOLED_ROOM_WAIT", "900"))
+
+# How long a session stays open after the user drops, so rejoining resumes it (seconds)
+RECONNECT_GRACE = float(os.getenv("RECONNECT_GRACE", "120"))
+
 class Assistant(Agent):
     def __init__(self) -> None:
         super().__init__(
@@ -37,24 +56,49 @@ class Assistant(Agent):
                 get_weather, 
                 search_web, 
                 send_email, 
+                send_bulk_email,
+                resolve_contact,
                 open_chrome_tab, 
                 open_tabs_sequentially,
                 add_calendar_event_google,
                 view_calendar_events_google,
                 update_calendar_event_google,
                 delete_calendar_event_google,
-                list_all_events_google
+                list_all_events_google,
+                find_free_slots_google,
+                add_calendar_events_bulk_google,
+                update_calendar_events_bulk_google,
+                delete_calendar_events_bulk_google
             ]
         )
 
 
 def prewarm(proc: JobProcess):
-    pass
+    """Load models and shared clients once per job process, before any room is assigned"""
+    proc.userdata["vad"] = silero.VAD.load()
+    proc.userdata["noise_cancellation"] = noise_cancellation.BVC()
+    
+    # Parse the Google Calendar/Gmail discovery documents and build the shared
+    # services up front so the first tool call doesn't pay for it; the tools
+    # reach them through tools.google_api
+    try:
+        load_services()
+    except Exception as e:
+        logger.warning(f"Could not preload Google API services: {e}")
+    
+    # Create the Supabase client shared by all tools in this process (tools.supabase_client)
+    try:
+        get_supabase_client()
+    except Exception as e:
+        logger.warning(f"Could not create Supabase client during prewarm: {e}")
+    
+    logger.info("Job process prewarmed")
 
 
 async def entrypoint(ctx: JobContext):
-    # Store room name globally so tools can access it
-    set_current_room_name(ctx.room.name)
+    # Per-session context shared by every tool call in this room
+    session_ctx = SessionContext(room_name=ctx.room.name)
+    set_session_context(session_ctx)
     
     ctx.log_context_fields = {
         "room": ctx.room.name,
@@ -74,10 +118,15 @@ async def entrypoint(ctx: JobContext):
     
     logger.info("Initializing Google Gemini Realtime session")
     
+    # Reuse the models loaded in prewarm(), falling back to loading them here
+    vad = ctx.proc.userdata.get("vad") or silero.VAD.load()
+    noise_filter = ctx.proc.userdata.get("noise_cancellation") or noise_cancellation.BVC()
+    
     # Use google.realtime.RealtimeModel (NOT google.beta.realtime)
     # The plugin automatically reads GOOGLE_API_KEY from environment
     session = AgentSession(
-        vad=silero.VAD.load(),
+        userdata=session_ctx,
+        vad=vad,
         llm=google.realtime.RealtimeModel(
             model="gemini-2.0-flash-exp",
             voice="Charon",
@@ -86,16 +135,96 @@ async def entrypoint(ctx: JobContext):
         ),
     )
 
+    session_ctx.agent_session = session
+    
+    # The outbox is shared by every session in this process: the first session starts it
+    # (sending whatever a previous worker left unsent) and the last one to end flushes it
+    await email_outbox.start()
+    ctx.add_shutdown_callback(email_outbox.aclose)
+    
+    # Refreshed tokens still queued for Supabase are written before the job exits
+    async def drain_writes():
+        await run_blocking(write_queue.close)
+    
+    ctx.add_shutdown_callback(drain_writes)
+    
     await ctx.connect()
+    
+    # Resolve the room's user once instead of on every tool call: the API server signs
+    # it into the room metadata, with the rooms table as a fallback
+    session_ctx.user_id = get_user_id_from_metadata(ctx.job.room.metadata, room_name=ctx.room.name)
+    metadata_seen = bool(ctx.job.room.metadata)
+    if not session_ctx.user_id:
+        # Rooms from the server's pool are created before they're assigned; the signed
+        # id arrives with the user's participant token
+        try:
+            participant = await asyncio.wait_for(ctx.wait_for_participant(), POOLED_ROOM_WAIT)
+        except asyncio.TimeoutError:
+            logger.info(f"Nobody joined room {ctx.room.name}, leaving")
+            ctx.shutdown(reason="no participant")
+            return
+        session_ctx.user_id = get_user_id_from_metadata(
+            participant.metadata, ctx.room.metadata, room_name=ctx.room.name
+        )
+        metadata_seen = metadata_seen or bool(participant.metadata or ctx.room.metadata)
+    if not session_ctx.user_id and not metadata_seen:
+        # Nothing was signed at all: accept only a rooms row written within the reconnect
+        # grace, so a leftover row can't hand this session someone else's account
+        session_ctx.user_id = await run_blocking(get_user_id_from_room, ctx.room.name, RECONNECT_GRACE)
+    elif not session_ctx.user_id:
+        logger.warning(f"Metadata for room {ctx.room.name} carries no valid user id; not falling back to the rooms table")
+    
+    # Keep the user's Google tokens fresh in the background for the whole session
+    token_refresher.track(session_ctx.user_id)
+    
+    async def stop_token_refresh():
+        token_refresher.untrack(session_ctx.user_id)
+    
+    ctx.add_shutdown_callback(stop_token_refresh)
+    
+    # Mirror the calendar while the session starts; tools use the API until it's ready
+    calendar_sync = asyncio.create_task(start_calendar_sync(session_ctx))
+    
+    async def stop_calendar_sync():
+        calendar_sync.cancel()
+    
+    ctx.add_shutdown_callback(stop_calendar_sync)
 
     await session.start(
         agent=Assistant(),
         room=ctx.room,
         room_input_options=RoomInputOptions(
             video_enabled=False,
-            noise_cancellation=noise_cancellation.BVC(),
+            noise_cancellation=noise_filter,
+            # A dropped connection shouldn't end the session; see below
+            close_on_disconnect=False,
         ),
     )
+    
+    # Keep the session (and its warm caches) while the user reconnects through
+    # /api/rejoin-room; leave only if nobody is back within RECONNECT_GRACE
+    leave_timer = None
+    
+    def on_participant_disconnected(participant):
+        nonlocal leave_timer
+        if ctx.room.remote_participants:
+            return
+        logger.info(f"User left room {ctx.room.name}, waiting {RECONNECT_GRACE:.0f}s for a reconnect")
+        if leave_timer is not None:
+            leave_timer.cancel()
+        leave_timer = asyncio.get_running_loop().call_later(
+            RECONNECT_GRACE, ctx.shutdown, "user did not reconnect"
+        )
+    
+    def on_participant_connected(participant):
+        nonlocal leave_timer
+        if leave_timer is not None:
+            logger.info(f"User rejoined room {ctx.room.name}")
+            leave_timer.cancel()
+            leave_timer = None
+    
+    ctx.room.on("participant_disconnected", on_participant_disconnected)
+    ctx.room.on("participant_connected", on_participant_connected)
 
     # Optional initial greeting but agent can responds when you talk first
     #await session.generate_reply(instructions=SESSION_INSTRUCTION)
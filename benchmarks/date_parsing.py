@@ -0,0 +1,152 @@
+# benchmarks/date_parsing.py
+"""Time the calendar date parser over the test corpus, cold and warm, against the old dateutil-based parser.
+
+Run from the repository root:
+
+    python -m benchmarks.date_parsing [rounds]
+"""
+import sys
+import time as _time
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+from dateutil import parser as dateutil_parser
+from tests.test_date_parsing import DATETIME_CORPUS, DURATION_CORPUS, REFERENCE_NOW
+from tools.date_parsing import (
+    _parse_duration_cached,
+    _parse_spec,
+    get_zone,
+    parse_datetime_string,
+    parse_duration_string,
+)
+
+_LEGACY_DAYS_OF_WEEK = {
+    'monday': 0, 'mon': 0,
+    'tuesday': 1, 'tue': 1, 'tues': 1,
+    'wednesday': 2, 'wed': 2,
+    'thursday': 3, 'thu': 3, 'thur': 3, 'thurs': 3,
+    'friday': 4, 'fri': 4,
+    'saturday': 5, 'sat': 5,
+    'sunday': 6, 'sun': 6
+}
+
+def legacy_parse_datetime_string(date_str: str, user_timezone: str = 'UTC') -> datetime:
+    """The parser the calendar tools used before tools.date_parsing, kept here as the baseline"""
+    try:
+        tz = ZoneInfo(user_timezone)
+    except Exception:
+        tz = ZoneInfo('UTC')
+    now = datetime.now(tz)
+    date_str_lower = date_str.lower().strip()
+    has_time = any(time_word in date_str_lower for time_word in ['am', 'pm', ':', 'at'])
+    
+    try:
+        if 'tomorrow' in date_str_lower:
+            tomorrow = now + timedelta(days=1)
+            if has_time:
+                parsed = dateutil_parser.parse(date_str_lower.replace('tomorrow', '').strip(), default=tomorrow)
+            else:
+                parsed = tomorrow.replace(hour=9, minute=0, second=0, microsecond=0)
+        elif 'today' in date_str_lower:
+            if has_time:
+                parsed = dateutil_parser.parse(date_str_lower.replace('today', '').strip(), default=now)
+            else:
+                parsed = now + timedelta(hours=1)
+        elif 'next week' in date_str_lower:
+            parsed = dateutil_parser.parse(date_str_lower, default=now + timedelta(days=7))
+        elif 'next' in date_str_lower:
+            target_day = None
+            for day_name, day_num in _LEGACY_DAYS_OF_WEEK.items():
+                if day_name in date_str_lower:
+                    target_day = day_num
+                    break
+            
+            if target_day is not None:
+                now_date_only = now.replace(hour=0, minute=0, second=0, microsecond=0)
+                days_ahead = target_day - now_date_only.weekday()
+                if days_ahead <= 0:
+                    days_ahead += 7
+                target_date = now_date_only + timedelta(days=days_ahead)
+                parsed = target_date.replace(hour=9, minute=0, second=0, microsecond=0)
+                if has_time:
+                    time_part = date_str_lower.replace('next', '').strip()
+                    for day_name in _LEGACY_DAYS_OF_WEEK:
+                        time_part = time_part.replace(day_name, '').strip()
+                    if time_part:
+                        try:
+                            parsed = dateutil_parser.parse(time_part, default=target_date)
+                        except Exception:
+                            pass
+            else:
+                parsed = dateutil_parser.parse(date_str, default=now + timedelta(days=7))
+        else:
+            parsed = dateutil_parser.parse(date_str, default=now)
+        
+        if parsed.tzinfo is None:
+            return parsed.replace(tzinfo=tz)
+        return parsed.astimezone(tz)
+    except Exception:
+        return now + timedelta(hours=1)
+
+def legacy_parse_duration_string(duration_str: str) -> timedelta:
+    """The duration parser the calendar tools used before tools.date_parsing"""
+    duration_str = duration_str.lower().strip()
+    if 'hour' in duration_str or 'hr' in duration_str:
+        return timedelta(hours=float(''.join(filter(str.isdigit, duration_str.split()[0]))))
+    elif 'minute' in duration_str or 'min' in duration_str:
+        return timedelta(minutes=float(''.join(filter(str.isdigit, duration_str.split()[0]))))
+    return timedelta(hours=1)
+
+def _time_per_parse(parse_datetime, parse_duration, rounds: int, before_round=None) -> float:
+    """Average seconds per parse over the corpus; parses that raise still count"""
+    texts = [text for text, _ in DATETIME_CORPUS]
+    durations = [text for text, _ in DURATION_CORPUS]
+    
+    start = _time.perf_counter()
+    for _ in range(rounds):
+        if before_round is not None:
+            before_round()
+        for text in texts:
+            try:
+                parse_datetime(text)
+            except Exception:
+                pass
+        for text in durations:
+            try:
+                parse_duration(text)
+            except Exception:
+                pass
+    return (_time.perf_counter() - start) / (rounds * (len(texts) + len(durations)))
+
+def _clear_caches():
+    _parse_spec.cache_clear()
+    _parse_duration_cached.cache_clear()
+    get_zone.cache_clear()
+
+def benchmark(rounds: int = 2000):
+    """Print per-parse times for the old parser and the new one, cold (caches cleared) and warm"""
+    cold_rounds = max(rounds // 10, 1)
+    legacy = _time_per_parse(
+        lambda text: legacy_parse_datetime_string(text, 'UTC'),
+        legacy_parse_duration_string,
+        cold_rounds
+    )
+    cold = _time_per_parse(
+        lambda text: parse_datetime_string(text, 'UTC', REFERENCE_NOW),
+        parse_duration_string,
+        cold_rounds,
+        before_round=_clear_caches
+    )
+    warm = _time_per_parse(
+        lambda text: parse_datetime_string(text, 'UTC', REFERENCE_NOW),
+        parse_duration_string,
+        rounds
+    )
+    
+    parses = len(DATETIME_CORPUS) + len(DURATION_CORPUS)
+    print(f"{parses} corpus entries")
+    print(f"dateutil (old): {legacy * 1e6:.1f} us/parse")
+    print(f"cold:           {cold * 1e6:.1f} us/parse ({legacy / cold:.1f}x)")
+    print(f"warm:           {warm * 1e6:.1f} us/parse ({legacy / warm:.1f}x)")
+
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -2,6 +2,9 @@ from pydantic_settings import BaseSettings
 from typing import List
 from functools import lru_cache
 
+# Placeholder SECRET_KEY; anything signed with it can be forged
+DEFAULT_SECRET_KEY = "your-secret-key-change-in-production"
+
 class Settings(BaseSettings):
     # Supabase
     SUPABASE_URL: str = ""
@@ -9,15 +12,32 @@ class Settings(BaseSettings):
     SUPABASE_SERVICE_ROLE_KEY: str = ""
     DATABASE_URL: str = ""
     SUPABASE_DB_PASSWORD: str = "" 
+    SUPABASE_JWT_SECRET: str = ""  # Project Settings → API → JWT Secret (HS256 projects)
+    SUPABASE_JWT_AUDIENCE: str = "authenticated"
+    AUTH_CACHE_SIZE: int = 10000
+    AUTH_CACHE_TTL: float = 300
     
     # FastAPI
-    SECRET_KEY: str = "your-secret-key-change-in-production"
+    SECRET_KEY: str = DEFAULT_SECRET_KEY
     FRONTEND_URL: str = "http://localhost:3000"
+    SERVER_IO_WORKERS: int = 16  # Threads for blocking Supabase/OAuth calls
+    HTTP_MAX_CONNECTIONS: int = 100  # Shared outbound HTTP client pool
+    HTTP_MAX_KEEPALIVE: int = 20
+    HTTP_TIMEOUT: float = 10
+    WRITE_BEHIND_INTERVAL: float = 1  # Seconds between flushes of deferred Supabase writes
+    WRITE_BEHIND_BATCH: int = 100  # Flush early once this many writes are waiting
     
     # LiveKit
     LIVEKIT_URL: str = ""
     LIVEKIT_API_KEY: str = ""
     LIVEKIT_API_SECRET: str = ""
+    LIVEKIT_MAX_CONNECTIONS: int = 20  # Keep-alive pool to the LiveKit server API
+    LIVEKIT_KEEPALIVE_TIMEOUT: float = 60
+    LIVEKIT_TIMEOUT: float = 10
+    ROOM_POOL_SIZE: int = 2  # Rooms created ahead of time for /api/create-room (0 disables)
+    ROOM_POOL_TTL: float = 600  # Unclaimed rooms are replaced after this many seconds
+    ROOM_POOL_REFILL_INTERVAL: float = 1  # Seconds between room creations when refilling
+    ROOM_REJOIN_WINDOW: float = 14400  # Seconds after its last token a room can be rejoined
     
     # Gmail
     GMAIL_USER: str = ""
@@ -29,6 +49,8 @@ class Settings(BaseSettings):
     GOOGLE_CLIENT_ID: str = ""  # Add missing field
     GOOGLE_CLIENT_SECRET: str = ""  # Add missing field
     OAUTH_REDIRECT_URI: str = ""
+    OAUTH_STATE_TTL: int = 600  # Seconds a user has to finish the Google consent screen
+    OAUTH_STATE_SECRET: str = ""  # Signs OAuth state; falls back to SECRET_KEY unless that's the default
     
     CORS_ORIGINS: List[str] = [
         "http://localhost:3000",  # Next.js dev server
@@ -50,6 +72,15 @@ class Settings(BaseSettings):
         if self.FRONTEND_URL and self.FRONTEND_URL not in self.CORS_ORIGINS:
             self.CORS_ORIGINS.append(self.FRONTEND_URL)
 
+    @property
+    def oauth_state_secret(self) -> str:
+        """Key for signing OAuth state, or "" if no real secret is configured"""
+        if self.OAUTH_STATE_SECRET:
+            return self.OAUTH_STATE_SECRET
+        if self.SECRET_KEY and self.SECRET_KEY != DEFAULT_SECRET_KEY:
+            return self.SECRET_KEY
+        return ""
+
 @lru_cache()
 def get_settings() -> Settings:
     """Get cached settings instance"""
@@ -15,9 +15,13 @@ CREATE TABLE IF NOT EXISTS rooms (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
     user_id UUID REFERENCES auth.users(id) ON DELETE CASCADE,
     room_name TEXT UNIQUE NOT NULL,
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- Pooled rooms are assigned by upsert; the agent only trusts recently written rows
+ALTER TABLE rooms ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW();
+
 -- Create index for faster lookups
 CREATE INDEX IF NOT EXISTS idx_rooms_user_id ON rooms(user_id);
 CREATE INDEX IF NOT EXISTS idx_rooms_room_name ON rooms(room_name);
@@ -32,6 +36,12 @@ BEGIN
 END;
 $$ language 'plpgsql';
 
+-- Trigger for rooms
+CREATE TRIGGER update_rooms_updated_at 
+    BEFORE UPDATE ON rooms 
+    FOR EACH ROW 
+    EXECUTE FUNCTION update_updated_at_column();
+
 -- Trigger for calendar_credentials
 CREATE TRIGGER update_calendar_credentials_updated_at 
     BEFORE UPDATE ON calendar_credentials 
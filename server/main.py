@@ -4,6 +4,9 @@ from starlette.middleware.sessions import SessionMiddleware
 from server.config import settings
 from server.routes import room, auth
 from server.services.supabase_service import SupabaseService
+from server.services.blocking import get_executor, shutdown_executor
+from server.services.livekit_service import start_livekit_service, close_livekit_service, get_livekit_service
+from server.services.room_pool import start_room_pool, close_room_pool
 from contextlib import asynccontextmanager
 import logging
 import os
@@ -21,13 +24,26 @@ logger = logging.getLogger(__name__)
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifespan context manager for startup and shutdown events"""
-    # Startup
+    # Startup: blocking Supabase/OAuth calls go to a bounded pool and
+    # outbound HTTP shares one connection pool, so the event loop stays free
+    get_executor()
+    SupabaseService.get_http_client()
+    await start_livekit_service()
+    try:
+        start_room_pool(get_livekit_service())
+    except Exception as e:
+        logger.warning(f"Room pool not started: {e}")
     yield
     # Shutdown
     try:
         logger.info("Shutting down application...")
+        await close_room_pool()
+        await close_livekit_service()
+        # Deferred writes go out before the client and executor they use are closed
+        await SupabaseService.drain_writes()
         # Close Supabase client
         await SupabaseService.close_client()
+        shutdown_executor()
         logger.info("Application shutdown complete")
     except Exception as e:
         logger.warning(f"Error during shutdown: {e}")
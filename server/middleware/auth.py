@@ -14,7 +14,7 @@ async def get_current_user(
     token = credentials.credentials
     
     # Supabase tokens are JWT, verify them
-    user_info = SupabaseService.verify_token(token)
+    user_info = await SupabaseService.verify_token(token)
     
     if not user_info.get("authenticated"):
         logger.warning(f"Token verification failed for token: {token[:20]}...")
@@ -6,6 +6,10 @@ from datetime import datetime
 class CreateRoomRequest(BaseModel):
     participant_name: str = "user"
 
+class RejoinRoomRequest(BaseModel):
+    room_name: str
+    participant_name: str = "user"
+
 class RoomResponse(BaseModel):
     room_name: str
     token: str
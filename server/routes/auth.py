@@ -3,15 +3,23 @@ from fastapi.responses import JSONResponse, RedirectResponse
 from google_auth_oauthlib.flow import Flow
 import os
 import logging
+from functools import lru_cache
 from typing import Dict, Any
 from server.config import settings
 from server.middleware.auth import get_current_user
 from server.services.supabase_service import SupabaseService
+from server.services.blocking import run_blocking
+from server.services.oauth_state import OAuthStateSigner
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
 
+# Signed OAuth state, verified in the callback without a database lookup
+oauth_states = OAuthStateSigner(settings.oauth_state_secret, ttl=settings.OAUTH_STATE_TTL)
+if not settings.oauth_state_secret:
+    logger.error("Google OAuth is disabled: set OAUTH_STATE_SECRET or a non-default SECRET_KEY")
+
 SCOPES = [
     'openid',
     'https://www.googleapis.com/auth/userinfo.email',
@@ -20,14 +28,16 @@ SCOPES = [
 ]
 
 
-def build_google_client_config(redirect_uri: str, state: str | None = None) -> Dict[str, Any]:
+@lru_cache(maxsize=None)
+def get_client_config(redirect_uri: str) -> Dict[str, Any]:
+    """Google OAuth client config for a redirect URI, built once per URI"""
     client_id = settings.GOOGLE_CLIENT_ID
     client_secret = settings.GOOGLE_CLIENT_SECRET
 
     if not client_id or not client_secret:
         raise HTTPException(status_code=500, detail="Google OAuth client env vars missing")
 
-    config = {
+    return {
         "web": {
             "client_id": client_id,
             "client_secret": client_secret,
@@ -37,13 +47,15 @@ def build_google_client_config(redirect_uri: str, state: str | None = None) -> D
         }
     }
 
-    flow = Flow.from_client_config(
-        config,
+
+def build_google_client_config(redirect_uri: str, state: str | None = None) -> Flow:
+    # Flow carries per-request state, so only the config is shared
+    return Flow.from_client_config(
+        get_client_config(redirect_uri),
         scopes=SCOPES,
         redirect_uri=redirect_uri,
         state=state,
     )
-    return flow
 
 
 @router.get("/google/calendar")
@@ -56,20 +68,15 @@ async def google_calendar_auth(
         os.environ['OAUTHLIB_INSECURE_TRANSPORT'] = '1'
         redirect_uri = "http://localhost:8000/api/auth/google/calendar/callback"
 
-        flow = build_google_client_config(redirect_uri)
-        authorization_url, state = flow.authorization_url(
+        state = oauth_states.create(current_user['user_id'], "calendar")
+        flow = build_google_client_config(redirect_uri, state=state)
+        authorization_url, _ = flow.authorization_url(
             access_type='offline',
             include_granted_scopes='true',
             prompt='consent'
         )
 
-        client = SupabaseService.get_client()
-        client.table("oauth_states").insert({
-            "state": state,
-            "user_id": current_user['user_id']
-        }).execute()
-
-        logger.info(f"Stored OAuth state {state} for user {current_user['user_id']}")
+        logger.info(f"Started OAuth flow for user {current_user['user_id']}")
 
         return JSONResponse({"authorization_url": authorization_url})
     except Exception as e:
@@ -94,29 +101,14 @@ async def google_calendar_callback(
             url=f"{settings.FRONTEND_URL}?calendar_auth=error&message=no_state"
         )
 
-    try:
-        client = SupabaseService.get_client()
-        state_response = client.table("oauth_states").select("*").eq("state", state).execute()
-
-        if not state_response.data:
-            logger.error(f"State {state} not found in database")
-            return RedirectResponse(
-                url=f"{settings.FRONTEND_URL}?calendar_auth=error&message=invalid_state"
-            )
-
-        state_data = state_response.data[0]
-        user_id = state_data['user_id']
-
-        client.table("oauth_states").delete().eq("state", state).execute()
-
-        logger.info(f"Verified OAuth state {state} for user {user_id}")
-
-    except Exception as e:
-        logger.error(f"Error verifying state: {e}")
+    user_id = oauth_states.verify(state, "calendar")
+    if not user_id:
         return RedirectResponse(
-            url=f"{settings.FRONTEND_URL}?calendar_auth=error&message=state_verification_failed"
+            url=f"{settings.FRONTEND_URL}?calendar_auth=error&message=invalid_state"
         )
 
+    logger.info(f"Verified OAuth state for user {user_id}")
+
     try:
         os.environ['OAUTHLIB_INSECURE_TRANSPORT'] = '1'
         redirect_uri = "http://localhost:8000/api/auth/google/calendar/callback"
@@ -124,7 +116,7 @@ async def google_calendar_callback(
         flow = build_google_client_config(redirect_uri, state=state)
 
         full_url = str(request.url)
-        flow.fetch_token(authorization_response=full_url)
+        await run_blocking(flow.fetch_token, authorization_response=full_url)
         credentials = flow.credentials
 
         credentials_json = credentials.to_json()
@@ -173,10 +165,7 @@ async def calendar_status(current_user: dict = Depends(get_current_user)):
 async def disconnect_calendar(current_user: dict = Depends(get_current_user)):
     """Disconnect calendar credentials"""
     try:
-        client = SupabaseService.get_client()
-        client.table("calendar_credentials").delete().eq(
-            "user_id", current_user['user_id']
-        ).execute()
+        await SupabaseService.delete_calendar_credentials(current_user['user_id'])
 
         return JSONResponse({"status": "disconnected"})
     except Exception as e:
@@ -193,30 +182,13 @@ GMAIL_SCOPES = [
 ]
 
 # Add helper function for Gmail OAuth (after build_google_client_config)
-def build_gmail_client_config(redirect_uri: str, state: str | None = None) -> Dict[str, Any]:
-    client_id = settings.GOOGLE_CLIENT_ID
-    client_secret = settings.GOOGLE_CLIENT_SECRET
-
-    if not client_id or not client_secret:
-        raise HTTPException(status_code=500, detail="Google OAuth client env vars missing")
-
-    config = {
-        "web": {
-            "client_id": client_id,
-            "client_secret": client_secret,
-            "redirect_uris": [redirect_uri],
-            "auth_uri": "https://accounts.google.com/o/oauth2/auth",
-            "token_uri": "https://oauth2.googleapis.com/token",
-        }
-    }
-
-    flow = Flow.from_client_config(
-        config,
+def build_gmail_client_config(redirect_uri: str, state: str | None = None) -> Flow:
+    return Flow.from_client_config(
+        get_client_config(redirect_uri),
         scopes=GMAIL_SCOPES,
         redirect_uri=redirect_uri,
         state=state,
     )
-    return flow
 
 # Add Gmail OAuth endpoints (after disconnect_calendar endpoint)
 @router.get("/google/gmail")
@@ -229,20 +201,15 @@ async def google_gmail_auth(
         os.environ['OAUTHLIB_INSECURE_TRANSPORT'] = '1'
         redirect_uri = "http://localhost:8000/api/auth/google/gmail/callback"
 
-        flow = build_gmail_client_config(redirect_uri)
-        authorization_url, state = flow.authorization_url(
+        state = oauth_states.create(current_user['user_id'], "gmail")
+        flow = build_gmail_client_config(redirect_uri, state=state)
+        authorization_url, _ = flow.authorization_url(
             access_type='offline',
             include_granted_scopes='true',
             prompt='consent'
         )
 
-        client = SupabaseService.get_client()
-        client.table("oauth_states").insert({
-            "state": state,
-            "user_id": current_user['user_id']
-        }).execute()
-
-        logger.info(f"Stored Gmail OAuth state {state} for user {current_user['user_id']}")
+        logger.info(f"Started Gmail OAuth flow for user {current_user['user_id']}")
 
         return JSONResponse({"authorization_url": authorization_url})
     except Exception as e:
@@ -267,29 +234,14 @@ async def google_gmail_callback(
             url=f"{settings.FRONTEND_URL}?gmail_auth=error&message=no_state"
         )
 
-    try:
-        client = SupabaseService.get_client()
-        state_response = client.table("oauth_states").select("*").eq("state", state).execute()
-
-        if not state_response.data:
-            logger.error(f"State {state} not found in database")
-            return RedirectResponse(
-                url=f"{settings.FRONTEND_URL}?gmail_auth=error&message=invalid_state"
-            )
-
-        state_data = state_response.data[0]
-        user_id = state_data['user_id']
-
-        client.table("oauth_states").delete().eq("state", state).execute()
-
-        logger.info(f"Verified Gmail OAuth state {state} for user {user_id}")
-
-    except Exception as e:
-        logger.error(f"Error verifying state: {e}")
+    user_id = oauth_states.verify(state, "gmail")
+    if not user_id:
         return RedirectResponse(
-            url=f"{settings.FRONTEND_URL}?gmail_auth=error&message=state_verification_failed"
+            url=f"{settings.FRONTEND_URL}?gmail_auth=error&message=invalid_state"
         )
 
+    logger.info(f"Verified Gmail OAuth state for user {user_id}")
+
     try:
         os.environ['OAUTHLIB_INSECURE_TRANSPORT'] = '1'
         redirect_uri = "http://localhost:8000/api/auth/google/gmail/callback"
@@ -297,7 +249,7 @@ async def google_gmail_callback(
         flow = build_gmail_client_config(redirect_uri, state=state)
 
         full_url = str(request.url)
-        flow.fetch_token(authorization_response=full_url)
+        await run_blocking(flow.fetch_token, authorization_response=full_url)
         credentials = flow.credentials
 
         credentials_json = credentials.to_json()
@@ -346,10 +298,7 @@ async def gmail_status(current_user: dict = Depends(get_current_user)):
 async def disconnect_gmail(current_user: dict = Depends(get_current_user)):
     """Disconnect Gmail credentials"""
     try:
-        client = SupabaseService.get_client()
-        client.table("email_credentials").delete().eq(
-            "user_id", current_user['user_id']
-        ).execute()
+        await SupabaseService.delete_email_credentials(current_user['user_id'])
 
         return JSONResponse({"status": "disconnected"})
     except Exception as e:
@@ -1,8 +1,13 @@
 from fastapi import APIRouter, HTTPException, Depends
-from server.models.schemas import CreateRoomRequest, RoomResponse
+from server.models.schemas import CreateRoomRequest, RejoinRoomRequest, RoomResponse
 from server.services.livekit_service import get_livekit_service
+from server.services.room_pool import get_room_pool
 from server.middleware.auth import get_current_user
 from server.services.supabase_service import SupabaseService
+from server.services.blocking import run_blocking
+from shared.room_identity import build_identity_metadata
+from server.services.room_registry import RoomRegistry
+from server.config import settings
 from datetime import datetime
 from server.models.schemas import HealthResponse
 import logging
@@ -11,6 +16,9 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api", tags=["room"])
 
+# Rooms issued by this process, so a reconnecting user can rejoin without a lookup
+room_registry = RoomRegistry(ttl=settings.ROOM_REJOIN_WINDOW)
+
 @router.get("/health", response_model=HealthResponse)
 async def health():
     """Health check endpoint - doesn't require authentication"""
@@ -26,17 +34,66 @@ async def create_room(
 ):
     """Create a LiveKit room and generate access token"""
     try:
+        # A pre-created room only needs a token; ownership is recorded in the background
+        room_pool = get_room_pool()
+        if room_pool is not None:
+            result = room_pool.claim(request.participant_name, current_user["user_id"])
+            if result is not None:
+                room_registry.record(result["room_name"], current_user["user_id"])
+                return RoomResponse(**result)
+        
         livekit_service = get_livekit_service()
-        result = await livekit_service.create_room(request.participant_name)
+        result = await livekit_service.create_room(
+            request.participant_name,
+            user_id=current_user["user_id"]
+        )
         
-        # Save room to Supabase linked to user
-        client = SupabaseService.get_client()
-        client.table("rooms").insert({
+        # Save room to Supabase linked to user (the agent's fallback when metadata is
+        # missing); nothing waits on it, so it's written in the background
+        SupabaseService.get_write_queue().upsert("rooms", {
             "user_id": current_user["user_id"],
             "room_name": result["room_name"]
-        }).execute()
+        }, on_conflict="room_name")
+        room_registry.record(result["room_name"], current_user["user_id"])
         
         return RoomResponse(**result)
     except Exception as e:
         logger.error(f"Error creating room: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/rejoin-room", response_model=RoomResponse)
+async def rejoin_room(
+    request: RejoinRoomRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """Issue a fresh token for the caller's existing room, so a reconnect resumes its agent session"""
+    user_id = current_user["user_id"]
+    owner = room_registry.owner(request.room_name)
+    
+    if owner is None:
+        # Issued by another worker or before a restart
+        try:
+            client = SupabaseService.get_client()
+            response = await run_blocking(
+                client.table("rooms").select("user_id").eq("room_name", request.room_name).execute
+            )
+        except Exception as e:
+            logger.error(f"Error looking up room {request.room_name}: {e}")
+            raise HTTPException(status_code=500, detail=str(e))
+        owner = response.data[0]["user_id"] if response.data else None
+    
+    if owner != user_id:
+        # Same answer for someone else's room and no room, so room names can't be probed
+        raise HTTPException(status_code=404, detail="Room not found")
+    
+    try:
+        # Minted locally: no LiveKit round trip. If the room has closed meanwhile,
+        # joining recreates it and a new agent is dispatched as for any new room
+        metadata = build_identity_metadata(request.room_name, user_id, settings.LIVEKIT_API_SECRET)
+        result = get_livekit_service().issue_token(request.room_name, request.participant_name, metadata)
+    except Exception as e:
+        logger.error(f"Error issuing token for room {request.room_name}: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    room_registry.record(request.room_name, user_id)
+    return RoomResponse(**result)
\ No newline at end of file
@@ -0,0 +1,33 @@
+"""Bounded executor for the server's blocking I/O (Supabase client, OAuth token exchange)"""
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from server.config import settings
+
+logger = logging.getLogger(__name__)
+
+_executor: ThreadPoolExecutor = None
+
+def get_executor() -> ThreadPoolExecutor:
+    """Get the executor, creating it on first use"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.SERVER_IO_WORKERS,
+            thread_name_prefix="server-io"
+        )
+    return _executor
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a blocking call off the event loop, so a slow upstream only holds one worker thread"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), functools.partial(func, *args, **kwargs))
+
+def shutdown_executor():
+    """Wait for in-flight calls and stop the executor"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+        logger.info("Server I/O executor shut down")
@@ -1,19 +1,32 @@
 import secrets
 import logging
 from server.config import settings
+from shared.room_identity import build_identity_metadata
 
 # Try to import LiveKit API with fallbacks
 try:
+    import aiohttp
     from livekit import api
     LIVEKIT_AVAILABLE = True
 except ImportError as e:
     logging.error(f"Failed to import livekit.api: {e}")
     LIVEKIT_AVAILABLE = False
+    aiohttp = None
     api = None
 
 logger = logging.getLogger(__name__)
 
+def new_room_name() -> str:
+    return f"room_{secrets.token_urlsafe(8)}"
+
 class LiveKitService:
+    """LiveKit room API client; one per server process (see start_livekit_service).
+    
+    The API shape is resolved once here rather than probed on every request,
+    and the server API is reached over a single keep-alive connection pool.
+    Must be constructed with an event loop running (the pool is aiohttp).
+    """
+    
     def __init__(self):
         if not LIVEKIT_AVAILABLE:
             raise ImportError("LiveKit API is not available. Check your installation.")
@@ -22,13 +35,22 @@ class LiveKitService:
         if not settings.LIVEKIT_URL or not settings.LIVEKIT_API_KEY or not settings.LIVEKIT_API_SECRET:
             raise ValueError("LiveKit credentials are missing. Check your .env file.")
         
+        self._session = None
         try:
             # Try different API patterns
             if hasattr(api, 'LiveKitAPI'):
+                self._session = aiohttp.ClientSession(
+                    connector=aiohttp.TCPConnector(
+                        limit=settings.LIVEKIT_MAX_CONNECTIONS,
+                        keepalive_timeout=settings.LIVEKIT_KEEPALIVE_TIMEOUT
+                    ),
+                    timeout=aiohttp.ClientTimeout(total=settings.LIVEKIT_TIMEOUT)
+                )
                 self.lk_api = api.LiveKitAPI(
                     url=settings.LIVEKIT_URL,
                     api_key=settings.LIVEKIT_API_KEY,
-                    api_secret=settings.LIVEKIT_API_SECRET
+                    api_secret=settings.LIVEKIT_API_SECRET,
+                    session=self._session
                 )
             elif hasattr(api, 'room_service'):
                 # Alternative pattern
@@ -44,72 +66,108 @@ class LiveKitService:
                     f"Could not find LiveKitAPI or room_service. "
                     f"Available in api: {available}"
                 )
+            
+            # Resolve the room service and token classes once
+            # Pattern: lk_api.room.create_room() or lk_api.create_room()
+            self._rooms = self.lk_api.room if hasattr(self.lk_api, 'room') else self.lk_api
+            self._create_room_request = getattr(api, 'CreateRoomRequest', None)
+            
+            if hasattr(api, 'AccessToken'):
+                self._access_token, self._video_grants = api.AccessToken, api.VideoGrants
+            else:
+                from livekit import AccessToken, VideoGrants
+                self._access_token, self._video_grants = AccessToken, VideoGrants
         except Exception as e:
             logger.error(f"Failed to initialize LiveKit API: {e}")
             raise
     
-    async def create_room(self, participant_name: str = "user"):
+    async def create_room(self, participant_name: str = "user", user_id: str = None):
         """Create a LiveKit room and generate access token"""
         try:
             # Generate unique room name
-            room_name = f"room_{secrets.token_urlsafe(8)}"
-            
-            # Create room - try different patterns
-            try:
-                if hasattr(self.lk_api, 'room'):
-                    # Pattern: lk_api.room.create_room()
-                    room = await self.lk_api.room.create_room(
-                        api.CreateRoomRequest(name=room_name)
-                    )
-                else:
-                    # Pattern: lk_api.create_room()
-                    room = await self.lk_api.create_room(
-                        api.CreateRoomRequest(name=room_name)
-                    )
-            except AttributeError:
-                # Try with dict
-                room = await self.lk_api.create_room({"name": room_name})
+            room_name = new_room_name()
             
-            # Generate access token - try different import paths
-            try:
-                if hasattr(api, 'AccessToken'):
-                    token = api.AccessToken(
-                        settings.LIVEKIT_API_KEY,
-                        settings.LIVEKIT_API_SECRET
-                    ).with_identity(participant_name) \
-                     .with_name(participant_name) \
-                     .with_grants(api.VideoGrants(
-                         room_join=True,
-                         room=room_name,
-                         can_publish=True,
-                         can_subscribe=True,
-                     )).to_jwt()
-                else:
-                    from livekit import AccessToken, VideoGrants
-                    token = AccessToken(
-                        settings.LIVEKIT_API_KEY,
-                        settings.LIVEKIT_API_SECRET
-                    ).with_identity(participant_name) \
-                     .with_name(participant_name) \
-                     .with_grants(VideoGrants(
-                         room_join=True,
-                         room=room_name,
-                         can_publish=True,
-                         can_subscribe=True,
-                     )).to_jwt()
-            except Exception as token_error:
-                logger.error(f"Failed to generate token: {token_error}")
-                raise Exception(f"Token generation failed: {token_error}")
+            # Signed user id in the room and participant metadata, so the agent
+            # knows whose room it joined without querying the rooms table
+            metadata = build_identity_metadata(
+                room_name, user_id, settings.LIVEKIT_API_SECRET
+            ) if user_id else ""
             
-            return {
-                "room_name": room_name,
-                "token": token,
-                "url": settings.LIVEKIT_URL
-            }
+            await self.provision_room(room_name, metadata)
+            return self.issue_token(room_name, participant_name, metadata)
         except Exception as e:
             logger.error(f"Failed to create room: {e}")
             raise Exception(f"Failed to create room: {str(e)}")
+    
+    async def provision_room(self, room_name: str, metadata: str = "", empty_timeout: int = 0):
+        """Create a room on the LiveKit server (empty_timeout 0 keeps the server default)"""
+        if self._create_room_request is not None:
+            return await self._rooms.create_room(self._create_room_request(
+                name=room_name, metadata=metadata, empty_timeout=empty_timeout
+            ))
+        return await self._rooms.create_room({"name": room_name, "metadata": metadata, "empty_timeout": empty_timeout})
+    
+    def issue_token(self, room_name: str, participant_name: str, metadata: str = "") -> dict:
+        """Mint a participant token for a room locally (no server round trip)"""
+        try:
+            token = self._access_token(
+                settings.LIVEKIT_API_KEY,
+                settings.LIVEKIT_API_SECRET
+            ).with_identity(participant_name) \
+             .with_name(participant_name) \
+             .with_metadata(metadata) \
+             .with_grants(self._video_grants(
+                 room_join=True,
+                 room=room_name,
+                 can_publish=True,
+                 can_subscribe=True,
+             )).to_jwt()
+        except Exception as token_error:
+            logger.error(f"Failed to generate token: {token_error}")
+            raise Exception(f"Token generation failed: {token_error}")
+        
+        return {
+            "room_name": room_name,
+            "token": token,
+            "url": settings.LIVEKIT_URL
+        }
+    
+    async def update_room_metadata(self, room_name: str, metadata: str):
+        await self._rooms.update_room_metadata(api.UpdateRoomMetadataRequest(room=room_name, metadata=metadata))
+    
+    async def delete_room(self, room_name: str):
+        await self._rooms.delete_room(api.DeleteRoomRequest(room=room_name))
+    
+    async def aclose(self):
+        """Close the API client and its connection pool"""
+        if hasattr(self.lk_api, 'aclose'):
+            await self.lk_api.aclose()
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+_service: LiveKitService = None
+
+async def start_livekit_service():
+    """Create the process-wide service (called from the app lifespan)"""
+    global _service
+    if _service is None:
+        try:
+            _service = LiveKitService()
+        except Exception as e:
+            # Room creation will report it; the rest of the API still works
+            logger.error(f"LiveKit service unavailable: {e}")
+
+def get_livekit_service() -> LiveKitService:
+    """Get the process-wide service, creating it if the lifespan didn't"""
+    global _service
+    if _service is None:
+        _service = LiveKitService()
+    return _service
 
-# Create instance on demand to avoid import-time initialization
-def get_livekit_service():
-    return LiveKitService()
\ No newline at end of file
+async def close_livekit_service():
+    global _service
+    if _service is not None:
+        await _service.aclose()
+        _service = None
+        logger.info("LiveKit service closed")
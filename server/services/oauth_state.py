@@ -0,0 +1,87 @@
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+def _sign(payload: str, secret: str) -> str:
+    return _b64encode(hmac.new(secret.encode("utf-8"), payload.encode("ascii"), hashlib.sha256).digest())
+
+class OAuthStateSigner:
+    """Stateless OAuth `state` tokens: signed user id, flow type, nonce and expiry.
+    
+    The callback verifies the token locally instead of looking it up in the
+    database; nonces already used are remembered until their token expires, so
+    a state can't be replayed on this server.
+    
+    Without a secret it fails closed: create() raises and verify() rejects
+    everything, since states signed with a known key could be forged.
+    """
+    
+    def __init__(self, secret: str, ttl: float = 600, max_used: int = 10000):
+        self.secret = secret
+        self.ttl = ttl
+        self.max_used = max_used
+        self._used = OrderedDict()  # nonce -> expiry, oldest first
+        self._lock = threading.Lock()
+    
+    def create(self, user_id: str, flow: str) -> str:
+        """State token for a user starting an OAuth flow ("calendar" or "gmail")"""
+        if not self.secret:
+            raise RuntimeError("OAuth state secret is not configured (set OAUTH_STATE_SECRET or SECRET_KEY)")
+        payload = _b64encode(json.dumps({
+            "u": user_id,
+            "f": flow,
+            "n": secrets.token_urlsafe(12),
+            "e": int(time.time() + self.ttl),
+        }, separators=(",", ":")).encode("utf-8"))
+        return f"{payload}.{_sign(payload, self.secret)}"
+    
+    def verify(self, state: str, flow: str) -> Optional[str]:
+        """User id from a state token, or None if forged, expired, for another flow or already used"""
+        if not self.secret:
+            logger.error("Rejecting OAuth state: no OAuth state secret is configured")
+            return None
+        
+        payload, _, signature = state.partition(".")
+        # Non-ASCII input can't be a state we signed (and would make the comparison raise)
+        if not signature or not state.isascii() or not hmac.compare_digest(signature, _sign(payload, self.secret)):
+            logger.warning("OAuth state has a bad signature")
+            return None
+        
+        try:
+            data = json.loads(_b64decode(payload))
+        except (TypeError, ValueError):
+            return None
+        
+        now = time.time()
+        if data.get("f") != flow or data.get("e", 0) <= now:
+            logger.warning(f"OAuth state is expired or not for the {flow} flow")
+            return None
+        
+        with self._lock:
+            # Forget nonces whose tokens have expired anyway
+            while self._used and next(iter(self._used.values())) <= now:
+                self._used.popitem(last=False)
+            
+            if data["n"] in self._used:
+                logger.warning(f"OAuth state for user {data.get('u')} was already used")
+                return None
+            self._used[data["n"]] = data["e"]
+            while len(self._used) > self.max_used:
+                self._used.popitem(last=False)
+        
+        return data.get("u")
@@ -0,0 +1,144 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Optional
+from server.config import settings
+from server.services.livekit_service import LiveKitService, new_room_name
+from shared.room_identity import build_identity_metadata
+from server.services.supabase_service import SupabaseService
+
+logger = logging.getLogger(__name__)
+
+class RoomPool:
+    """Rooms created ahead of time so /api/create-room only has to mint a token.
+    
+    A background task keeps `size` unclaimed rooms on the LiveKit server,
+    creating at most one every `refill_interval` seconds. Rooms unclaimed for
+    `ttl` seconds are deleted and replaced. Claiming a room is instant; its
+    owner is recorded (room metadata and the rooms table) in the background.
+    """
+    
+    def __init__(self, livekit: LiveKitService, size: int, ttl: float, refill_interval: float):
+        self.livekit = livekit
+        self.size = size
+        self.ttl = ttl
+        self.refill_interval = refill_interval
+        self._rooms = deque()  # (room_name, created_at), oldest first
+        self._wake = asyncio.Event()
+        self._task = None
+        self._background = set()
+    
+    def __len__(self) -> int:
+        return len(self._rooms)
+    
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._fill(), name="room-pool")
+    
+    def claim(self, participant_name: str, user_id: str) -> Optional[dict]:
+        """Room and token for a user from the pool, or None if it's empty"""
+        now = time.monotonic()
+        while self._rooms:
+            room_name, created_at = self._rooms.popleft()
+            if now - created_at < self.ttl:
+                break
+            self._spawn(self._delete(room_name))
+        else:
+            self._wake.set()
+            return None
+        self._wake.set()
+        
+        metadata = build_identity_metadata(room_name, user_id, settings.LIVEKIT_API_SECRET)
+        result = self.livekit.issue_token(room_name, participant_name, metadata)
+        self._spawn(self._record_owner(room_name, user_id, metadata))
+        logger.info(f"Assigned pooled room {room_name} to user {user_id} ({len(self)} left)")
+        return result
+    
+    async def _fill(self):
+        while True:
+            self._expire()
+            if len(self._rooms) < self.size:
+                room_name = new_room_name()
+                try:
+                    # Outlives its pool TTL a little, in case we never get to delete it
+                    await self.livekit.provision_room(room_name, empty_timeout=int(self.ttl) + 60)
+                    self._rooms.append((room_name, time.monotonic()))
+                except Exception as e:
+                    logger.warning(f"Could not pre-create room: {e}")
+                await asyncio.sleep(self.refill_interval)
+                continue
+            
+            # Full: wait for a claim, or for the oldest room to expire
+            self._wake.clear()
+            timeout = self.ttl - (time.monotonic() - self._rooms[0][1]) if self._rooms else None
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+    
+    def _expire(self):
+        now = time.monotonic()
+        while self._rooms and now - self._rooms[0][1] >= self.ttl:
+            room_name, _ = self._rooms.popleft()
+            self._spawn(self._delete(room_name))
+    
+    async def _record_owner(self, room_name: str, user_id: str, metadata: str):
+        try:
+            await self.livekit.update_room_metadata(room_name, metadata)
+        except Exception as e:
+            # The participant token carries the same signed metadata
+            logger.warning(f"Could not set metadata on room {room_name}: {e}")
+        
+        SupabaseService.get_write_queue().upsert("rooms", {
+            "user_id": user_id,
+            "room_name": room_name
+        }, on_conflict="room_name")
+    
+    async def _delete(self, room_name: str):
+        try:
+            await self.livekit.delete_room(room_name)
+        except Exception as e:
+            logger.warning(f"Could not delete pooled room {room_name}: {e}")
+    
+    def _spawn(self, coro):
+        task = asyncio.get_running_loop().create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+    
+    async def aclose(self):
+        """Stop refilling, finish recording owners and delete unclaimed rooms"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        
+        while self._rooms:
+            room_name, _ = self._rooms.popleft()
+            self._spawn(self._delete(room_name))
+        await asyncio.gather(*self._background, return_exceptions=True)
+
+_pool: RoomPool = None
+
+def start_room_pool(livekit: LiveKitService):
+    """Start filling the pool (called from the app lifespan; off when ROOM_POOL_SIZE is 0)"""
+    global _pool
+    if _pool is None and settings.ROOM_POOL_SIZE > 0:
+        _pool = RoomPool(
+            livekit,
+            size=settings.ROOM_POOL_SIZE,
+            ttl=settings.ROOM_POOL_TTL,
+            refill_interval=settings.ROOM_POOL_REFILL_INTERVAL
+        )
+        _pool.start()
+        logger.info(f"Room pool started (size {settings.ROOM_POOL_SIZE})")
+
+def get_room_pool() -> Optional[RoomPool]:
+    return _pool
+
+async def close_room_pool():
+    global _pool
+    if _pool is not None:
+        await _pool.aclose()
+        _pool = None
+        logger.info("Room pool closed")
@@ -0,0 +1,35 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+class RoomRegistry:
+    """Rooms this server handed out, with their owners, for token re-issue on reconnect.
+    
+    Entries expire `ttl` seconds after the room was last issued a token; a room
+    missing here (another worker, a restart) can still be checked against the
+    rooms table.
+    """
+    
+    def __init__(self, maxsize: int = 10000, ttl: float = 4 * 60 * 60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._rooms = OrderedDict()  # room_name -> (expires_at, user_id)
+        self._lock = threading.Lock()
+    
+    def record(self, room_name: str, user_id: str):
+        with self._lock:
+            self._rooms[room_name] = (time.monotonic() + self.ttl, user_id)
+            self._rooms.move_to_end(room_name)
+            while len(self._rooms) > self.maxsize:
+                self._rooms.popitem(last=False)
+    
+    def owner(self, room_name: str) -> Optional[str]:
+        with self._lock:
+            entry = self._rooms.get(room_name)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._rooms[room_name]
+                return None
+            return entry[1]
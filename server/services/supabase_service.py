@@ -1,13 +1,20 @@
 from supabase import create_client, Client
 from server.config import settings
 import logging
-from jose import jwt, JWTError
-import requests
+import httpx
+from server.services.blocking import run_blocking
+from server.services.token_verifier import TokenVerifier
+from shared.credential_store import CredentialStore
+from shared.write_behind import WriteBehindQueue
 
 logger = logging.getLogger(__name__)
 
 class SupabaseService:
     _instance: Client = None
+    _credential_store: CredentialStore = None
+    _token_verifier: TokenVerifier = None
+    _http_client: httpx.AsyncClient = None
+    _write_queue: WriteBehindQueue = None
     
     @classmethod
     def get_client(cls) -> Client:
@@ -35,83 +42,82 @@ class SupabaseService:
                 logger.info("Supabase client closed successfully")
             except Exception as e:
                 logger.warning(f"Error closing Supabase client: {e}")
+        
+        if cls._token_verifier is not None:
+            await cls._token_verifier.aclose()
+            cls._token_verifier = None
+        
+        if cls._http_client is not None:
+            await cls._http_client.aclose()
+            cls._http_client = None
+            logger.info("Shared HTTP client closed")
     
     @classmethod
-    def verify_token(cls, token: str) -> dict:
+    def get_http_client(cls) -> httpx.AsyncClient:
+        """Get the pooled HTTP client shared by the server's outbound calls"""
+        if cls._http_client is None:
+            cls._http_client = httpx.AsyncClient(
+                timeout=settings.HTTP_TIMEOUT,
+                limits=httpx.Limits(
+                    max_connections=settings.HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE
+                )
+            )
+        return cls._http_client
+    
+    @classmethod
+    def get_token_verifier(cls) -> TokenVerifier:
+        """Get the token verifier shared by all requests"""
+        if cls._token_verifier is None:
+            cls._token_verifier = TokenVerifier(
+                settings.SUPABASE_URL,
+                settings.SUPABASE_SERVICE_ROLE_KEY,
+                jwt_secret=settings.SUPABASE_JWT_SECRET,
+                audience=settings.SUPABASE_JWT_AUDIENCE,
+                cache_size=settings.AUTH_CACHE_SIZE,
+                cache_ttl=settings.AUTH_CACHE_TTL,
+                http=cls.get_http_client()
+            )
+        return cls._token_verifier
+    
+    @classmethod
+    async def verify_token(cls, token: str) -> dict:
         """Verify Supabase JWT token and return user info"""
         try:
-            # Method 1: Use Supabase Admin API to verify token
-            # This is the most reliable method
-            headers = {
-                "apikey": settings.SUPABASE_SERVICE_ROLE_KEY,
-                "Authorization": f"Bearer {token}"
-            }
-            
-            # Get user info from Supabase
-            response = requests.get(
-                f"{settings.SUPABASE_URL}/auth/v1/user",
-                headers=headers
-            )
-            
-            if response.status_code == 200:
-                user_data = response.json()
-                return {
-                    "user_id": user_data.get("id"),
-                    "email": user_data.get("email"),
-                    "authenticated": True
-                }
-            
-            # If 401, token is expired or invalid
-            if response.status_code == 401:
-                logger.warning("Token verification failed: 401 Unauthorized - token expired or invalid")
-                return {"authenticated": False}
-            
-            # If that fails, try decoding JWT directly
-            # Supabase JWT secret is in Project Settings → API → JWT Secret
-            # For now, we'll decode without verification (Supabase already verified it)
-            try:
-                # Decode without verification (token is already verified by Supabase)
-                payload = jwt.decode(
-                    token,
-                    options={"verify_signature": False}  # Skip signature verification
-                )
-                
-                # Check if token is expired
-                import time
-                exp = payload.get("exp")
-                if exp and exp < time.time():
-                    logger.warning("Token is expired according to JWT payload")
-                    return {"authenticated": False}
-                
-                # Extract user info from payload
-                user_id = payload.get("sub")
-                email = payload.get("email")
-                
-                if user_id:
-                    return {
-                        "user_id": user_id,
-                        "email": email,
-                        "authenticated": True
-                    }
-            except JWTError as e:
-                logger.error(f"JWT decode error: {e}")
-            
-            return {"authenticated": False}
-            
+            return await cls.get_token_verifier().verify(token)
         except Exception as e:
             logger.error(f"Token verification failed: {e}")
             return {"authenticated": False}
     
+    @classmethod
+    def get_write_queue(cls) -> WriteBehindQueue:
+        """Get the queue for writes no request waits on (drained on shutdown)"""
+        if cls._write_queue is None:
+            cls._write_queue = WriteBehindQueue(
+                cls.get_client,
+                flush_interval=settings.WRITE_BEHIND_INTERVAL,
+                flush_size=settings.WRITE_BEHIND_BATCH
+            )
+        return cls._write_queue
+    
+    @classmethod
+    async def drain_writes(cls):
+        """Write everything still queued (called from the app lifespan before closing the client)"""
+        if cls._write_queue is not None:
+            await run_blocking(cls._write_queue.close)
+    
+    @classmethod
+    def get_credential_store(cls) -> CredentialStore:
+        """Get the credential store shared by all routes"""
+        if cls._credential_store is None:
+            cls._credential_store = CredentialStore(cls.get_client, writes=cls.get_write_queue())
+        return cls._credential_store
+    
     @classmethod
     async def get_calendar_credentials(cls, user_id: str) -> dict:
         """Get user's calendar credentials from database"""
         try:
-            client = cls.get_client()
-            response = client.table("calendar_credentials").select("*").eq("user_id", user_id).execute()
-            
-            if response.data and len(response.data) > 0:
-                return response.data[0]
-            return None
+            return await run_blocking(cls.get_credential_store().get_record, user_id, "calendar")
         except Exception as e:
             logger.error(f"Error fetching calendar credentials: {e}")
             return None
@@ -120,38 +126,22 @@ class SupabaseService:
     async def save_calendar_credentials(cls, user_id: str, credentials_json: str):
         """Save or update user's calendar credentials"""
         try:
-            client = cls.get_client()
-            # Check if record exists
-            existing = client.table("calendar_credentials").select("*").eq("user_id", user_id).execute()
-            
-            if existing.data and len(existing.data) > 0:
-                # Update existing
-                client.table("calendar_credentials").update({
-                    "credentials_json": credentials_json,
-                    "updated_at": "now()"
-                }).eq("user_id", user_id).execute()
-            else:
-                # Insert new
-                client.table("calendar_credentials").insert({
-                    "user_id": user_id,
-                    "credentials_json": credentials_json
-                }).execute()
-            
+            await run_blocking(cls.get_credential_store().save, user_id, "calendar", credentials_json)
             return True
         except Exception as e:
             logger.error(f"Error saving calendar credentials: {e}")
             return False
     
+    @classmethod
+    async def delete_calendar_credentials(cls, user_id: str):
+        """Delete user's calendar credentials"""
+        await run_blocking(cls.get_credential_store().delete, user_id, "calendar")
+    
     @classmethod
     async def get_email_credentials(cls, user_id: str) -> dict:
         """Get user's email credentials from database"""
         try:
-            client = cls.get_client()
-            response = client.table("email_credentials").select("*").eq("user_id", user_id).execute()
-            
-            if response.data and len(response.data) > 0:
-                return response.data[0]
-            return None
+            return await run_blocking(cls.get_credential_store().get_record, user_id, "gmail")
         except Exception as e:
             logger.error(f"Error fetching email credentials: {e}")
             return None
@@ -160,24 +150,13 @@ class SupabaseService:
     async def save_email_credentials(cls, user_id: str, credentials_json: str):
         """Save or update user's email credentials"""
         try:
-            client = cls.get_client()
-            # Check if record exists
-            existing = client.table("email_credentials").select("*").eq("user_id", user_id).execute()
-            
-            if existing.data and len(existing.data) > 0:
-                # Update existing
-                client.table("email_credentials").update({
-                    "credentials_json": credentials_json,
-                    "updated_at": "now()"
-                }).eq("user_id", user_id).execute()
-            else:
-                # Insert new
-                client.table("email_credentials").insert({
-                    "user_id": user_id,
-                    "credentials_json": credentials_json
-                }).execute()
-            
+            await run_blocking(cls.get_credential_store().save, user_id, "gmail", credentials_json)
             return True
         except Exception as e:
             logger.error(f"Error saving email credentials: {e}")
-            return False
\ No newline at end of file
+            return False
+    
+    @classmethod
+    async def delete_email_credentials(cls, user_id: str):
+        """Delete user's email credentials"""
+        await run_blocking(cls.get_credential_store().delete, user_id, "gmail")
@@ -0,0 +1,176 @@
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from typing import Optional
+import httpx
+from jose import jwt, JWTError
+
+logger = logging.getLogger(__name__)
+
+# Algorithms accepted for keys from the project's JWKS
+ASYMMETRIC_ALGORITHMS = ("ES256", "RS256")
+
+# Algorithm for JWKS keys that don't state one
+KEY_TYPE_ALGORITHMS = {"EC": "ES256", "RSA": "RS256"}
+
+class TokenVerifier:
+    """Verifies Supabase access tokens locally, with a cache of verified tokens.
+    
+    HS256 tokens are checked against the project's JWT secret; asymmetric
+    tokens against the project's JWKS, which is cached and re-fetched when a
+    token names an unknown key (key rotation). Only when neither is available
+    does it ask Supabase's /auth/v1/user endpoint.
+    
+    Verified tokens are cached by SHA-256 of the token, never past their exp.
+    """
+    
+    def __init__(
+        self,
+        supabase_url: str,
+        api_key: str,
+        jwt_secret: str = "",
+        audience: str = "authenticated",
+        cache_size: int = 10000,
+        cache_ttl: float = 300,
+        jwks_ttl: float = 3600,
+        jwks_min_refresh_interval: float = 60,
+        http: Optional[httpx.AsyncClient] = None
+    ):
+        self.supabase_url = supabase_url.rstrip("/")
+        self.api_key = api_key
+        self.jwt_secret = jwt_secret
+        self.audience = audience
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self.jwks_ttl = jwks_ttl
+        self.jwks_min_refresh_interval = jwks_min_refresh_interval
+        self._verified = OrderedDict()  # sha256(token) -> (expires_at, user_info)
+        self._jwks = {}  # kid -> JWK
+        self._jwks_fetched_at = 0.0
+        self._jwks_lock = asyncio.Lock()
+        self._http = http
+        self._owns_http = http is None
+    
+    async def verify(self, token: str) -> dict:
+        """User info for a token: {"user_id", "email", "authenticated": True}, or {"authenticated": False}"""
+        key = hashlib.sha256(token.encode("utf-8")).hexdigest()
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+        
+        try:
+            claims = await self._verify_locally(token)
+        except JWTError as e:
+            logger.warning(f"Token verification failed: {e}")
+            return {"authenticated": False}
+        
+        if claims is None:
+            # No secret or signing key available to check it ourselves
+            return await self._verify_remotely(token, key)
+        
+        user_info = {
+            "user_id": claims.get("sub"),
+            "email": claims.get("email"),
+            "authenticated": bool(claims.get("sub")),
+        }
+        if user_info["authenticated"]:
+            self._cache(key, user_info, claims.get("exp"))
+        return user_info
+    
+    async def _verify_locally(self, token: str) -> Optional[dict]:
+        """Claims of a validly signed, unexpired token; None if we can't check its signature"""
+        header = jwt.get_unverified_header(token)
+        algorithm = header.get("alg")
+        
+        if algorithm == "HS256":
+            if not self.jwt_secret:
+                return None
+            return jwt.decode(token, self.jwt_secret, algorithms=["HS256"], audience=self.audience)
+        
+        signing_key = await self._signing_key(header.get("kid"))
+        if signing_key is None:
+            return None
+        # The algorithm comes from our key, never from the token's own header
+        key_algorithm = signing_key.get("alg") or KEY_TYPE_ALGORITHMS.get(signing_key.get("kty"))
+        if key_algorithm not in ASYMMETRIC_ALGORITHMS:
+            raise JWTError(f"Signing key {header.get('kid')} has unsupported algorithm {key_algorithm}")
+        return jwt.decode(token, signing_key, algorithms=[key_algorithm], audience=self.audience)
+    
+    async def _signing_key(self, kid: Optional[str]) -> Optional[dict]:
+        """JWK for a key id, re-fetching the JWKS when it's stale or the key is new"""
+        stale = time.monotonic() - self._jwks_fetched_at > self.jwks_ttl
+        if kid in self._jwks and not stale:
+            return self._jwks[kid]
+        
+        async with self._jwks_lock:
+            since_fetch = time.monotonic() - self._jwks_fetched_at
+            # Unknown kids can't make us hammer the JWKS endpoint
+            if since_fetch > self.jwks_min_refresh_interval and (stale or kid not in self._jwks):
+                await self._fetch_jwks()
+        return self._jwks.get(kid)
+    
+    async def _fetch_jwks(self):
+        self._jwks_fetched_at = time.monotonic()
+        try:
+            response = await self._client().get(f"{self.supabase_url}/auth/v1/.well-known/jwks.json")
+            response.raise_for_status()
+            self._jwks = {key["kid"]: key for key in response.json().get("keys", []) if key.get("kid")}
+            logger.info(f"Loaded {len(self._jwks)} Supabase signing key(s)")
+        except Exception as e:
+            logger.warning(f"Could not fetch Supabase JWKS: {e}")
+    
+    async def _verify_remotely(self, token: str, key: str) -> dict:
+        """Ask Supabase to validate the token (only when it can't be checked locally)"""
+        try:
+            response = await self._client().get(
+                f"{self.supabase_url}/auth/v1/user",
+                headers={"apikey": self.api_key, "Authorization": f"Bearer {token}"}
+            )
+        except httpx.HTTPError as e:
+            logger.error(f"Token verification request failed: {e}")
+            return {"authenticated": False}
+        
+        if response.status_code != 200:
+            logger.warning(f"Token verification failed: {response.status_code} from Supabase")
+            return {"authenticated": False}
+        
+        user_data = response.json()
+        user_info = {
+            "user_id": user_data.get("id"),
+            "email": user_data.get("email"),
+            "authenticated": True,
+        }
+        self._cache(key, user_info, jwt.get_unverified_claims(token).get("exp"))
+        return user_info
+    
+    def _cached(self, key: str) -> Optional[dict]:
+        entry = self._verified.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.time():
+            del self._verified[key]
+            return None
+        self._verified.move_to_end(key)
+        return entry[1]
+    
+    def _cache(self, key: str, user_info: dict, exp: Optional[float]):
+        expires_at = time.time() + self.cache_ttl
+        if exp:
+            expires_at = min(expires_at, float(exp))
+        self._verified[key] = (expires_at, user_info)
+        self._verified.move_to_end(key)
+        while len(self._verified) > self.cache_size:
+            self._verified.popitem(last=False)
+    
+    def _client(self) -> httpx.AsyncClient:
+        if self._http is None:
+            self._http = httpx.AsyncClient(timeout=10)
+        return self._http
+    
+    async def aclose(self):
+        """Close the HTTP client if the verifier created it"""
+        if self._owns_http and self._http is not None:
+            await self._http.aclose()
+        self._http = None
@@ -0,0 +1,209 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Iterator, Optional, Sequence
+from google.auth.exceptions import RefreshError
+from google.auth.transport.requests import Request
+from google.oauth2.credentials import Credentials
+
+logger = logging.getLogger(__name__)
+
+# Supabase table holding each kind of Google credentials
+CREDENTIAL_TABLES = {
+    "calendar": "calendar_credentials",
+    "gmail": "email_credentials",
+}
+
+class CredentialStore:
+    """Cache of users' decoded Google credentials with single-flight refresh.
+    
+    Shared by the API server and the agent tools. Credentials are cached per
+    (user, kind, scopes), so only the first lookup reads Supabase; an expired
+    token is refreshed under a per-user lock, so concurrent callers wait for
+    one refresh and the refreshed token is written back once.
+    
+    Calls are blocking (Supabase client and token endpoint). With a
+    write-behind queue, refreshed tokens are saved in the background.
+    
+    Other processes (the API server handling a re-auth or disconnect) change
+    the rows behind our back, so a cached entry older than
+    `revalidate_interval` seconds is checked against the row's updated_at
+    before it's used again, and dropped if the row changed or is gone.
+    """
+    
+    def __init__(
+        self,
+        get_client: Callable[[], Any],
+        maxsize: int = 1024,
+        ttl: float = 1800,
+        writes=None,
+        revalidate_interval: float = 30
+    ):
+        self._get_client = get_client
+        self._writes = writes  # WriteBehindQueue for refreshed tokens, or None to write inline
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.revalidate_interval = revalidate_interval
+        # (user_id, kind, scopes) -> [expires_at, Credentials, row updated_at, last checked]
+        self._entries = OrderedDict()
+        self._entries_lock = threading.Lock()
+        self._user_locks = {}  # (user_id, kind) -> [Lock serializing loads and refreshes, holders]
+        self._user_locks_lock = threading.Lock()
+    
+    def get(self, user_id: str, kind: str, scopes: Sequence[str]) -> Optional[Credentials]:
+        """Get valid credentials for a user, loading or refreshing them if needed"""
+        key = (user_id, kind, tuple(scopes))
+        entry = self._cached(key)
+        if entry is not None and entry[1].valid and not self._needs_check(entry):
+            return entry[1]
+        
+        with self._user_lock(user_id, kind):
+            # Another caller may have loaded, refreshed or checked them while we waited
+            entry = self._cached(key)
+            if entry is not None and self._needs_check(entry):
+                if self._stored_version(user_id, kind) != entry[2]:
+                    logger.info(f"{kind} credentials for user {user_id} changed elsewhere, reloading")
+                    self.invalidate(user_id, kind)
+                    entry = None
+                else:
+                    entry[3] = time.monotonic()
+            
+            if entry is None:
+                record = self.get_record(user_id, kind)
+                if record is None:
+                    logger.warning(f"No {kind} credentials found for user {user_id}")
+                    return None
+                creds = Credentials.from_authorized_user_info(json.loads(record["credentials_json"]), scopes)
+                updated_at = record.get("updated_at")
+            else:
+                creds, updated_at = entry[1], entry[2]
+            
+            if not creds.valid:
+                self._refresh(user_id, kind, creds)
+            
+            self._cache(key, creds, updated_at)
+            return creds
+    
+    def refresh_if_expiring(self, user_id: str, kind: str, scopes: Sequence[str], margin: float) -> Optional[datetime]:
+        """Refresh a user's credentials ahead of time if they expire within margin seconds.
+        
+        Returns the (naive UTC) expiry of the access token, or None if the user has no
+        credentials of this kind.
+        """
+        creds = self.get(user_id, kind, scopes)
+        if creds is None or creds.expiry is None:
+            return None
+        
+        with self._user_lock(user_id, kind):
+            # google-auth keeps expiry as naive UTC
+            now = datetime.now(timezone.utc).replace(tzinfo=None)
+            if creds.expiry - now < timedelta(seconds=margin):
+                self._refresh(user_id, kind, creds)
+        return creds.expiry
+    
+    def get_record(self, user_id: str, kind: str) -> Optional[dict]:
+        """Read a user's stored credentials row straight from Supabase"""
+        response = self._get_client().table(CREDENTIAL_TABLES[kind]).select("*").eq("user_id", user_id).execute()
+        return response.data[0] if response.data else None
+    
+    def save(self, user_id: str, kind: str, credentials_json: str):
+        """Store a user's credentials (e.g. after OAuth) and drop any cached copy"""
+        table = self._get_client().table(CREDENTIAL_TABLES[kind])
+        with self._user_lock(user_id, kind):
+            # A refresh still waiting to be written must not overwrite the new credentials
+            if self._writes is not None:
+                self._writes.discard(CREDENTIAL_TABLES[kind], user_id=user_id)
+            table.upsert({
+                "user_id": user_id,
+                "credentials_json": credentials_json,
+                "updated_at": "now()"
+            }, on_conflict="user_id").execute()
+            self.invalidate(user_id, kind)
+    
+    def delete(self, user_id: str, kind: str):
+        """Remove a user's credentials (e.g. on disconnect)"""
+        with self._user_lock(user_id, kind):
+            if self._writes is not None:
+                self._writes.discard(CREDENTIAL_TABLES[kind], user_id=user_id)
+            self._get_client().table(CREDENTIAL_TABLES[kind]).delete().eq("user_id", user_id).execute()
+            self.invalidate(user_id, kind)
+    
+    def invalidate(self, user_id: str, kind: Optional[str] = None):
+        """Forget cached credentials for a user (one kind, or all)"""
+        with self._entries_lock:
+            for key in [k for k in self._entries if k[0] == user_id and (kind is None or k[1] == kind)]:
+                del self._entries[key]
+    
+    def _needs_check(self, entry: list) -> bool:
+        return time.monotonic() - entry[3] >= self.revalidate_interval
+    
+    def _stored_version(self, user_id: str, kind: str) -> Any:
+        """The row's updated_at, or _MISSING if the user has no credentials of this kind"""
+        response = self._get_client().table(CREDENTIAL_TABLES[kind]).select("updated_at").eq("user_id", user_id).execute()
+        return response.data[0].get("updated_at") if response.data else _MISSING
+    
+    def _refresh(self, user_id: str, kind: str, creds: Credentials):
+        if not creds.refresh_token:
+            raise RefreshError(f"{kind} credentials for user {user_id} expired and have no refresh token")
+        
+        creds.refresh(Request())
+        logger.info(f"Refreshed {kind} credentials for user {user_id}")
+        
+        # Written back once per refresh, not once per waiting caller
+        values = {
+            "credentials_json": creds.to_json(),
+            "updated_at": "now()"
+        }
+        if self._writes is not None:
+            # The cache already holds the new token; the row only has to catch up
+            self._writes.update(CREDENTIAL_TABLES[kind], values, user_id=user_id)
+        else:
+            self._get_client().table(CREDENTIAL_TABLES[kind]).update(values).eq("user_id", user_id).execute()
+    
+    def _cached(self, key) -> Optional[list]:
+        with self._entries_lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+    
+    def _cache(self, key, creds: Credentials, updated_at: Any):
+        with self._entries_lock:
+            now = time.monotonic()
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] is creds:
+                # Same credentials, just refreshed: keep their expiry and when the row was last checked
+                entry[2] = updated_at
+            else:
+                self._entries[key] = [now + self.ttl, creds, updated_at, now]
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+    
+    @contextmanager
+    def _user_lock(self, user_id: str, kind: str) -> Iterator[None]:
+        """Hold the (user, kind) lock; it's dropped once nobody holds or waits for it"""
+        key = (user_id, kind)
+        with self._user_locks_lock:
+            entry = self._user_locks.get(key)
+            if entry is None:
+                entry = self._user_locks[key] = [threading.Lock(), 0]
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._user_locks_lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._user_locks[key]
+
+_MISSING = object()
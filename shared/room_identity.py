@@ -0,0 +1,41 @@
+import hashlib
+import hmac
+import json
+import logging
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+def sign_user_id(room_name: str, user_id: str, secret: str) -> str:
+    """Signature binding a user to a room, keyed with the LiveKit API secret"""
+    message = f"{room_name}:{user_id}".encode("utf-8")
+    return hmac.new(secret.encode("utf-8"), message, hashlib.sha256).hexdigest()
+
+def build_identity_metadata(room_name: str, user_id: str, secret: str) -> str:
+    """Room/participant metadata carrying the signed user id"""
+    return json.dumps({
+        "user_id": user_id,
+        "user_sig": sign_user_id(room_name, user_id, secret),
+    })
+
+def read_identity_metadata(metadata: Optional[str], room_name: str, secret: str) -> Optional[str]:
+    """User id from room/participant metadata, or None if absent or not signed by us"""
+    if not metadata or not secret:
+        return None
+
+    try:
+        data = json.loads(metadata)
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(data, dict):
+        return None
+
+    user_id = data.get("user_id")
+    signature = data.get("user_sig")
+    if not user_id or not signature:
+        return None
+
+    if not hmac.compare_digest(signature, sign_user_id(room_name, user_id, secret)):
+        logger.warning(f"Ignoring user id with a bad signature in metadata for room {room_name}")
+        return None
+    return user_id
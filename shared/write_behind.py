@@ -0,0 +1,141 @@
+import logging
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+class WriteBehindQueue:
+    """Supabase writes nothing waits on, applied in batches by a background thread.
+    
+    Writes are coalesced by key (table and row identity), so only the latest
+    value for a row is written. Pending writes are flushed every
+    `flush_interval` seconds, or as soon as `flush_size` are waiting; close()
+    drains them on shutdown. Shared by the API server and the agent worker.
+    """
+    
+    def __init__(
+        self,
+        get_client: Callable[[], Any],
+        flush_interval: float = 1.0,
+        flush_size: int = 100,
+        max_attempts: int = 3
+    ):
+        self._get_client = get_client
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.max_attempts = max_attempts
+        self._pending = OrderedDict()  # key -> write
+        self._cond = threading.Condition()
+        self._thread = None
+        self._closed = False
+    
+    def __len__(self) -> int:
+        return len(self._pending)
+    
+    def upsert(self, table: str, row: Dict[str, Any], on_conflict: str):
+        """Insert or replace a row (identified by its on_conflict column)"""
+        key = (table, on_conflict, row[on_conflict])
+        self._put(key, {"op": "upsert", "table": table, "row": row, "on_conflict": on_conflict})
+    
+    def update(self, table: str, values: Dict[str, Any], **match):
+        """Update existing rows matching column=value filters (no-op if none match)"""
+        key = (table, *sorted(match.items()))
+        self._put(key, {"op": "update", "table": table, "values": values, "match": match})
+    
+    def discard(self, table: str, **match):
+        """Drop a pending update, e.g. because the row was just written synchronously"""
+        with self._cond:
+            self._pending.pop((table, *sorted(match.items())), None)
+    
+    def _put(self, key, write: dict):
+        write["attempts"] = 0
+        with self._cond:
+            self._pending.pop(key, None)
+            self._pending[key] = write
+            self._ensure_thread()
+            if len(self._pending) >= self.flush_size:
+                self._cond.notify()
+    
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+            self._thread.start()
+    
+    def _run(self):
+        while True:
+            with self._cond:
+                deadline = time.monotonic() + self.flush_interval
+                while not self._closed and len(self._pending) < self.flush_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                if self._closed:
+                    return
+            self.flush()
+    
+    def flush(self):
+        """Write everything pending now (blocking)"""
+        with self._cond:
+            pending, self._pending = self._pending, OrderedDict()
+        if pending:
+            self._apply_all(pending)
+    
+    def _apply_all(self, pending: Dict[Any, dict]):
+        # Upserts to the same table go out as one request per table
+        upserts = defaultdict(list)
+        for key, write in pending.items():
+            if write["op"] == "upsert":
+                upserts[(write["table"], write["on_conflict"])].append((key, write))
+        
+        for (table, on_conflict), writes in upserts.items():
+            try:
+                self._get_client().table(table).upsert(
+                    [write["row"] for _, write in writes], on_conflict=on_conflict
+                ).execute()
+            except Exception as e:
+                self._failed(writes, e)
+        
+        for key, write in pending.items():
+            if write["op"] != "update":
+                continue
+            try:
+                query = self._get_client().table(write["table"]).update(write["values"])
+                for column, value in write["match"].items():
+                    query = query.eq(column, value)
+                query.execute()
+            except Exception as e:
+                self._failed([(key, write)], e)
+        
+        logger.debug(f"Flushed {len(pending)} deferred write(s)")
+    
+    def _failed(self, writes, error: Exception):
+        for key, write in writes:
+            write["attempts"] += 1
+            if write["attempts"] >= self.max_attempts:
+                logger.error(f"Dropping deferred {write['op']} to {write['table']} after {write['attempts']} attempt(s): {error}")
+                continue
+            with self._cond:
+                # A newer write for the same row wins over the retry
+                self._pending.setdefault(key, write)
+            logger.warning(f"Deferred {write['op']} to {write['table']} failed, will retry: {error}")
+    
+    def close(self, timeout: Optional[float] = 10):
+        """Stop the flush thread and write whatever is still pending (blocking).
+        
+        Later writes start a new thread, so a reused worker process keeps working.
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout)
+        self.flush()
+        with self._cond:
+            self._closed = False
+            if self._pending:
+                self._ensure_thread()
+        logger.info("Deferred writes drained")
@@ -0,0 +1,81 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from tools.cache import TTLCache
+
+def test_get_and_set():
+    cache = TTLCache()
+    cache.set('a', 1)
+    assert cache.get('a') == 1
+    assert cache.get('missing', 'default') == 'default'
+
+def test_entries_expire():
+    cache = TTLCache(ttl=60)
+    cache.set('a', 1, ttl=-1)
+    assert cache.get('a') is None
+    assert len(cache) == 0
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(maxsize=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    assert cache.get('a') == 1
+    assert cache.get('b') is None
+    assert cache.get('c') == 3
+
+def test_concurrent_misses_share_one_factory_call():
+    cache = TTLCache()
+    calls = []
+    
+    def factory():
+        calls.append(threading.current_thread().name)
+        time.sleep(0.05)
+        return object()
+    
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: cache.get_or_create('key', factory), range(8)))
+    
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+
+def test_factory_errors_reach_every_waiter_and_are_not_cached():
+    cache = TTLCache()
+    started = threading.Event()
+    release = threading.Event()
+    
+    def failing():
+        started.set()
+        release.wait(5)
+        raise ValueError("lookup failed")
+    
+    errors = []
+    
+    def call():
+        try:
+            cache.get_or_create('key', failing)
+        except ValueError as e:
+            errors.append(e)
+    
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=call)
+    follower.start()
+    time.sleep(0.05)
+    release.set()
+    leader.join()
+    follower.join()
+    
+    assert len(errors) == 2
+    assert cache.get_or_create('key', lambda: 'recovered') == 'recovered'
+
+def test_invalidate_and_clear():
+    cache = TTLCache()
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.invalidate('a')
+    assert cache.get('a') is None
+    cache.clear()
+    assert len(cache) == 0
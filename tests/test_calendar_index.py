@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+from tools.calendar_index import EventIndex, free_slots, merge_intervals
+
+UTC = ZoneInfo('UTC')
+DAY = datetime(2024, 1, 10, tzinfo=UTC)
+
+def at(hour, minute=0, days=0):
+    return DAY + timedelta(days=days, hours=hour, minutes=minute)
+
+def make_index(**events):
+    index = EventIndex()
+    for event_id, (start, end) in events.items():
+        index.add(event_id, start, end)
+    return index
+
+def test_overlapping_is_ordered_by_start():
+    index = make_index(late=(at(15), at(16)), early=(at(9), at(10)), middle=(at(11), at(12)))
+    assert index.overlapping(at(0), at(23)) == ['early', 'middle', 'late']
+
+def test_range_boundaries_are_half_open():
+    index = make_index(morning=(at(9), at(10)))
+    assert index.overlapping(at(10), at(11)) == []
+    assert index.overlapping(at(8), at(9)) == []
+    assert index.overlapping(at(9, 59), at(11)) == ['morning']
+
+def test_event_starting_before_the_range_is_found():
+    index = make_index(overnight=(at(22), at(6, days=1)))
+    assert index.overlapping(at(0, days=1), at(1, days=1)) == ['overnight']
+
+def test_long_events_are_merged_in_start_order():
+    index = make_index(
+        conference=(at(0, days=-3), at(0, days=3)),
+        standup=(at(9), at(9, 15)),
+        early=(at(1, days=-5), at(2, days=-5)),
+    )
+    assert len(index) == 3
+    assert index.overlapping(at(0), at(23)) == ['conference', 'standup']
+    assert index.overlapping(at(0, days=-6)) == ['early', 'conference', 'standup']
+
+def test_re_adding_replaces_the_span():
+    index = make_index(meeting=(at(9), at(10)))
+    index.add('meeting', at(14), at(15))
+    assert index.overlapping(at(9), at(10)) == []
+    assert index.overlapping(at(14), at(15)) == ['meeting']
+    assert len(index) == 1
+
+def test_remove():
+    index = make_index(short=(at(9), at(10)), long=(at(0), at(0, days=2)))
+    index.remove('short')
+    index.remove('long')
+    index.remove('missing')
+    assert len(index) == 0
+    assert index.overlapping(at(0)) == []
+
+def test_conflicts_exclude_the_event_being_moved():
+    index = make_index(a=(at(9), at(10)), b=(at(9, 30), at(11)))
+    assert index.conflicts(at(9), at(10)) == ['a', 'b']
+    assert index.conflicts(at(9), at(10), exclude_id='a') == ['b']
+
+def test_next_free_slot():
+    index = make_index(a=(at(9), at(10)), b=(at(10), at(11)), c=(at(11, 30), at(12)))
+    assert index.next_free_slot(at(9), timedelta(minutes=30)) == at(11)
+    assert index.next_free_slot(at(9), timedelta(hours=1)) == at(12)
+    assert index.next_free_slot(at(9), timedelta(hours=1), until=at(12, 30)) is None
+    assert index.next_free_slot(at(9), timedelta(hours=1), ignore_ids={'c'}) == at(11)
+
+def test_merge_intervals():
+    intervals = [(at(13), at(14)), (at(9), at(10)), (at(9, 30), at(11)), (at(11), at(12)), (at(10), at(10, 30))]
+    assert merge_intervals(intervals) == [(at(9), at(12)), (at(13), at(14))]
+    assert merge_intervals([]) == []
+
+def test_free_slots():
+    busy = merge_intervals([(at(8), at(9, 30)), (at(10), at(11)), (at(16, 45), at(18))])
+    assert free_slots(busy, at(9), at(17), timedelta(minutes=30)) == [
+        (at(9, 30), at(10)),
+        (at(11), at(16, 45)),
+    ]
+    assert free_slots(busy, at(9), at(17), timedelta(hours=6)) == []
+    assert free_slots([], at(9), at(17), timedelta(hours=8)) == [(at(9), at(17))]
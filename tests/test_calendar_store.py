@@ -0,0 +1,106 @@
+import threading
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+from tools.calendar_store import CALENDAR_SYNC_FUTURE_DAYS, CalendarStore, get_calendar_store, query_events
+
+UTC = ZoneInfo('UTC')
+
+class FakeEvents:
+    def __init__(self, calls):
+        self.calls = calls
+    
+    def list(self, **params):
+        self.calls.append(params)
+        return params
+
+class FakeService:
+    def __init__(self, calls):
+        self._events = FakeEvents(calls)
+    
+    def events(self):
+        return self._events
+
+class FakeManager:
+    """Answers events().list with the given items and a sync token"""
+    
+    def __init__(self, items):
+        self.calls = []
+        self.service = FakeService(self.calls)
+        self.items = items
+    
+    def execute(self, params):
+        return {'items': self.items, 'nextSyncToken': f'token-{len(self.calls)}'}
+
+def timed_event(event_id, start, hours=1):
+    return {
+        'id': event_id,
+        'summary': event_id,
+        'updated': '2024-01-01T00:00:00Z',
+        'start': {'dateTime': start.isoformat()},
+        'end': {'dateTime': (start + timedelta(hours=hours)).isoformat()},
+    }
+
+def test_full_sync_is_bounded_to_a_window():
+    now = datetime.now(UTC)
+    manager = FakeManager([timed_event('soon', now + timedelta(days=1))])
+    store = CalendarStore(None, 'UTC')
+    store.sync(manager)
+    
+    full_sync = manager.calls[0]
+    assert 'timeMin' in full_sync and 'timeMax' in full_sync
+    assert store.covers(now, now + timedelta(days=7))
+    assert not store.covers(now, now + timedelta(days=CALENDAR_SYNC_FUTURE_DAYS + 1))
+    assert not store.covers(now, None)
+    assert [event['id'] for event in store.events_between(now, now + timedelta(days=7))] == ['soon']
+
+def test_incremental_sync_sends_only_the_sync_token():
+    manager = FakeManager([])
+    store = CalendarStore(None, 'UTC')
+    store.sync(manager)
+    store.sync(manager)
+    
+    incremental = manager.calls[1]
+    assert incremental['syncToken'] == 'token-1'
+    assert 'timeMin' not in incremental and 'timeMax' not in incremental
+
+def test_nothing_is_covered_before_the_first_sync():
+    now = datetime.now(UTC)
+    assert not CalendarStore(None, 'UTC').covers(now, now + timedelta(hours=1))
+
+class SlowFullSyncManager(FakeManager):
+    """Holds full syncs until released; windowed API reads answer at once"""
+    
+    def __init__(self, user_id, items):
+        super().__init__(items)
+        self.user_id = user_id
+        self.timezone = 'UTC'
+        self.release = threading.Event()
+    
+    def execute(self, params):
+        if 'orderBy' not in params:
+            assert self.release.wait(5)
+        return super().execute(params)
+
+def test_first_sync_runs_in_the_background():
+    now = datetime.now(UTC)
+    manager = SlowFullSyncManager('background-sync-user', [timed_event('soon', now + timedelta(days=1))])
+    
+    store = get_calendar_store(manager)
+    assert not store.ready
+    
+    # Reads don't wait for the sync; they go to the API for just their range
+    time_min, time_max = now, now + timedelta(days=7)
+    assert [event['id'] for event in query_events(store, manager, time_min, time_max)] == ['soon']
+    fallback = manager.calls[-1]
+    assert fallback['timeMin'] == time_min.isoformat() and fallback['timeMax'] == time_max.isoformat()
+    
+    # Asking again doesn't start a second full sync
+    assert get_calendar_store(manager) is store
+    manager.release.set()
+    store._background_sync.result(5)
+    assert store.ready
+    assert len([call for call in manager.calls if 'orderBy' not in call]) == 1
+    
+    calls = len(manager.calls)
+    assert [event['id'] for event in query_events(store, manager, time_min, time_max)] == ['soon']
+    assert len(manager.calls) == calls
@@ -0,0 +1,77 @@
+import asyncio
+from types import SimpleNamespace
+import tools.google_calendar_tools as calendar_tools
+from tools.calendar_store import CalendarStore
+
+class FakeRequest:
+    def __init__(self, event_id, body):
+        self.event_id = event_id
+        self.body = body
+        self.headers = {}
+
+class FakeEvents:
+    def patch(self, calendarId, eventId, body):
+        return FakeRequest(eventId, body)
+
+class FakeManager:
+    """Calendar manager whose batch PATCHes are recorded and echoed back as the updated event"""
+    
+    def __init__(self, store):
+        self.user_id = None
+        self.timezone = 'UTC'
+        self.service = SimpleNamespace(events=lambda: FakeEvents())
+        self.store = store
+        self.patches = []
+    
+    def execute_batch(self, requests):
+        results = []
+        for request in requests:
+            self.patches.append(request.body)
+            event = dict(self.store.get(request.event_id))
+            event.update({key: {k: v for k, v in value.items() if v is not None} for key, value in request.body.items()})
+            event['updated'] = '2999-01-01T00:00:00Z'
+            results.append((event, None))
+        return results
+
+def run_bulk_update(monkeypatch, events, updates):
+    store = CalendarStore(None, 'UTC')
+    for event in events:
+        store.apply(event)
+    manager = FakeManager(store)
+    monkeypatch.setattr(calendar_tools, 'get_calendar_manager', lambda session: manager)
+    monkeypatch.setattr(calendar_tools, 'get_calendar_store', lambda manager: store)
+    
+    tool = calendar_tools.update_calendar_events_bulk_google.__wrapped__
+    result = asyncio.run(tool(SimpleNamespace(userdata=None), updates))
+    return result, manager, store
+
+def test_bulk_update_moves_an_all_day_event_to_a_one_hour_slot(monkeypatch):
+    holiday = {
+        'id': 'offsite',
+        'summary': 'Offsite',
+        'updated': '2024-01-01T00:00:00Z',
+        'start': {'date': '2024-01-15'},
+        'end': {'date': '2024-01-16'},
+    }
+    result, manager, store = run_bulk_update(monkeypatch, [holiday], ['offsite | 2024-01-15 14:00'])
+    
+    assert "Updated 1 of 1" in result
+    patch, = manager.patches
+    # PATCH merges, so the all-day 'date' must be cleared on both ends
+    assert patch['start']['date'] is None and patch['end']['date'] is None
+    assert patch['start']['dateTime'].startswith('2024-01-15T14:00')
+    assert patch['end']['dateTime'].startswith('2024-01-15T15:00')
+    assert store.get('offsite')['start'] == {'dateTime': patch['start']['dateTime'], 'timeZone': 'UTC'}
+
+def test_bulk_update_keeps_a_timed_event_length(monkeypatch):
+    meeting = {
+        'id': 'review',
+        'summary': 'Review',
+        'updated': '2024-01-01T00:00:00Z',
+        'start': {'dateTime': '2024-01-15T09:00:00+00:00'},
+        'end': {'dateTime': '2024-01-15T09:45:00+00:00'},
+    }
+    _, manager, _ = run_bulk_update(monkeypatch, [meeting], ['review | 2024-01-15 14:00'])
+    
+    patch, = manager.patches
+    assert patch['end']['dateTime'].startswith('2024-01-15T14:45')
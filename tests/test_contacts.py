@@ -0,0 +1,73 @@
+from tools.contacts import ContactIndex, ContactStore, contacts_from_events, normalize_name
+
+def make_index(*contacts):
+    index = ContactIndex()
+    for email, name in contacts:
+        index.add(email, name)
+    return index
+
+def test_normalize_name():
+    assert normalize_name("Smith, John") == "smith john"
+    assert normalize_name(" John.Smith@Example.com ") == "john.smith@example.com"
+
+def test_prefix_lookup():
+    index = make_index(("john.smith@example.com", "John Smith"), ("jonas@example.com", None), ("sarah@example.com", "Sarah Lee"))
+    assert {email for email, _, _ in index.search("jo")} == {"john.smith@example.com", "jonas@example.com"}
+    assert index.search("sarah lee")[0][0] == "sarah@example.com"
+
+def test_name_from_address_is_searchable():
+    index = make_index(("mary.jones@example.com", None))
+    assert index.search("mary")[0][0] == "mary.jones@example.com"
+
+def test_fuzzy_lookup_catches_misspellings():
+    index = make_index(("john.smith@example.com", "John Smith"), ("sarah@example.com", "Sarah Lee"))
+    assert index.search("jon smyth")[0][0] == "john.smith@example.com"
+
+def test_no_match():
+    index = make_index(("john.smith@example.com", "John Smith"))
+    assert index.search("zebedee") == []
+
+def test_more_frequent_contact_ranks_first_on_ties():
+    index = make_index(("john.a@example.com", "John"), ("john.b@example.com", "John"))
+    index.add("john.b@example.com", "John")
+    assert index.search("john")[0][0] == "john.b@example.com"
+
+def test_sightings_from_the_same_source_count_once():
+    index = ContactIndex()
+    index.add("john@example.com", "John", source="event:1")
+    index.add("john@example.com", "John", source="event:1")
+    index.add("john@example.com", "John", source="event:2")
+    assert index._contacts["john@example.com"]['count'] == 2
+
+def test_recurring_instances_share_a_source():
+    events = [
+        {'id': f'weekly_{week}', 'recurringEventId': 'weekly', 'attendees': [{'email': 'john@example.com'}]}
+        for week in range(3)
+    ]
+    assert {source for _, _, source in contacts_from_events(events)} == {'event:weekly'}
+
+def test_contacts_from_events_skips_the_user_and_rooms():
+    events = [{
+        'id': 'e1',
+        'attendees': [
+            {'email': 'me@example.com', 'self': True},
+            {'email': 'room@resource.calendar.google.com', 'resource': True},
+            {'email': 'john@example.com', 'displayName': 'John'},
+        ],
+        'organizer': {'email': 'sarah@example.com'}
+    }]
+    assert contacts_from_events(events) == [
+        ('john@example.com', 'John', 'event:e1'),
+        ('sarah@example.com', None, 'event:e1'),
+    ]
+
+def test_store_counts_each_event_sighting_once(tmp_path):
+    store = ContactStore(str(tmp_path / 'contacts.db'))
+    sightings = [('john@example.com', 'John', 'event:1'), ('john@example.com', 'John', 'event:2')]
+    assert len(store.record('user-1', sightings)) == 2
+    # A full resync sees the same events again
+    assert store.record('user-1', sightings) == []
+    # Emails sent to someone always count
+    assert len(store.record('user-1', [('john@example.com', 'John', None)])) == 1
+    rows = store.load('user-1')
+    assert [(email, name, count) for email, name, count, _ in rows] == [('john@example.com', 'john', 3)]
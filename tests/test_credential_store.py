@@ -0,0 +1,122 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from shared.credential_store import CredentialStore
+
+SCOPES = ['https://www.googleapis.com/auth/calendar']
+
+class FakeQuery:
+    def __init__(self, client):
+        self.client = client
+    
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self
+    
+    def execute(self):
+        return self.client.execute()
+
+class FakeClient:
+    """Supabase stand-in whose credential reads are slow and counted"""
+    
+    def __init__(self, record=None):
+        self.record = record
+        self.reads = 0
+    
+    def table(self, name):
+        return FakeQuery(self)
+    
+    def execute(self):
+        self.reads += 1
+        time.sleep(0.05)
+        return type('Response', (), {'data': [self.record] if self.record else []})()
+
+def credentials_record():
+    return {'credentials_json': json.dumps({
+        'token': 'access-token',
+        'refresh_token': 'refresh-token',
+        'client_id': 'client-id',
+        'client_secret': 'client-secret',
+        'expiry': '2999-01-01T00:00:00Z',
+    })}
+
+def test_concurrent_lookups_share_one_load():
+    client = FakeClient(credentials_record())
+    store = CredentialStore(lambda: client)
+    
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: store.get('user-1', 'calendar', SCOPES), range(8)))
+    
+    assert client.reads == 1
+    assert all(creds is results[0] for creds in results)
+    assert results[0].token == 'access-token'
+
+def test_user_locks_are_dropped_once_released():
+    store = CredentialStore(lambda: FakeClient(credentials_record()))
+    for i in range(5):
+        store.get(f'user-{i}', 'calendar', SCOPES)
+    assert store._user_locks == {}
+
+def test_user_lock_is_kept_while_someone_waits_for_it():
+    store = CredentialStore(lambda: FakeClient())
+    held = threading.Event()
+    release = threading.Event()
+    
+    def hold():
+        with store._user_lock('user-1', 'calendar'):
+            held.set()
+            release.wait(5)
+    
+    holder = threading.Thread(target=hold)
+    holder.start()
+    held.wait(5)
+    waiter = threading.Thread(target=lambda: store.get('user-1', 'calendar', SCOPES))
+    waiter.start()
+    time.sleep(0.05)
+    assert store._user_locks[('user-1', 'calendar')][1] == 2
+    
+    release.set()
+    holder.join()
+    waiter.join()
+    assert store._user_locks == {}
+
+def test_missing_credentials():
+    store = CredentialStore(lambda: FakeClient())
+    assert store.get('user-1', 'gmail', SCOPES) is None
+
+def test_row_changed_by_another_process_is_reloaded():
+    client = FakeClient(credentials_record())
+    client.record['updated_at'] = '2024-01-01T00:00:00Z'
+    store = CredentialStore(lambda: client, revalidate_interval=0)
+    assert store.get('user-1', 'calendar', SCOPES).token == 'access-token'
+    
+    # The API server saves new credentials after a re-auth
+    record = credentials_record()
+    record['credentials_json'] = record['credentials_json'].replace('access-token', 'new-token')
+    record['updated_at'] = '2024-01-02T00:00:00Z'
+    client.record = record
+    assert store.get('user-1', 'calendar', SCOPES).token == 'new-token'
+
+def test_unchanged_row_is_only_checked():
+    client = FakeClient(credentials_record())
+    store = CredentialStore(lambda: client, revalidate_interval=0)
+    creds = store.get('user-1', 'calendar', SCOPES)
+    assert store.get('user-1', 'calendar', SCOPES) is creds
+    assert client.reads == 2
+
+def test_credentials_deleted_by_another_process_are_dropped():
+    client = FakeClient(credentials_record())
+    store = CredentialStore(lambda: client, revalidate_interval=0)
+    assert store.get('user-1', 'gmail', SCOPES) is not None
+    
+    # The user disconnected Gmail through the API server
+    client.record = None
+    assert store.get('user-1', 'gmail', SCOPES) is None
+
+def test_recently_checked_entries_are_served_from_memory():
+    client = FakeClient(credentials_record())
+    store = CredentialStore(lambda: client, revalidate_interval=60)
+    store.get('user-1', 'calendar', SCOPES)
+    client.record = None
+    assert store.get('user-1', 'calendar', SCOPES) is not None
+    assert client.reads == 1
@@ -0,0 +1,122 @@
+from datetime import datetime
+from zoneinfo import ZoneInfo
+import pytest
+from tools.date_parsing import (
+    _parse_spec,
+    parse_date_range,
+    parse_datetime_string,
+    parse_duration_string,
+)
+
+# Wednesday 2024-01-10 10:30 UTC
+REFERENCE_NOW = datetime(2024, 1, 10, 10, 30, tzinfo=ZoneInfo('UTC'))
+
+DATETIME_CORPUS = [
+    ("tomorrow", "2024-01-11 09:00"),
+    ("tomorrow 2pm", "2024-01-11 14:00"),
+    ("Tomorrow at 2:30 PM", "2024-01-11 14:30"),
+    ("tomorrow morning", "2024-01-11 09:00"),
+    ("day after tomorrow at noon", "2024-01-12 12:00"),
+    ("today", "2024-01-10 11:30"),
+    ("today at 3pm", "2024-01-10 15:00"),
+    ("tonight", "2024-01-10 20:00"),
+    ("tonight at 9", "2024-01-10 21:00"),
+    ("7 tonight", "2024-01-10 19:00"),
+    ("tonight at 9:30pm", "2024-01-10 21:30"),
+    ("3pm", "2024-01-10 15:00"),
+    ("at 15:45", "2024-01-10 15:45"),
+    ("noon", "2024-01-10 12:00"),
+    ("in 3 hours", "2024-01-10 13:30"),
+    ("in 90 minutes", "2024-01-10 12:00"),
+    ("in an hour and a half", "2024-01-10 12:00"),
+    ("in 2 hours and 30 minutes", "2024-01-10 13:00"),
+    ("in 2 days", "2024-01-12 10:30"),
+    ("next Tues at 10", "2024-01-16 10:00"),
+    ("next wednesday", "2024-01-17 09:00"),
+    ("next Monday 10am", "2024-01-15 10:00"),
+    ("next friday at 4 in the afternoon", "2024-01-12 16:00"),
+    ("friday", "2024-01-12 09:00"),
+    ("wednesday at 5pm", "2024-01-10 17:00"),
+    ("this thursday 11am", "2024-01-11 11:00"),
+    ("next week", "2024-01-17 09:00"),
+    ("2024-01-15", "2024-01-15 09:00"),
+    ("2024-01-15 14:30", "2024-01-15 14:30"),
+    ("January 20 at 3pm", "2024-01-20 15:00"),
+    ("Jan 25", "2024-01-25 09:00"),
+]
+
+DURATION_CORPUS = [
+    ("1 hour", 60),
+    ("30 minutes", 30),
+    ("2 hours", 120),
+    ("90 minutes", 90),
+    ("1.5 hours", 90),
+    ("an hour and a half", 90),
+    ("1 and a half hours", 90),
+    ("half an hour", 30),
+    ("a half hour", 30),
+    ("a quarter of an hour", 15),
+    ("2 hours 15 minutes", 135),
+    ("3 hours and 15 minutes", 195),
+    ("2 hours and 30 minutes", 150),
+    ("1 hour and 45 minutes", 105),
+    ("1h30", 90),
+    ("2h", 120),
+    ("1:30", 90),
+    ("45 mins", 45),
+    ("two hours", 120),
+    ("all day", 60),
+]
+
+@pytest.mark.parametrize("text, expected", DATETIME_CORPUS)
+def test_parse_datetime_string(text, expected):
+    parsed = parse_datetime_string(text, 'UTC', REFERENCE_NOW)
+    assert parsed.strftime('%Y-%m-%d %H:%M') == expected
+
+@pytest.mark.parametrize("text, expected_minutes", DURATION_CORPUS)
+def test_parse_duration_string(text, expected_minutes):
+    assert parse_duration_string(text).total_seconds() / 60 == expected_minutes
+
+def test_parse_datetime_string_uses_user_timezone():
+    parsed = parse_datetime_string("tomorrow 2pm", 'America/New_York', REFERENCE_NOW)
+    assert parsed.tzinfo == ZoneInfo('America/New_York')
+    assert parsed.strftime('%Y-%m-%d %H:%M') == "2024-01-11 14:00"
+
+def test_parse_date_range_week():
+    start, end, is_range = parse_date_range("next week", 'UTC', REFERENCE_NOW)
+    assert is_range
+    assert start.strftime('%Y-%m-%d') == "2024-01-15"
+    assert end.strftime('%Y-%m-%d') == "2024-01-22"
+
+def test_parse_date_range_day():
+    start, end, is_range = parse_date_range("tomorrow", 'UTC', REFERENCE_NOW)
+    assert not is_range
+    assert start == datetime(2024, 1, 11, tzinfo=ZoneInfo('UTC'))
+    assert end == datetime(2024, 1, 12, tzinfo=ZoneInfo('UTC'))
+
+LATE_EVENING = datetime(2024, 1, 10, 23, 30, tzinfo=ZoneInfo('UTC'))
+
+DATE_RANGE_CORPUS = [
+    # (text, now, start day, days covered)
+    (None, REFERENCE_NOW, "2024-01-10", 1),
+    ("today", REFERENCE_NOW, "2024-01-10", 1),
+    (None, LATE_EVENING, "2024-01-10", 1),
+    ("", LATE_EVENING, "2024-01-10", 1),
+    ("today", LATE_EVENING, "2024-01-10", 1),
+    ("Today", LATE_EVENING, "2024-01-10", 1),
+    ("tomorrow", LATE_EVENING, "2024-01-11", 1),
+    ("this week", LATE_EVENING, "2024-01-08", 7),
+    ("next weekend", REFERENCE_NOW, "2024-01-20", 2),
+]
+
+@pytest.mark.parametrize("text, now, expected_start, expected_days", DATE_RANGE_CORPUS)
+def test_parse_date_range_corpus(text, now, expected_start, expected_days):
+    start, end, _ = parse_date_range(text, 'UTC', now)
+    assert start.strftime('%Y-%m-%d') == expected_start
+    assert (end - start).days == expected_days
+
+def test_repeated_parses_are_memoized():
+    parse_datetime_string("next Tues at 10", 'UTC', REFERENCE_NOW)
+    hits = _parse_spec.cache_info().hits
+    parse_datetime_string("Next Tues at 10", 'UTC', REFERENCE_NOW)
+    assert _parse_spec.cache_info().hits == hits + 1
@@ -0,0 +1,141 @@
+import asyncio
+import threading
+from tools.email_outbox import EmailOutbox, OutgoingEmail
+from tools.outbox_store import OutboxStore
+
+def make_email(email_id):
+    return OutgoingEmail(
+        id=email_id,
+        user_id='user-1',
+        to=f'{email_id}@example.com',
+        subject='Hello',
+        message={'raw': email_id}
+    )
+
+def recorded_results(store):
+    rows = store._connection().execute("SELECT id, status FROM outbox_results ORDER BY id").fetchall()
+    return [(row['id'], row['status']) for row in rows]
+
+def test_outbox_keeps_running_until_the_last_session_ends(tmp_path):
+    store = OutboxStore(str(tmp_path / 'outbox.db'))
+    release = threading.Event()
+    sent = []
+    
+    def send(email):
+        release.wait(5)
+        sent.append(email.id)
+    
+    async def scenario():
+        outbox = EmailOutbox(send, store=store, workers=1)
+        await outbox.start()
+        await outbox.start()
+        
+        assert await outbox.enqueue(make_email('a'))
+        assert await outbox.enqueue(make_email('b'))
+        
+        # One session ends while the other still has mail queued
+        await asyncio.wait_for(outbox.aclose(timeout=5), 1)
+        assert outbox._tasks
+        assert not any(task.done() for task in outbox._tasks if task is not outbox._recover_task)
+        
+        # The remaining session can still queue mail on the same workers
+        queue = outbox._queue
+        assert await outbox.enqueue(make_email('c'))
+        assert outbox._queue is queue
+        
+        release.set()
+        await outbox.aclose()
+        assert not outbox._tasks
+    
+    asyncio.run(scenario())
+    
+    assert sent == ['a', 'b', 'c']
+    assert recorded_results(store) == [('a', 'sent'), ('b', 'sent'), ('c', 'sent')]
+
+def test_duplicate_email_is_only_queued_once(tmp_path):
+    store = OutboxStore(str(tmp_path / 'outbox.db'))
+    sent = []
+    
+    async def scenario():
+        outbox = EmailOutbox(lambda email: sent.append(email.id), store=store, workers=1)
+        await outbox.start()
+        assert await outbox.enqueue(make_email('a'))
+        assert not await outbox.enqueue(make_email('a'))
+        await outbox.aclose()
+    
+    asyncio.run(scenario())
+    
+    assert sent == ['a']
+
+def test_enqueue_many_is_sent_as_one_batch(tmp_path):
+    store = OutboxStore(str(tmp_path / 'outbox.db'))
+    batches = []
+    
+    def send_batch(emails):
+        batches.append([email.id for email in emails])
+        return [None] * len(emails)
+    
+    async def scenario():
+        outbox = EmailOutbox(lambda email: batches.append([email.id]), store=store, send_batch=send_batch, workers=2)
+        await outbox.start()
+        await outbox.enqueue(make_email('b'))
+        await outbox._queue.join()
+        
+        queued = await outbox.enqueue_many([make_email(email_id) for email_id in 'abcd'])
+        assert [email.id for email in queued] == ['a', 'c', 'd']
+        await outbox.aclose()
+    
+    asyncio.run(scenario())
+    
+    assert batches == [['b'], ['a', 'c', 'd']]
+
+def test_email_taken_over_while_in_retry_backoff_is_not_sent_again(tmp_path):
+    path = str(tmp_path / 'outbox.db')
+    store = OutboxStore(path, claim_lease=0.1)
+    attempts = []
+    
+    def send(email):
+        attempts.append(email.id)
+        raise OSError("connection reset")
+    
+    async def scenario():
+        outbox = EmailOutbox(send, store=store, workers=1, retry_delay=0.3)
+        await outbox.start()
+        await outbox.enqueue(make_email('a'))
+        
+        # The first attempt fails; while it backs off the lease runs out and
+        # another process's recovery claims the email
+        await asyncio.sleep(0.2)
+        other = OutboxStore(path, claim_lease=0.1)
+        assert [row['id'] for row in other.claim_pending()] == ['a']
+        
+        await outbox._queue.join()
+        await outbox.aclose()
+    
+    asyncio.run(scenario())
+    
+    assert attempts == ['a']
+    assert recorded_results(store) == []
+
+def test_retry_renews_the_lease(tmp_path):
+    path = str(tmp_path / 'outbox.db')
+    store = OutboxStore(path, claim_lease=0.15)
+    attempts = []
+    
+    def send(email):
+        attempts.append(email.id)
+        if len(attempts) < 3:
+            raise OSError("connection reset")
+    
+    async def scenario():
+        outbox = EmailOutbox(send, store=store, workers=1, retry_delay=0.1)
+        await outbox.start()
+        await outbox.enqueue(make_email('a'))
+        await outbox._queue.join()
+        await outbox.aclose()
+    
+    asyncio.run(scenario())
+    
+    # Backoff (0.1s, then 0.2s) outlasted the 0.15s lease, but nobody took the email over
+    assert attempts == ['a', 'a', 'a']
+    assert recorded_results(store) == [('a', 'sent')]
@@ -0,0 +1,61 @@
+import json
+import pytest
+from server.config import DEFAULT_SECRET_KEY, Settings
+from server.services.oauth_state import OAuthStateSigner, _b64decode, _b64encode
+
+SECRET = 'state-secret'
+
+def test_round_trip():
+    signer = OAuthStateSigner(SECRET)
+    assert signer.verify(signer.create('user-1', 'calendar'), 'calendar') == 'user-1'
+
+def test_state_can_only_be_used_once():
+    signer = OAuthStateSigner(SECRET)
+    state = signer.create('user-1', 'calendar')
+    assert signer.verify(state, 'calendar') == 'user-1'
+    assert signer.verify(state, 'calendar') is None
+
+def test_state_is_bound_to_its_flow():
+    signer = OAuthStateSigner(SECRET)
+    assert signer.verify(signer.create('user-1', 'calendar'), 'gmail') is None
+
+def test_expired_state_is_rejected():
+    signer = OAuthStateSigner(SECRET, ttl=-1)
+    assert signer.verify(signer.create('user-1', 'calendar'), 'calendar') is None
+
+def test_forged_payload_is_rejected():
+    signer = OAuthStateSigner(SECRET)
+    payload, signature = signer.create('user-1', 'calendar').split('.')
+    data = json.loads(_b64decode(payload))
+    data['u'] = 'user-2'
+    forged = _b64encode(json.dumps(data).encode('utf-8'))
+    assert signer.verify(f"{forged}.{signature}", 'calendar') is None
+
+def test_state_signed_with_another_secret_is_rejected():
+    state = OAuthStateSigner('another-secret').create('user-1', 'calendar')
+    assert OAuthStateSigner(SECRET).verify(state, 'calendar') is None
+
+def test_unsigned_or_garbled_state_is_rejected():
+    signer = OAuthStateSigner(SECRET)
+    assert signer.verify('', 'calendar') is None
+    assert signer.verify('not-a-state', 'calendar') is None
+    assert signer.verify('abc.def', 'calendar') is None
+    assert signer.verify('ab\u00e9.d\u00e9f', 'calendar') is None
+
+def test_missing_secret_fails_closed():
+    signer = OAuthStateSigner('')
+    with pytest.raises(RuntimeError):
+        signer.create('user-1', 'calendar')
+    state = OAuthStateSigner(SECRET).create('user-1', 'calendar')
+    assert signer.verify(state, 'calendar') is None
+
+def test_used_nonces_are_bounded():
+    signer = OAuthStateSigner(SECRET, max_used=2)
+    for _ in range(5):
+        signer.verify(signer.create('user-1', 'calendar'), 'calendar')
+    assert len(signer._used) == 2
+
+def test_default_secret_key_is_never_used_for_signing():
+    assert Settings(SECRET_KEY=DEFAULT_SECRET_KEY, OAUTH_STATE_SECRET='').oauth_state_secret == ''
+    assert Settings(SECRET_KEY='real-secret', OAUTH_STATE_SECRET='').oauth_state_secret == 'real-secret'
+    assert Settings(SECRET_KEY='real-secret', OAUTH_STATE_SECRET='state').oauth_state_secret == 'state'
@@ -0,0 +1,81 @@
+import time
+from tools.outbox_store import OutboxStore
+
+def append(store, email_id, to='someone@example.com'):
+    return store.append(email_id, 'user-1', to, 'Hello', {'raw': email_id})
+
+def test_append_dedupes_by_idempotency_key(tmp_path):
+    store = OutboxStore(str(tmp_path / 'outbox.db'))
+    assert append(store, 'a')
+    assert not append(store, 'a')
+
+def test_append_many_returns_new_keys(tmp_path):
+    store = OutboxStore(str(tmp_path / 'outbox.db'))
+    append(store, 'b')
+    emails = [(email_id, 'user-1', 'someone@example.com', 'Hello', {'raw': email_id}) for email_id in 'abc']
+    assert store.append_many(emails) == {'a', 'c'}
+    assert store.append_many(emails) == set()
+
+def test_appended_emails_are_claimed_by_their_process(tmp_path):
+    path = str(tmp_path / 'outbox.db')
+    store = OutboxStore(path)
+    append(store, 'a')
+    assert OutboxStore(path).claim_pending() == []
+
+def test_expired_claims_are_taken_over(tmp_path):
+    path = str(tmp_path / 'outbox.db')
+    append(OutboxStore(path, claim_lease=0), 'a')
+    other = OutboxStore(path, claim_lease=0)
+    assert [row['id'] for row in other.claim_pending()] == ['a']
+
+def test_live_claims_are_not_taken_over(tmp_path):
+    path = str(tmp_path / 'outbox.db')
+    append(OutboxStore(path, claim_lease=0), 'a')
+    first = OutboxStore(path, claim_lease=0)
+    second = OutboxStore(path, claim_lease=60)
+    assert [row['id'] for row in first.claim_pending()] == ['a']
+    assert second.claim_pending() == []
+
+def test_emails_with_results_are_not_pending(tmp_path):
+    path = str(tmp_path / 'outbox.db')
+    store = OutboxStore(path, claim_lease=0)
+    append(store, 'a')
+    append(store, 'b')
+    store.record_results([('a', 'sent', None)])
+    assert [row['id'] for row in OutboxStore(path, claim_lease=0).claim_pending()] == ['b']
+
+def test_claim_pending_is_oldest_first_and_limited(tmp_path):
+    path = str(tmp_path / 'outbox.db')
+    store = OutboxStore(path, claim_lease=0)
+    for email_id in ('first', 'second', 'third'):
+        append(store, email_id)
+    rows = OutboxStore(path, claim_lease=0).claim_pending(limit=2)
+    assert [row['id'] for row in rows] == ['first', 'second']
+
+def test_compact_drops_only_finished_emails(tmp_path):
+    path = str(tmp_path / 'outbox.db')
+    store = OutboxStore(path, claim_lease=0)
+    append(store, 'a')
+    append(store, 'b')
+    store.record_results([('a', 'sent', None)])
+    assert store.compact(retention=-1) == 1
+    assert [row['id'] for row in OutboxStore(path, claim_lease=0).claim_pending()] == ['b']
+
+def test_renewing_claims_keeps_other_processes_out(tmp_path):
+    path = str(tmp_path / 'outbox.db')
+    store = OutboxStore(path, claim_lease=0.05)
+    append(store, 'a')
+    time.sleep(0.1)
+    
+    # Expired, but nobody has taken it yet, so the lease restarts
+    assert store.renew_claims(['a']) == {'a'}
+    assert OutboxStore(path, claim_lease=0.05).claim_pending() == []
+
+def test_claims_taken_over_are_not_renewed(tmp_path):
+    path = str(tmp_path / 'outbox.db')
+    store = OutboxStore(path, claim_lease=0)
+    append(store, 'a')
+    append(store, 'b')
+    OutboxStore(path, claim_lease=0).claim_pending(limit=1)
+    store.record_results([('b', 'sent', None)])
+    assert store.renew_claims(['a', 'b', 'missing']) == set()
@@ -0,0 +1,54 @@
+from datetime import datetime, timezone
+import tools.room_context as room_context
+
+class FakeQuery:
+    def __init__(self, rows):
+        self.rows = rows
+        self.filters = []
+    
+    def select(self, columns):
+        return self
+    
+    def eq(self, column, value):
+        self.filters.append(('eq', column, value))
+        return self
+    
+    def gte(self, column, value):
+        self.filters.append(('gte', column, value))
+        return self
+    
+    def execute(self):
+        cutoff = next((value for op, column, value in self.filters if op == 'gte'), None)
+        rows = [row for row in self.rows if cutoff is None or row['updated_at'] >= cutoff]
+        return type('Response', (), {'data': rows})()
+
+class FakeClient:
+    def __init__(self, rows):
+        self.query = FakeQuery(rows)
+    
+    def table(self, name):
+        return self.query
+
+def use_rooms(monkeypatch, rows):
+    client = FakeClient(rows)
+    monkeypatch.setattr(room_context, 'get_supabase_client', lambda: client)
+    return client.query
+
+def test_recent_room_row_is_used(monkeypatch):
+    now = datetime.now(timezone.utc).isoformat()
+    query = use_rooms(monkeypatch, [{'user_id': 'user-1', 'updated_at': now}])
+    
+    assert room_context.get_user_id_from_room('room-recent', max_age=120) == 'user-1'
+    assert query.filters[-1][:2] == ('gte', 'updated_at')
+
+def test_stale_room_row_is_ignored(monkeypatch):
+    use_rooms(monkeypatch, [{'user_id': 'user-1', 'updated_at': '2020-01-01T00:00:00+00:00'}])
+    
+    assert room_context.get_user_id_from_room('room-stale', max_age=120) is None
+
+def test_age_bound_lookup_skips_the_cache(monkeypatch):
+    room_context._room_users.set('room-cached', 'old-user')
+    use_rooms(monkeypatch, [])
+    
+    assert room_context.get_user_id_from_room('room-cached') == 'old-user'
+    assert room_context.get_user_id_from_room('room-cached', max_age=120) is None
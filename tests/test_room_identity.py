@@ -0,0 +1,31 @@
+import json
+from shared.room_identity import build_identity_metadata, read_identity_metadata
+
+SECRET = 'livekit-secret'
+
+def test_round_trip():
+    metadata = build_identity_metadata('room-1', 'user-1', SECRET)
+    assert read_identity_metadata(metadata, 'room-1', SECRET) == 'user-1'
+
+def test_signature_is_bound_to_the_room():
+    metadata = build_identity_metadata('room-1', 'user-1', SECRET)
+    assert read_identity_metadata(metadata, 'room-2', SECRET) is None
+
+def test_forged_user_id_is_rejected():
+    data = json.loads(build_identity_metadata('room-1', 'user-1', SECRET))
+    data['user_id'] = 'user-2'
+    assert read_identity_metadata(json.dumps(data), 'room-1', SECRET) is None
+
+def test_other_secret_is_rejected():
+    metadata = build_identity_metadata('room-1', 'user-1', 'another-secret')
+    assert read_identity_metadata(metadata, 'room-1', SECRET) is None
+
+def test_missing_or_malformed_metadata():
+    assert read_identity_metadata(None, 'room-1', SECRET) is None
+    assert read_identity_metadata('not json', 'room-1', SECRET) is None
+    assert read_identity_metadata('[]', 'room-1', SECRET) is None
+    assert read_identity_metadata(json.dumps({'user_id': 'user-1'}), 'room-1', SECRET) is None
+
+def test_no_secret_trusts_nothing():
+    metadata = build_identity_metadata('room-1', 'user-1', SECRET)
+    assert read_identity_metadata(metadata, 'room-1', '') is None
@@ -0,0 +1,62 @@
+import asyncio
+from google.auth.exceptions import RefreshError, TransportError
+import tools.token_refresher as token_refresher_module
+from tools.token_refresher import TokenRefresher
+
+class FakeCredentialStore:
+    def __init__(self, error):
+        self.error = error
+        self.calls = []
+        self.invalidated = []
+
+    def refresh_if_expiring(self, user_id, kind, scopes, margin):
+        self.calls.append((user_id, kind))
+        raise self.error
+
+    def invalidate(self, user_id, kind=None):
+        self.invalidated.append((user_id, kind))
+
+def refresh_once(monkeypatch, error):
+    store = FakeCredentialStore(error)
+    monkeypatch.setattr(token_refresher_module, 'credential_store', store)
+    refresher = TokenRefresher({'calendar': ['scope']})
+    refresher._sessions['user-1'] = 1
+
+    async def scenario():
+        await refresher._refresh_due()
+        # A second pass right away only retries what is due
+        refresher._next_check = {key: 0 for key in refresher._next_check}
+        await refresher._refresh_due()
+
+    asyncio.run(scenario())
+    return refresher, store
+
+def test_revoked_grant_stops_refreshing(monkeypatch):
+    refresher, store = refresh_once(
+        monkeypatch, RefreshError('invalid_grant: Token has been expired or revoked.')
+    )
+
+    assert store.calls == [('user-1', 'calendar')]
+    assert store.invalidated == [('user-1', 'calendar')]
+    assert ('user-1', 'calendar') not in refresher._next_check
+    assert ('user-1', 'calendar') not in refresher._failures
+
+def test_transient_failure_backs_off(monkeypatch):
+    refresher, store = refresh_once(monkeypatch, TransportError('connection reset'))
+
+    assert store.calls == [('user-1', 'calendar')] * 2
+    assert store.invalidated == []
+    assert refresher._failures[('user-1', 'calendar')] == 2
+
+def test_retryable_refresh_error_backs_off(monkeypatch):
+    refresher, store = refresh_once(monkeypatch, RefreshError('internal_failure', retryable=True))
+
+    assert store.invalidated == []
+    assert refresher._failures[('user-1', 'calendar')] == 2
+
+def test_untrack_forgets_revoked_kinds(monkeypatch):
+    refresher, _ = refresh_once(monkeypatch, RefreshError('invalid_grant'))
+
+    refresher.untrack('user-1')
+
+    assert refresher._revoked == set()
@@ -0,0 +1,103 @@
+import asyncio
+import base64
+import json
+import time
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+from jose import jwk, jwt
+from server.services.token_verifier import TokenVerifier
+
+SECRET = 'jwt-secret'
+
+def claims(**overrides):
+    values = {'sub': 'user-1', 'email': 'user@example.com', 'aud': 'authenticated', 'exp': int(time.time()) + 3600}
+    values.update(overrides)
+    return values
+
+def pem(private_key) -> bytes:
+    return private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption()
+    )
+
+def public_jwk(private_key, algorithm: str, kid: str) -> dict:
+    public_pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM,
+        serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+    key = jwk.construct(public_pem, algorithm).to_dict()
+    key['kid'] = kid
+    return key
+
+def make_verifier(jwks=None, **kwargs) -> TokenVerifier:
+    verifier = TokenVerifier('https://project.supabase.co', 'api-key', **kwargs)
+    verifier._jwks = {key['kid']: key for key in jwks or []}
+    verifier._jwks_fetched_at = time.monotonic()
+    return verifier
+
+def verify(verifier, token):
+    return asyncio.run(verifier.verify(token))
+
+def test_hs256_token():
+    user = verify(make_verifier(jwt_secret=SECRET), jwt.encode(claims(), SECRET, algorithm='HS256'))
+    assert user == {'user_id': 'user-1', 'email': 'user@example.com', 'authenticated': True}
+
+def test_wrong_secret_is_rejected():
+    token = jwt.encode(claims(), 'another-secret', algorithm='HS256')
+    assert verify(make_verifier(jwt_secret=SECRET), token) == {'authenticated': False}
+
+def test_expired_token_is_rejected():
+    token = jwt.encode(claims(exp=int(time.time()) - 10), SECRET, algorithm='HS256')
+    assert verify(make_verifier(jwt_secret=SECRET), token) == {'authenticated': False}
+
+def test_wrong_audience_is_rejected():
+    token = jwt.encode(claims(aud='anon'), SECRET, algorithm='HS256')
+    assert verify(make_verifier(jwt_secret=SECRET), token) == {'authenticated': False}
+
+def test_es256_token_from_jwks():
+    private_key = ec.generate_private_key(ec.SECP256R1())
+    verifier = make_verifier([public_jwk(private_key, 'ES256', 'ec-key')])
+    token = jwt.encode(claims(), pem(private_key), algorithm='ES256', headers={'kid': 'ec-key'})
+    assert verify(verifier, token)['user_id'] == 'user-1'
+
+def test_algorithm_comes_from_the_key_not_the_token():
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    key = public_jwk(private_key, 'RS256', 'rsa-key')
+    verifier = make_verifier([key])
+    
+    # Same key, but the token asks for a different algorithm than the key is pinned to
+    token = jwt.encode(claims(), pem(private_key), algorithm='RS512', headers={'kid': 'rsa-key'})
+    assert verify(verifier, token) == {'authenticated': False}
+    
+    token = jwt.encode(claims(), pem(private_key), algorithm='RS256', headers={'kid': 'rsa-key'})
+    assert verify(verifier, token)['authenticated']
+
+def test_symmetric_jwks_key_is_refused():
+    verifier = make_verifier([{'kid': 'oct-key', 'kty': 'oct', 'alg': 'HS256', 'k': 'c2VjcmV0'}])
+    # Claims to be RS256, but the key it names is a shared secret
+    header = base64.urlsafe_b64encode(json.dumps({'alg': 'RS256', 'kid': 'oct-key'}).encode()).rstrip(b'=').decode()
+    token = header + '.' + jwt.encode(claims(), 'c2VjcmV0', algorithm='HS256').split('.', 1)[1]
+    assert verify(verifier, token) == {'authenticated': False}
+
+def test_verified_tokens_are_cached():
+    verifier = make_verifier(jwt_secret=SECRET)
+    token = jwt.encode(claims(), SECRET, algorithm='HS256')
+    assert verify(verifier, token)['authenticated']
+    
+    # A cache hit doesn't check the signature again
+    verifier.jwt_secret = 'rotated'
+    assert verify(verifier, token)['authenticated']
+
+def test_cache_never_outlives_the_token():
+    verifier = make_verifier(jwt_secret=SECRET, cache_ttl=300)
+    exp = int(time.time()) + 5
+    verify(verifier, jwt.encode(claims(exp=exp), SECRET, algorithm='HS256'))
+    (expires_at, _), = verifier._verified.values()
+    assert expires_at <= exp
+
+def test_cache_is_bounded():
+    verifier = make_verifier(jwt_secret=SECRET, cache_size=2)
+    for i in range(4):
+        verify(verifier, jwt.encode(claims(sub=f'user-{i}'), SECRET, algorithm='HS256'))
+    assert len(verifier._verified) == 2
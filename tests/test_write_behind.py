@@ -0,0 +1,117 @@
+from shared.write_behind import WriteBehindQueue
+
+class FakeQuery:
+    def __init__(self, client, call):
+        self.client = client
+        self.call = call
+    
+    def eq(self, column, value):
+        self.call.setdefault('match', {})[column] = value
+        return self
+    
+    def execute(self):
+        if self.client.failures:
+            self.client.failures -= 1
+            raise ConnectionError("supabase unavailable")
+        self.client.calls.append(self.call)
+
+class FakeTable:
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+    
+    def upsert(self, rows, on_conflict):
+        return FakeQuery(self.client, {'op': 'upsert', 'table': self.name, 'rows': rows})
+    
+    def update(self, values):
+        return FakeQuery(self.client, {'op': 'update', 'table': self.name, 'values': values})
+
+class FakeClient:
+    def __init__(self, failures=0):
+        self.calls = []
+        self.failures = failures
+    
+    def table(self, name):
+        return FakeTable(self, name)
+
+def make_queue(client, **kwargs):
+    # Long interval so only explicit flushes write
+    return WriteBehindQueue(lambda: client, flush_interval=60, **kwargs)
+
+def test_updates_to_the_same_row_are_coalesced():
+    client = FakeClient()
+    queue = make_queue(client)
+    queue.update('calendar_credentials', {'credentials_json': 'old'}, user_id='user-1')
+    queue.update('calendar_credentials', {'credentials_json': 'new'}, user_id='user-1')
+    queue.update('calendar_credentials', {'credentials_json': 'other'}, user_id='user-2')
+    assert len(queue) == 2
+    
+    queue.flush()
+    assert client.calls == [
+        {'op': 'update', 'table': 'calendar_credentials', 'values': {'credentials_json': 'new'}, 'match': {'user_id': 'user-1'}},
+        {'op': 'update', 'table': 'calendar_credentials', 'values': {'credentials_json': 'other'}, 'match': {'user_id': 'user-2'}},
+    ]
+    queue.close()
+
+def test_upserts_to_a_table_go_out_in_one_request():
+    client = FakeClient()
+    queue = make_queue(client)
+    queue.upsert('rooms', {'room_name': 'a', 'user_id': 'user-1'}, on_conflict='room_name')
+    queue.upsert('rooms', {'room_name': 'b', 'user_id': 'user-2'}, on_conflict='room_name')
+    queue.upsert('rooms', {'room_name': 'a', 'user_id': 'user-3'}, on_conflict='room_name')
+    
+    queue.flush()
+    assert client.calls == [{'op': 'upsert', 'table': 'rooms', 'rows': [
+        {'room_name': 'b', 'user_id': 'user-2'},
+        {'room_name': 'a', 'user_id': 'user-3'},
+    ]}]
+    queue.close()
+
+def test_discarded_writes_are_not_applied():
+    client = FakeClient()
+    queue = make_queue(client)
+    queue.update('email_credentials', {'credentials_json': 'stale'}, user_id='user-1')
+    queue.discard('email_credentials', user_id='user-1')
+    queue.flush()
+    assert client.calls == []
+    queue.close()
+
+def test_failed_writes_are_retried_then_dropped():
+    client = FakeClient(failures=1)
+    queue = make_queue(client, max_attempts=2)
+    queue.update('calendar_credentials', {'credentials_json': 'new'}, user_id='user-1')
+    queue.flush()
+    assert client.calls == [] and len(queue) == 1
+    queue.flush()
+    assert len(client.calls) == 1 and len(queue) == 0
+    
+    client.failures = 2
+    queue.update('calendar_credentials', {'credentials_json': 'newer'}, user_id='user-1')
+    queue.flush()
+    queue.flush()
+    assert len(client.calls) == 1 and len(queue) == 0
+    queue.close()
+
+def test_newer_write_wins_over_a_retry():
+    client = FakeClient(failures=1)
+    queue = make_queue(client)
+    queue.update('calendar_credentials', {'credentials_json': 'old'}, user_id='user-1')
+    
+    # Fails, and a newer value arrives before the retry
+    queue.flush()
+    queue.update('calendar_credentials', {'credentials_json': 'new'}, user_id='user-1')
+    queue.flush()
+    assert [call['values'] for call in client.calls] == [{'credentials_json': 'new'}]
+    queue.close()
+
+def test_close_drains_pending_writes():
+    client = FakeClient()
+    queue = make_queue(client)
+    queue.update('calendar_credentials', {'credentials_json': 'new'}, user_id='user-1')
+    queue.close()
+    assert len(client.calls) == 1
+    
+    # A reused process can keep writing after close
+    queue.update('calendar_credentials', {'credentials_json': 'newer'}, user_id='user-1')
+    queue.close()
+    assert len(client.calls) == 2
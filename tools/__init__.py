@@ -1,24 +1,34 @@
 from .weather_tools import get_weather
 from .search_tools import search_web
-from .email_tools import send_email
+from .email_tools import send_email, send_bulk_email, resolve_contact
 from .chrome_tools import open_chrome_tab, open_tabs_sequentially
 from .google_calendar_tools import (
     add_calendar_event_google,
     view_calendar_events_google,
     update_calendar_event_google,
     delete_calendar_event_google,
-    list_all_events_google
+    list_all_events_google,
+    find_free_slots_google,
+    add_calendar_events_bulk_google,
+    update_calendar_events_bulk_google,
+    delete_calendar_events_bulk_google
 )
 
 __all__ = [
     'get_weather', 
     'search_web', 
     'send_email', 
+    'send_bulk_email',
+    'resolve_contact',
     'open_chrome_tab', 
     'open_tabs_sequentially',
     'add_calendar_event_google',
     'view_calendar_events_google', 
     'update_calendar_event_google',
     'delete_calendar_event_google',
-    'list_all_events_google'
+    'list_all_events_google',
+    'find_free_slots_google',
+    'add_calendar_events_bulk_google',
+    'update_calendar_events_bulk_google',
+    'delete_calendar_events_bulk_google'
 ]
\ No newline at end of file
@@ -0,0 +1,97 @@
+# tools/cache.py
+"""In-process caches shared by tools"""
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Hashable
+
+class TTLCache:
+    """Thread-safe LRU cache with per-entry TTL and single-flight construction.
+    
+    Concurrent get_or_create() calls for the same missing key share one call
+    to the factory; the other callers wait for its result (or its exception).
+    """
+    
+    def __init__(self, maxsize: int = 256, ttl: float = 1800):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._inflight = {}  # key -> Future shared by concurrent callers
+        self._lock = threading.Lock()
+    
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get a cached value, or default if missing or expired"""
+        with self._lock:
+            return self._get_locked(key, default)
+    
+    def set(self, key: Hashable, value: Any, ttl: float = None):
+        """Cache a value, evicting the least recently used entries if full"""
+        with self._lock:
+            self._set_locked(key, value, ttl)
+    
+    def get_or_create(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """Get a cached value, building it with factory() at most once at a time"""
+        with self._lock:
+            value = self._get_locked(key, _MISSING)
+            if value is not _MISSING:
+                return value
+            
+            flight = self._inflight.get(key)
+            is_leader = flight is None
+            if is_leader:
+                flight = Future()
+                self._inflight[key] = flight
+        
+        if not is_leader:
+            # Another caller is already building this entry
+            return flight.result()
+        
+        try:
+            value = factory()
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.set_exception(e)
+            raise
+        
+        with self._lock:
+            self._set_locked(key, value)
+            self._inflight.pop(key, None)
+        flight.set_result(value)
+        return value
+    
+    def invalidate(self, key: Hashable):
+        """Drop a cached entry"""
+        with self._lock:
+            self._entries.pop(key, None)
+    
+    def clear(self):
+        """Drop every cached entry"""
+        with self._lock:
+            self._entries.clear()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def _get_locked(self, key, default):
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return default
+        
+        self._entries.move_to_end(key)
+        return value
+    
+    def _set_locked(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+_MISSING = object()
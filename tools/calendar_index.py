@@ -0,0 +1,151 @@
+# tools/calendar_index.py
+"""Interval index over calendar events for range, conflict and free-slot queries"""
+import bisect
+import heapq
+from datetime import datetime, timedelta
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+# Events longer than this are kept out of the sorted array so a single
+# multi-week event can't widen every range query
+LONG_EVENT_SECONDS = 24 * 60 * 60
+
+class EventIndex:
+    """Sorted-array interval index keyed by event id.
+    
+    Events are ordered by start time. Since no indexed event lasts longer
+    than LONG_EVENT_SECONDS, every event overlapping [a, b) starts within
+    [a - LONG_EVENT_SECONDS, b), so range queries cost O(log n + k). The
+    few longer events live in a small side table that is scanned directly.
+    """
+    
+    def __init__(self):
+        self._keys = []  # sorted (start_ts, event_id)
+        self._spans = {}  # event_id -> (start_ts, end_ts)
+        self._long = {}  # event_id -> (start_ts, end_ts) for long events
+    
+    def __len__(self) -> int:
+        return len(self._spans) + len(self._long)
+    
+    def add(self, event_id: str, start: datetime, end: datetime):
+        """Index an event, replacing any previous span for the same id"""
+        self.remove(event_id)
+        start_ts, end_ts = start.timestamp(), end.timestamp()
+        
+        if end_ts - start_ts > LONG_EVENT_SECONDS:
+            self._long[event_id] = (start_ts, end_ts)
+        else:
+            self._spans[event_id] = (start_ts, end_ts)
+            bisect.insort(self._keys, (start_ts, event_id))
+    
+    def remove(self, event_id: str):
+        """Drop an event from the index"""
+        if self._long.pop(event_id, None) is not None:
+            return
+        
+        span = self._spans.pop(event_id, None)
+        if span is not None:
+            key = (span[0], event_id)
+            i = bisect.bisect_left(self._keys, key)
+            if i < len(self._keys) and self._keys[i] == key:
+                del self._keys[i]
+    
+    def clear(self):
+        """Drop every event"""
+        self._keys.clear()
+        self._spans.clear()
+        self._long.clear()
+    
+    def overlapping(self, time_min: datetime, time_max: Optional[datetime] = None) -> List[str]:
+        """Ids of events overlapping [time_min, time_max), ordered by start time"""
+        return [event_id for event_id, _, _ in self._overlapping(time_min, time_max)]
+    
+    def conflicts(self, start: datetime, end: datetime, exclude_id: Optional[str] = None) -> List[str]:
+        """Ids of events that overlap a proposed [start, end) slot"""
+        return [
+            event_id for event_id in self.overlapping(start, end)
+            if event_id != exclude_id
+        ]
+    
+    def next_free_slot(
+        self,
+        after: datetime,
+        duration: timedelta,
+        until: Optional[datetime] = None,
+        ignore_ids=()
+    ) -> Optional[datetime]:
+        """Earliest start >= after where `duration` fits without overlapping an event"""
+        cursor = after.timestamp()
+        needed = duration.total_seconds()
+        
+        for event_id, start_ts, end_ts in self._overlapping(after, until):
+            if event_id in ignore_ids:
+                continue
+            if start_ts - cursor >= needed:
+                break
+            cursor = max(cursor, end_ts)
+        
+        if until is not None and cursor + needed > until.timestamp():
+            return None
+        return datetime.fromtimestamp(cursor, tz=after.tzinfo)
+    
+    def _overlapping(self, time_min: datetime, time_max: Optional[datetime]) -> Iterator[Tuple[str, float, float]]:
+        """Lazily yield (event_id, start_ts, end_ts) overlapping the range, by start time"""
+        min_ts = time_min.timestamp()
+        max_ts = time_max.timestamp() if time_max is not None else float('inf')
+        
+        # Only indexed events starting in [min - LONG_EVENT_SECONDS, max) can overlap
+        lo = bisect.bisect_left(self._keys, (min_ts - LONG_EVENT_SECONDS, ''))
+        
+        def indexed():
+            for i in range(lo, len(self._keys)):
+                start_ts, event_id = self._keys[i]
+                if start_ts >= max_ts:
+                    return
+                end_ts = self._spans[event_id][1]
+                if end_ts > min_ts:
+                    yield event_id, start_ts, end_ts
+        
+        long_matches = sorted(
+            (
+                (event_id, start_ts, end_ts)
+                for event_id, (start_ts, end_ts) in self._long.items()
+                if end_ts > min_ts and start_ts < max_ts
+            ),
+            key=lambda item: item[1]
+        )
+        if not long_matches:
+            return indexed()
+        return heapq.merge(indexed(), long_matches, key=lambda item: item[1])
+
+def merge_intervals(intervals: Iterable[Tuple[datetime, datetime]]) -> List[Tuple[datetime, datetime]]:
+    """Merge overlapping (start, end) intervals in one sweep over the sorted starts"""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+def free_slots(
+    busy: List[Tuple[datetime, datetime]],
+    window_start: datetime,
+    window_end: datetime,
+    duration: timedelta
+) -> List[Tuple[datetime, datetime]]:
+    """Gaps of at least `duration` inside the window, given merged busy intervals"""
+    slots = []
+    cursor = window_start
+    for start, end in busy:
+        if end <= cursor:
+            continue
+        if start >= window_end:
+            break
+        if start - cursor >= duration:
+            slots.append((cursor, start))
+        cursor = max(cursor, end)
+    
+    if window_end - cursor >= duration:
+        slots.append((cursor, window_end))
+    return slots
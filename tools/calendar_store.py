@@ -0,0 +1,329 @@
+# tools/calendar_store.py
+"""Local mirror of users' Google Calendar events, kept fresh with incremental sync"""
+import os
+import logging
+import threading
+import time
+from datetime import datetime, date, timedelta
+from typing import List, Optional
+from zoneinfo import ZoneInfo
+from googleapiclient.errors import HttpError
+from tools.cache import TTLCache
+from tools.calendar_index import EventIndex
+from tools.contacts import record_contacts, contacts_from_events
+from tools.executor import run_in_background
+
+# How old the mirror may get before a read triggers an incremental sync (seconds)
+CALENDAR_SYNC_MAX_STALENESS = float(os.getenv("CALENDAR_SYNC_MAX_STALENESS", "60"))
+
+# A full sync mirrors events from this many days back to this many days ahead, so
+# open-ended recurring events don't expand over the user's whole history; queries
+# outside the window go to the API
+CALENDAR_SYNC_PAST_DAYS = int(os.getenv("CALENDAR_SYNC_PAST_DAYS", "30"))
+CALENDAR_SYNC_FUTURE_DAYS = int(os.getenv("CALENDAR_SYNC_FUTURE_DAYS", "365"))
+
+# Largest page the events API allows
+_SYNC_PAGE_SIZE = 2500
+
+def is_busy(event: dict) -> bool:
+    """Whether an event blocks time (not marked 'free' and not declined)"""
+    if event.get('transparency') == 'transparent':
+        return False
+    for attendee in event.get('attendees', []):
+        if attendee.get('self') and attendee.get('responseStatus') == 'declined':
+            return False
+    return True
+
+def parse_event_time(value: dict, tz: ZoneInfo) -> datetime:
+    """Parse an event 'start'/'end' field into an aware datetime"""
+    if 'dateTime' in value:
+        parsed = datetime.fromisoformat(value['dateTime'].replace('Z', '+00:00'))
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=tz)
+        return parsed
+    
+    # All-day events only carry a date, which starts at midnight in the user's timezone
+    day = date.fromisoformat(value['date'])
+    return datetime(day.year, day.month, day.day, tzinfo=tz)
+
+class CalendarStore:
+    """Events of one user's primary calendar, synced with Google's syncToken.
+    
+    Syncs fetch pages without holding the data lock, so reads and tool-side
+    updates on the event loop never wait on Google; each page is applied
+    under the lock. Changes tools make while a sync is running are replayed
+    over its results, and an event is never replaced by an older copy.
+    
+    Only [window_start, window_end) is complete: full syncs are bounded to
+    it, and callers check covers() before trusting a query. Until the first
+    full sync finishes the mirror covers nothing.
+    """
+    
+    def __init__(self, user_id: Optional[str], timezone: Optional[str] = None):
+        self.user_id = user_id
+        self.tz = ZoneInfo(timezone or 'UTC')
+        self.sync_token = None
+        self.last_synced = 0.0
+        self.window_start = None
+        self.window_end = None
+        self._events = {}  # event id -> (start, end, event)
+        self._index = EventIndex()
+        self._free_ids = set()  # events that don't block time
+        self._lock = threading.RLock()  # guards the events; held only briefly
+        self._sync_lock = threading.Lock()  # one sync at a time
+        self._local_changes = None  # event id -> event (None if removed) while a sync runs
+        self._background_sync = None  # Future of the sync started by start_sync()
+    
+    def _is_fresh(self, max_staleness: float) -> bool:
+        return bool(self.sync_token) and time.monotonic() - self.last_synced < max_staleness
+    
+    def ensure_fresh(self, manager, max_staleness: float = CALENDAR_SYNC_MAX_STALENESS):
+        """Sync with Google if the mirror is older than max_staleness seconds"""
+        if self._is_fresh(max_staleness):
+            return
+        with self._sync_lock:
+            # Another thread may have synced while we waited
+            if self._is_fresh(max_staleness):
+                return
+            self._sync(manager)
+    
+    def sync(self, manager):
+        """Run an incremental sync, or a full sync if there is no valid sync token"""
+        with self._sync_lock:
+            self._sync(manager)
+    
+    @property
+    def ready(self) -> bool:
+        """Whether a full sync has finished, so the window is mirrored"""
+        with self._lock:
+            return self.window_start is not None
+    
+    def start_sync(self, manager):
+        """Sync on the tool executor without waiting, unless a background sync is already running"""
+        with self._lock:
+            if self._background_sync is not None and not self._background_sync.done():
+                return
+            self._background_sync = run_in_background(self.sync, manager)
+        self._background_sync.add_done_callback(self._log_background_failure)
+    
+    def _log_background_failure(self, future):
+        if future.exception() is not None:
+            # The next read starts another attempt
+            logging.warning(f"Background calendar sync for user {self.user_id} failed: {future.exception()}")
+    
+    def _sync(self, manager):
+        with self._lock:
+            self._local_changes = {}
+        try:
+            if self.sync_token:
+                try:
+                    self.sync_token = self._list_changes(manager, self._apply_page, syncToken=self.sync_token)
+                    self.last_synced = time.monotonic()
+                    return
+                except HttpError as e:
+                    if e.resp.status != 410:
+                        raise
+                    # Sync token expired - Google requires a full resync
+                    print(f"🔍 DEBUG: Sync token expired for user {self.user_id}, running full sync")
+            
+            # Collected first and swapped in at once, so readers never see a half-empty mirror.
+            # Incremental syncs from its token carry no window; Google only allows one here
+            now = datetime.now(self.tz)
+            window_start = now - timedelta(days=CALENDAR_SYNC_PAST_DAYS)
+            window_end = now + timedelta(days=CALENDAR_SYNC_FUTURE_DAYS)
+            events = []
+            sync_token = self._list_changes(
+                manager,
+                events.extend,
+                timeMin=window_start.isoformat(),
+                timeMax=window_end.isoformat()
+            )
+            with self._lock:
+                self._clear()
+                self._apply_page(events)
+                for event_id, event in self._local_changes.items():
+                    if event is None:
+                        self._remove_locked(event_id)
+                    else:
+                        self._apply_locked(event)
+                self.sync_token = sync_token
+                self.window_start = window_start
+                self.window_end = window_end
+            self.last_synced = time.monotonic()
+            print(f"🔍 DEBUG: Full calendar sync for user {self.user_id}: {len(self._events)} events")
+        finally:
+            with self._lock:
+                self._local_changes = None
+    
+    def _list_changes(self, manager, on_page, **params) -> Optional[str]:
+        """Page through events().list, handing each page to on_page, and return the next sync token"""
+        page_token = None
+        while True:
+            result = manager.execute(manager.service.events().list(
+                calendarId='primary',
+                singleEvents=True,
+                showDeleted=True,
+                maxResults=_SYNC_PAGE_SIZE,
+                pageToken=page_token,
+                **params
+            ))
+            
+            items = result.get('items', [])
+            on_page(items)
+            
+            # Attendees feed the contact index used to resolve "email John"; sightings are
+            # keyed by event, so resyncs and recurring instances don't count them again
+            record_contacts(self.user_id, contacts_from_events(items))
+            
+            page_token = result.get('nextPageToken')
+            if not page_token:
+                return result.get('nextSyncToken')
+    
+    def _apply_page(self, items: List[dict]):
+        with self._lock:
+            local = self._local_changes or {}
+            for event in items:
+                if event['id'] in local and local[event['id']] is None:
+                    # Deleted through a tool after this page was fetched
+                    continue
+                self._apply_locked(event)
+    
+    def apply(self, event: dict):
+        """Insert, replace or remove an event from an API response"""
+        with self._lock:
+            if self._local_changes is not None:
+                self._local_changes[event['id']] = None if event.get('status') == 'cancelled' else event
+            self._apply_locked(event)
+    
+    def _apply_locked(self, event: dict):
+        if event.get('status') == 'cancelled':
+            self._remove_locked(event['id'])
+            return
+        
+        current = self._events.get(event['id'])
+        if current is not None and current[2].get('updated', '') > event.get('updated', ''):
+            # A sync page fetched before a tool's own update
+            return
+        
+        try:
+            start = parse_event_time(event['start'], self.tz)
+            end = parse_event_time(event['end'], self.tz)
+        except (KeyError, ValueError) as e:
+            logging.warning(f"Skipping calendar event {event.get('id')} with unreadable times: {e}")
+            return
+        
+        self._events[event['id']] = (start, end, event)
+        self._index.add(event['id'], start, end)
+        if is_busy(event):
+            self._free_ids.discard(event['id'])
+        else:
+            self._free_ids.add(event['id'])
+    
+    def remove(self, event_id: str):
+        """Remove an event deleted through the API"""
+        with self._lock:
+            if self._local_changes is not None:
+                self._local_changes[event_id] = None
+            self._remove_locked(event_id)
+    
+    def _remove_locked(self, event_id: str):
+        self._events.pop(event_id, None)
+        self._index.remove(event_id)
+        self._free_ids.discard(event_id)
+    
+    def _clear(self):
+        self._events.clear()
+        self._index.clear()
+        self._free_ids.clear()
+    
+    def covers(self, time_min: datetime, time_max: Optional[datetime]) -> bool:
+        """Whether the mirror holds every event overlapping [time_min, time_max)"""
+        with self._lock:
+            return (
+                self.window_start is not None and time_max is not None
+                and self.window_start <= time_min and time_max <= self.window_end
+            )
+    
+    def get(self, event_id: str) -> Optional[dict]:
+        """Get a cached event by ID"""
+        with self._lock:
+            entry = self._events.get(event_id)
+            return entry[2] if entry else None
+    
+    def events_between(self, time_min: datetime, time_max: Optional[datetime] = None) -> List[dict]:
+        """Events overlapping [time_min, time_max), ordered by start time"""
+        with self._lock:
+            return [self._events[event_id][2] for event_id in self._index.overlapping(time_min, time_max)]
+    
+    def find_conflicts(self, start: datetime, end: datetime, exclude_id: Optional[str] = None) -> List[dict]:
+        """Busy events overlapping a proposed [start, end) slot"""
+        with self._lock:
+            return [
+                self._events[event_id][2]
+                for event_id in self._index.conflicts(start, end, exclude_id)
+                if event_id not in self._free_ids
+            ]
+    
+    def next_free_slot(
+        self,
+        after: datetime,
+        duration: timedelta,
+        until: Optional[datetime] = None,
+        exclude_id: Optional[str] = None
+    ) -> Optional[datetime]:
+        """Earliest start >= after where `duration` fits between busy events"""
+        with self._lock:
+            ignore_ids = self._free_ids | {exclude_id} if exclude_id else self._free_ids
+            return self._index.next_free_slot(after, duration, until, ignore_ids)
+    
+    def find_by_title(self, title: str, time_min: datetime, time_max: datetime) -> List[dict]:
+        """Events in the window whose title contains `title` (case-insensitive)"""
+        title_lower = title.lower()
+        return [
+            event for event in self.events_between(time_min, time_max)
+            if title_lower in event.get('summary', '').lower()
+        ]
+
+# Mirrors keyed by user_id; they outlive the managers so a new manager doesn't force a full sync
+_calendar_stores = TTLCache(
+    maxsize=int(os.getenv("CALENDAR_STORE_CACHE_SIZE", "256")),
+    ttl=float(os.getenv("CALENDAR_STORE_CACHE_TTL", "21600"))
+)
+
+def get_calendar_store(manager, max_staleness: float = CALENDAR_SYNC_MAX_STALENESS) -> CalendarStore:
+    """Get the user's calendar mirror, syncing it if it's stale (blocking).
+    
+    The first full sync runs in the background instead of holding up the
+    caller; until it finishes covers() is False and reads go to the API.
+    """
+    store = _calendar_stores.get_or_create(
+        manager.user_id,
+        lambda: CalendarStore(manager.user_id, manager.timezone)
+    )
+    if store.ready:
+        store.ensure_fresh(manager, max_staleness)
+    else:
+        store.start_sync(manager)
+    return store
+
+def fetch_events_between(manager, time_min: datetime, time_max: datetime, max_results: int = _SYNC_PAGE_SIZE) -> List[dict]:
+    """Events overlapping [time_min, time_max) straight from the API, for ranges the mirror doesn't cover (blocking)"""
+    result = manager.execute(manager.service.events().list(
+        calendarId='primary',
+        timeMin=time_min.isoformat(),
+        timeMax=time_max.isoformat(),
+        singleEvents=True,
+        orderBy='startTime',
+        maxResults=max_results
+    ))
+    return result.get('items', [])
+
+def query_events(store: CalendarStore, manager, time_min: datetime, time_max: datetime, max_results: int = _SYNC_PAGE_SIZE) -> List[dict]:
+    """Events overlapping [time_min, time_max) from the mirror if it covers the range, else from the API (blocking)"""
+    if store.covers(time_min, time_max):
+        return store.events_between(time_min, time_max)[:max_results]
+    return fetch_events_between(manager, time_min, time_max, max_results)
+
+def get_cached_calendar_store(user_id: Optional[str]) -> Optional[CalendarStore]:
+    """Get the user's calendar mirror without syncing, if one exists"""
+    return _calendar_stores.get(user_id)
@@ -0,0 +1,312 @@
+# tools/contacts.py
+"""Per-user contact index so spoken names resolve to email addresses locally"""
+import bisect
+import heapq
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from difflib import SequenceMatcher
+from typing import Iterable, List, Optional, Tuple
+from tools.cache import TTLCache
+
+# Where contacts are kept between worker restarts
+CONTACTS_DB_PATH = os.getenv("CONTACTS_DB_PATH", "contacts.db")
+
+# Matches scoring below this are not worth offering
+MIN_MATCH_SCORE = 0.5
+
+# Contacts sharing the most trigrams with a misspelt query that get scored in full
+FUZZY_CANDIDATES = 50
+
+_NON_WORD = re.compile(r'[^a-z0-9]+')
+_LOCAL_PART_SEPARATORS = re.compile(r'[._\-+0-9]+')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS contacts (
+    user_id TEXT NOT NULL,
+    email TEXT NOT NULL,
+    name TEXT NOT NULL DEFAULT '',
+    seen_count INTEGER NOT NULL DEFAULT 0,
+    last_seen REAL NOT NULL,
+    PRIMARY KEY (user_id, email, name)
+);
+CREATE TABLE IF NOT EXISTS contact_sightings (
+    user_id TEXT NOT NULL,
+    source TEXT NOT NULL,
+    email TEXT NOT NULL,
+    PRIMARY KEY (user_id, source, email)
+) WITHOUT ROWID;
+"""
+
+# (email, name, source): source identifies where an address was seen (e.g. one
+# calendar event), so seeing it there again doesn't count twice; None always counts
+Sighting = Tuple[str, Optional[str], Optional[str]]
+
+def normalize_name(text: str) -> str:
+    """Lowercase and collapse punctuation so 'Smith, John' and 'john smith' share tokens"""
+    text = text.strip().lower()
+    if '@' in text:
+        # Addresses are matched as a single token
+        return text
+    return ' '.join(_NON_WORD.sub(' ', text).split())
+
+def name_from_email(email: str) -> str:
+    """Best-effort name from an address's local part ('john.smith@x' -> 'john smith')"""
+    local = email.split('@', 1)[0].lower()
+    return ' '.join(_LOCAL_PART_SEPARATORS.split(local)).strip()
+
+def trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class ContactIndex:
+    """In-memory contacts of one user with prefix and trigram lookup.
+    
+    Every name token is kept in a sorted list, so "jo" finds "john" and
+    "jonas" by bisecting; a trigram index catches misspellings and
+    mis-transcriptions ("jon smyth").
+    """
+    
+    def __init__(self):
+        self._contacts = {}  # email -> {'names': set, 'count': int, 'last_seen': float}
+        self._tokens = []  # sorted (token, email)
+        self._trigrams = defaultdict(set)  # trigram -> emails
+        self._sources = set()  # (source, email) sightings already counted
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return len(self._contacts)
+    
+    def add(
+        self,
+        email: str,
+        name: Optional[str] = None,
+        count: int = 1,
+        last_seen: Optional[float] = None,
+        source: Optional[str] = None
+    ):
+        """Record a sighting of an address, optionally with a display name and where it was seen"""
+        email = email.strip().lower()
+        if '@' not in email:
+            return
+        
+        with self._lock:
+            if source is not None:
+                if (source, email) in self._sources:
+                    return
+                self._sources.add((source, email))
+            
+            contact = self._contacts.get(email)
+            if contact is None:
+                contact = {'names': set(), 'count': 0, 'last_seen': 0.0}
+                self._contacts[email] = contact
+                self._index_name(email, name_from_email(email))
+                self._index_name(email, email)
+            
+            contact['count'] += count
+            contact['last_seen'] = max(contact['last_seen'], last_seen or time.time())
+            
+            name = normalize_name(name) if name else ''
+            if name and name not in contact['names']:
+                contact['names'].add(name)
+                self._index_name(email, name)
+    
+    def _index_name(self, email: str, name: str):
+        for token in name.split():
+            key = (token, email)
+            i = bisect.bisect_left(self._tokens, key)
+            if i == len(self._tokens) or self._tokens[i] != key:
+                self._tokens.insert(i, key)
+        for trigram in trigrams(name):
+            self._trigrams[trigram].add(email)
+    
+    def search(self, query: str, limit: int = 3) -> List[Tuple[str, str, float]]:
+        """Best (email, display name, score) matches for a spoken name or partial address"""
+        query = normalize_name(query)
+        if not query:
+            return []
+        
+        with self._lock:
+            candidates = set()
+            
+            # Prefix matches on any name token
+            for token in query.split():
+                i = bisect.bisect_left(self._tokens, (token, ''))
+                while i < len(self._tokens) and self._tokens[i][0].startswith(token):
+                    candidates.add(self._tokens[i][1])
+                    i += 1
+            matches = self._rank(query, candidates)
+            
+            # Nothing good starts that way, so fall back to contacts sharing a fair
+            # fraction of the query's trigrams (misspellings, mis-transcriptions)
+            if not matches:
+                query_trigrams = trigrams(query)
+                shared = defaultdict(int)
+                common = max(FUZZY_CANDIDATES, len(self._contacts) // 4)
+                for trigram in query_trigrams:
+                    emails = self._trigrams.get(trigram, ())
+                    # Trigrams most contacts share ("on ", "  j") say little and cost the most
+                    if len(emails) > common:
+                        continue
+                    for email in emails:
+                        shared[email] += 1
+                needed = max(1, len(query_trigrams) // 3)
+                closest = heapq.nlargest(FUZZY_CANDIDATES, shared.items(), key=lambda item: item[1])
+                matches = self._rank(query, {email for email, n in closest if n >= needed})
+        
+        matches.sort(reverse=True)
+        return [(email, display, score) for score, _, _, email, display in matches[:limit]]
+    
+    def _rank(self, query: str, candidates: set) -> list:
+        matches = []
+        for email in candidates:
+            contact = self._contacts[email]
+            score = max(
+                _score(query, name)
+                for name in contact['names'] | {name_from_email(email), email}
+            )
+            if score >= MIN_MATCH_SCORE:
+                display = max(contact['names'], key=len) if contact['names'] else ''
+                matches.append((score, contact['count'], contact['last_seen'], email, display))
+        return matches
+
+def _score(query: str, name: str) -> float:
+    """How well a query matches one name: exact > word prefixes > similar words"""
+    if query == name:
+        return 1.0
+    
+    name_tokens = name.split()
+    query_tokens = query.split()
+    if all(any(token.startswith(q) for token in name_tokens) for q in query_tokens):
+        # Every spoken word starts a word of the name; full words beat fragments
+        covered = sum(len(q) for q in query_tokens) / max(1, len(name.replace(' ', '')))
+        return 0.8 + 0.15 * min(1.0, covered)
+    
+    # Compare word by word so "jon smyth" still finds "john smith"
+    similarity = sum(
+        max(SequenceMatcher(None, q, token).ratio() for token in name_tokens)
+        for q in query_tokens
+    ) / len(query_tokens)
+    return 0.75 * similarity
+
+class ContactStore:
+    """SQLite persistence for contact indexes (blocking; run on the tool executor)"""
+    
+    def __init__(self, path: str = CONTACTS_DB_PATH):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+    
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+    
+    def load(self, user_id: str) -> List[Tuple[str, str, int, float]]:
+        with self._lock:
+            return self._connection().execute(
+                "SELECT email, name, seen_count, last_seen FROM contacts WHERE user_id = ?",
+                (user_id,)
+            ).fetchall()
+    
+    def record(self, user_id: str, sightings: Iterable[Sighting]) -> List[Sighting]:
+        """Count each sighting once per source in a single transaction; returns the ones that were new"""
+        now = time.time()
+        new = []
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for email, name, source in sightings:
+                    email = email.strip().lower()
+                    if source is not None and not conn.execute(
+                        "INSERT OR IGNORE INTO contact_sightings (user_id, source, email) VALUES (?, ?, ?)",
+                        (user_id, source, email)
+                    ).rowcount:
+                        continue
+                    conn.execute(
+                        "INSERT INTO contacts (user_id, email, name, seen_count, last_seen) VALUES (?, ?, ?, 1, ?) "
+                        "ON CONFLICT (user_id, email, name) DO UPDATE SET "
+                        "seen_count = seen_count + 1, last_seen = excluded.last_seen",
+                        (user_id, email, normalize_name(name or ''), now)
+                    )
+                    new.append((email, name, source))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return new
+
+_contact_store = ContactStore()
+
+# Loaded indexes keyed by user_id
+_contact_indexes = TTLCache(
+    maxsize=int(os.getenv("CONTACT_INDEX_CACHE_SIZE", "256")),
+    ttl=float(os.getenv("CONTACT_INDEX_CACHE_TTL", "21600"))
+)
+
+def get_contact_index(user_id: Optional[str]) -> ContactIndex:
+    """Get the user's contact index, loading it from disk on first use (blocking)"""
+    def load():
+        index = ContactIndex()
+        if user_id:
+            try:
+                for email, name, count, last_seen in _contact_store.load(user_id):
+                    index.add(email, name, count, last_seen)
+            except Exception as e:
+                logging.warning(f"Could not load contacts for user {user_id}: {e}")
+        print(f"🔍 DEBUG: Loaded {len(index)} contacts for user {user_id}")
+        return index
+    
+    return _contact_indexes.get_or_create(user_id, load)
+
+def record_contacts(user_id: Optional[str], sightings: Iterable[Tuple]):
+    """Add (email, name) or (email, name, source) sightings to the user's index and persist them (blocking)"""
+    sightings = [
+        (sighting[0], sighting[1], sighting[2] if len(sighting) > 2 else None)
+        for sighting in sightings if sighting[0] and '@' in sighting[0]
+    ]
+    if not sightings:
+        return
+    
+    index = get_contact_index(user_id)
+    if user_id:
+        try:
+            # Sightings already counted by an earlier sync or process are dropped here
+            sightings = _contact_store.record(user_id, sightings)
+        except Exception as e:
+            logging.warning(f"Could not save contacts for user {user_id}: {e}")
+    
+    for email, name, source in sightings:
+        index.add(email, name, source=source)
+
+def contacts_from_events(events: Iterable[dict]) -> List[Sighting]:
+    """(email, display name, source) of everyone but the user on a set of events.
+    
+    Instances of a recurring event share one source, so a weekly meeting
+    counts once per attendee rather than once per week.
+    """
+    sightings = []
+    for event in events:
+        if event.get('status') == 'cancelled':
+            continue
+        source = f"event:{event.get('recurringEventId') or event.get('id')}"
+        people = list(event.get('attendees', []))
+        if event.get('organizer'):
+            people.append(event['organizer'])
+        for person in people:
+            email = person.get('email', '')
+            # Skip the user, meeting rooms and calendars that aren't people
+            if person.get('self') or person.get('resource') or not email or email.endswith('calendar.google.com'):
+                continue
+            sightings.append((email, person.get('displayName'), source))
+    return sightings
@@ -0,0 +1,290 @@
+# tools/date_parsing.py
+"""Natural-language date, time and duration parsing for the calendar tools"""
+import logging
+import re
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from typing import Optional, Tuple
+from zoneinfo import ZoneInfo
+from dateutil import parser as dateutil_parser
+
+# Time used when a day is given without one ("tomorrow", "next Tuesday")
+DEFAULT_TIME = time(9, 0)
+
+WEEKDAYS = {
+    'monday': 0, 'mon': 0,
+    'tuesday': 1, 'tues': 1, 'tue': 1,
+    'wednesday': 2, 'wed': 2,
+    'thursday': 3, 'thurs': 3, 'thur': 3, 'thu': 3,
+    'friday': 4, 'fri': 4,
+    'saturday': 5, 'sat': 5,
+    'sunday': 6, 'sun': 6,
+}
+
+DAY_PARTS = {
+    'morning': time(9, 0),
+    'afternoon': time(14, 0),
+    'evening': time(18, 0),
+    'tonight': time(20, 0),
+    'night': time(20, 0),
+    'noon': time(12, 0),
+    'midday': time(12, 0),
+    'midnight': time(0, 0),
+}
+
+WORD_NUMBERS = {
+    'a': 1, 'an': 1, 'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5,
+    'six': 6, 'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10, 'eleven': 11,
+    'twelve': 12, 'fifteen': 15, 'twenty': 20, 'thirty': 30,
+    'forty-five': 45, 'forty five': 45, 'sixty': 60, 'ninety': 90,
+}
+
+UNIT_SECONDS = {
+    'w': 7 * 86400, 'wk': 7 * 86400, 'week': 7 * 86400, 'weeks': 7 * 86400,
+    'd': 86400, 'day': 86400, 'days': 86400,
+    'h': 3600, 'hr': 3600, 'hrs': 3600, 'hour': 3600, 'hours': 3600,
+    'm': 60, 'min': 60, 'mins': 60, 'minute': 60, 'minutes': 60,
+}
+
+# Grammar, compiled once at import
+_NUMBER = r'\d+(?:\.\d+)?|' + '|'.join(
+    sorted((re.escape(word) for word in WORD_NUMBERS), key=len, reverse=True)
+)
+_UNIT = '|'.join(sorted(UNIT_SECONDS, key=len, reverse=True))
+_HALF = r'\s+and\s+a\s+half'
+
+# Units may follow digits directly ("2h") but need a space after a word, so
+# "and" is never read as "an" + "d"
+_DURATION_PART_RE = re.compile(
+    rf'\b(?P<num>{_NUMBER})(?P<half_before>{_HALF})?(?:(?<=\d)\s*|\s+)(?P<unit>{_UNIT})(?![a-z])(?P<half_after>{_HALF})?'
+)
+_HALF_HOUR_RE = re.compile(r'\b(?:a\s+)?half\s+(?:an\s+)?hour\b')
+_QUARTER_HOUR_RE = re.compile(r'\b(?:a\s+)?quarter\s+(?:of\s+an\s+)?hour\b')
+_CLOCK_DURATION_RE = re.compile(r'^(\d{1,2}):(\d{2})$')
+_HOURS_MINUTES_RE = re.compile(r'^(\d+)\s*h(?:ours?|rs?)?\s*(\d{1,2})$')
+_DURATION_FILLER_RE = re.compile(r'\b(?:and|for|about|around|roughly)\b|[,\s]+')
+
+_RELATIVE_RE = re.compile(r'^in\s+(.+)$')
+_WEEK_RE = re.compile(r'^(this|next)\s+week(?:end)?$')
+_DAY_AFTER_TOMORROW_RE = re.compile(r'\bday\s+after\s+tomorrow\b')
+_DAY_WORD_RE = re.compile(r'\b(today|tomorrow|tonight)\b')
+_WEEKDAY_RE = re.compile(
+    r'\b(?:(next|this|coming)\s+)?(' + '|'.join(sorted(WEEKDAYS, key=len, reverse=True)) + r')\b'
+)
+_TIME_RE = re.compile(
+    r'^(?:at\s+)?(?:(?P<part>' + '|'.join(DAY_PARTS) + r')'
+    r'|(?P<hour>\d{1,2})(?::(?P<minute>\d{2}))?\s*(?P<meridiem>a\.?m\.?|p\.?m\.?)?)'
+    r'(?:\s+(?:in\s+the\s+)?(?P<trailing_part>morning|afternoon|evening|night))?$'
+)
+_ISO_RE = re.compile(r'^\d{4}-\d{2}-\d{2}(?:[ t]\d{1,2}:\d{2}(?::\d{2})?)?$')
+_FILLER_RE = re.compile(r'\s*\b(?:on|at)\s*$|^\s*(?:on|at)\b\s*')
+_SPACES_RE = re.compile(r'\s+')
+
+def normalize(text: str) -> str:
+    """Lowercase, drop commas/trailing punctuation and collapse whitespace"""
+    text = text.lower().replace(',', ' ').strip().rstrip('.!?')
+    return _SPACES_RE.sub(' ', text).strip()
+
+@lru_cache(maxsize=64)
+def get_zone(timezone: Optional[str]) -> ZoneInfo:
+    """ZoneInfo for a timezone name, falling back to UTC if it's invalid"""
+    try:
+        return ZoneInfo(timezone or 'UTC')
+    except Exception:
+        return ZoneInfo('UTC')
+
+def _number(token: str) -> float:
+    return float(WORD_NUMBERS.get(token, token))
+
+def _parse_duration(text: str) -> Optional[timedelta]:
+    """Parse a normalized duration, or None if any part of it isn't understood"""
+    match = _CLOCK_DURATION_RE.match(text) or _HOURS_MINUTES_RE.match(text)
+    if match:
+        return timedelta(hours=int(match.group(1)), minutes=int(match.group(2)))
+    
+    seconds = 0.0
+    rest = text
+    for pattern, value in ((_HALF_HOUR_RE, 1800), (_QUARTER_HOUR_RE, 900)):
+        rest, count = pattern.subn(' ', rest)
+        seconds += value * count
+    
+    def add_part(match):
+        nonlocal seconds
+        amount = _number(match.group('num'))
+        if match.group('half_before') or match.group('half_after'):
+            amount += 0.5
+        seconds += amount * UNIT_SECONDS[match.group('unit')]
+        return ' '
+    
+    rest = _DURATION_PART_RE.sub(add_part, rest)
+    if seconds <= 0 or _DURATION_FILLER_RE.sub('', rest):
+        return None
+    return timedelta(seconds=seconds)
+
+@lru_cache(maxsize=1024)
+def _parse_duration_cached(text: str) -> Optional[timedelta]:
+    return _parse_duration(text)
+
+def parse_duration_string(duration_str: str) -> timedelta:
+    """Parse duration strings like '1 hour', '90 minutes', '1.5 hours', 'an hour and a half'"""
+    parsed = _parse_duration_cached(normalize(duration_str))
+    if parsed is None:
+        # Default to 1 hour
+        return timedelta(hours=1)
+    return parsed
+
+def _parse_time(text: str, evening: bool = False) -> Optional[time]:
+    """Parse a normalized time of day ("2pm", "at 10:30", "noon", "3 in the afternoon").
+    
+    With evening set (e.g. "tonight at 9"), a bare hour is read as PM.
+    """
+    match = _TIME_RE.match(text)
+    if not match:
+        return None
+    
+    if match.group('part'):
+        return DAY_PARTS[match.group('part')]
+    
+    hour = int(match.group('hour'))
+    minute = int(match.group('minute') or 0)
+    meridiem = (match.group('meridiem') or '').replace('.', '')
+    trailing = match.group('trailing_part')
+    if meridiem == 'pm' or (not meridiem and (evening or trailing in ('afternoon', 'evening', 'night'))):
+        if hour < 12:
+            hour += 12
+    elif meridiem == 'am' and hour == 12:
+        hour = 0
+    
+    if hour > 23 or minute > 59:
+        return None
+    return time(hour, minute)
+
+def _at(day: date, rest: str, evening: bool = False) -> Optional[Tuple[str, datetime]]:
+    """Combine a day with the time in `rest`, defaulting to DEFAULT_TIME"""
+    rest = _FILLER_RE.sub('', rest).strip()
+    if not rest:
+        return ('local', datetime.combine(day, DEFAULT_TIME))
+    parsed_time = _parse_time(rest, evening)
+    if parsed_time is None:
+        return None
+    return ('local', datetime.combine(day, parsed_time))
+
+@lru_cache(maxsize=4096)
+def _parse_spec(text: str, reference_day: date) -> Tuple[str, object]:
+    """Parse normalized text into a zone-free spec, memoized per reference day.
+    
+    Returns one of:
+      ('delta', timedelta)  - relative to the current time ("in 3 hours")
+      ('local', datetime)   - naive wall-clock time in the user's timezone
+      ('aware', datetime)   - explicit offset given in the text
+      ('error', message)    - not understood
+    """
+    # "in 3 hours", "in an hour and a half"
+    match = _RELATIVE_RE.match(text)
+    if match:
+        delta = _parse_duration(match.group(1))
+        if delta is not None:
+            return ('delta', delta)
+    
+    # "this week", "next week" (the day itself; see parse_date_range for the span)
+    match = _WEEK_RE.match(text)
+    if match:
+        offset = 7 if match.group(1) == 'next' else 0
+        return ('local', datetime.combine(reference_day + timedelta(days=offset), DEFAULT_TIME))
+    
+    # "day after tomorrow [time]"
+    match = _DAY_AFTER_TOMORROW_RE.search(text)
+    if match:
+        spec = _at(reference_day + timedelta(days=2), text[:match.start()] + text[match.end():])
+        if spec:
+            return spec
+    
+    # "today/tomorrow/tonight [time]"
+    match = _DAY_WORD_RE.search(text)
+    if match:
+        word = match.group(1)
+        rest = (text[:match.start()] + text[match.end():]).strip()
+        day = reference_day + timedelta(days=1 if word == 'tomorrow' else 0)
+        if word == 'tonight' and not rest:
+            return ('local', datetime.combine(day, DAY_PARTS['tonight']))
+        if word == 'today' and not _FILLER_RE.sub('', rest).strip():
+            # "today" with no time means an hour from now
+            return ('delta', timedelta(hours=1))
+        spec = _at(day, rest, evening=word == 'tonight')
+        if spec:
+            return spec
+    
+    # "[next|this] Tuesday [at 10]"
+    match = _WEEKDAY_RE.search(text)
+    if match:
+        qualifier, name = match.group(1), match.group(2)
+        days_ahead = WEEKDAYS[name] - reference_day.weekday()
+        if qualifier in ('next', 'coming'):
+            # The coming occurrence, never today
+            if days_ahead <= 0:
+                days_ahead += 7
+        else:
+            days_ahead %= 7
+        spec = _at(reference_day + timedelta(days=days_ahead), text[:match.start()] + text[match.end():])
+        if spec:
+            return spec
+    
+    # "2pm", "at 15:30", "noon"
+    parsed_time = _parse_time(text)
+    if parsed_time is not None:
+        return ('local', datetime.combine(reference_day, parsed_time))
+    
+    # "2024-01-15", "2024-01-15 14:30"
+    if _ISO_RE.match(text):
+        parsed = datetime.fromisoformat(text.replace('t', ' '))
+        if len(text) == 10:
+            parsed = datetime.combine(parsed.date(), DEFAULT_TIME)
+        return ('local', parsed)
+    
+    # Anything else goes to dateutil's general parser
+    try:
+        parsed = dateutil_parser.parse(text, default=datetime.combine(reference_day, DEFAULT_TIME))
+    except (ValueError, OverflowError) as e:
+        return ('error', str(e))
+    return ('aware', parsed) if parsed.tzinfo else ('local', parsed)
+
+def parse_datetime_string(date_str: str, user_timezone: str = 'UTC', now: Optional[datetime] = None) -> datetime:
+    """Parse natural language date/time strings with proper timezone handling"""
+    tz = get_zone(user_timezone)
+    now = now.astimezone(tz) if now else datetime.now(tz)
+    
+    kind, value = _parse_spec(normalize(date_str), now.date())
+    if kind == 'delta':
+        return now + value
+    if kind == 'local':
+        return value.replace(tzinfo=tz)
+    if kind == 'aware':
+        return value.astimezone(tz)
+    
+    logging.warning(f"Failed to parse date string '{date_str}': {value}")
+    # Fallback to 1 hour from now in user's timezone
+    return now + timedelta(hours=1)
+
+def parse_date_range(date_str: Optional[str], user_timezone: str = 'UTC', now: Optional[datetime] = None) -> Tuple[datetime, datetime, bool]:
+    """Parse a day or week expression into (start, end, is_range), both at midnight"""
+    tz = get_zone(user_timezone)
+    now = now.astimezone(tz) if now else datetime.now(tz)
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    text = normalize(date_str or '')
+    if text in ('', 'today'):
+        # A bare "today" parses as an hour from now, which is tomorrow late in the evening
+        return today, today + timedelta(days=1), False
+    
+    match = _WEEK_RE.match(text)
+    if match:
+        # Weeks run Monday to Sunday
+        start = today - timedelta(days=today.weekday())
+        if match.group(1) == 'next':
+            start += timedelta(days=7)
+        if text.endswith('weekend'):
+            start += timedelta(days=5)
+            return start, start + timedelta(days=2), True
+        return start, start + timedelta(days=7), True
+    
+    day = parse_datetime_string(text, user_timezone, now).replace(hour=0, minute=0, second=0, microsecond=0)
+    return day, day + timedelta(days=1), False
@@ -0,0 +1,318 @@
+# tools/email_outbox.py
+"""Background outbox so email tools return before Gmail has sent the message.
+
+Emails are written to a durable local store before the tool returns, so a
+crash or restart between queueing and sending doesn't lose them: the next
+process to start the outbox claims and sends whatever is still pending.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional
+import httplib2
+from googleapiclient.errors import HttpError
+from tools.executor import run_blocking
+from tools.google_api import BATCH_LIMIT
+from tools.outbox_store import OutboxStore
+
+# Attempts per email before giving up and reporting the failure
+EMAIL_SEND_MAX_ATTEMPTS = int(os.getenv("EMAIL_SEND_MAX_ATTEMPTS", "4"))
+
+# Delay before the first retry (seconds); doubles on every further attempt
+EMAIL_SEND_RETRY_DELAY = float(os.getenv("EMAIL_SEND_RETRY_DELAY", "2"))
+
+# Emails sent concurrently per process
+EMAIL_OUTBOX_WORKERS = int(os.getenv("EMAIL_OUTBOX_WORKERS", "2"))
+
+# Finished emails are written to the store in batches of up to this many,
+# or after EMAIL_OUTBOX_FLUSH_INTERVAL seconds, whichever comes first
+EMAIL_OUTBOX_FLUSH_SIZE = int(os.getenv("EMAIL_OUTBOX_FLUSH_SIZE", "50"))
+EMAIL_OUTBOX_FLUSH_INTERVAL = float(os.getenv("EMAIL_OUTBOX_FLUSH_INTERVAL", "0.5"))
+
+# Pending emails claimed at a time when draining the store after a restart
+EMAIL_OUTBOX_CLAIM_BATCH = int(os.getenv("EMAIL_OUTBOX_CLAIM_BATCH", "500"))
+
+# Gmail answers these when it's overloaded or rate limiting, so the send is worth retrying
+RETRYABLE_STATUSES = {408, 429, 500, 502, 503, 504}
+
+@dataclass
+class OutgoingEmail:
+    """An email waiting in the outbox"""
+    id: str  # idempotency key
+    user_id: Optional[str]
+    to: str
+    subject: str
+    message: dict  # Gmail API message body ({'raw': ...})
+    credentials: Any = None  # None for emails recovered from the store
+    session: Any = None  # SessionContext to report failures to, if still live
+    attempts: int = 0
+
+def idempotency_key(*parts: Optional[str]) -> str:
+    """Stable key for an email, so the same request queued twice is only sent once"""
+    digest = hashlib.sha256(json.dumps(parts).encode('utf-8'))
+    return digest.hexdigest()[:32]
+
+def is_retryable(error: Exception) -> bool:
+    """Whether a failed send might succeed if tried again"""
+    if isinstance(error, HttpError):
+        return error.resp.status in RETRYABLE_STATUSES
+    return isinstance(error, (httplib2.HttpLib2Error, OSError, TimeoutError))
+
+class EmailOutbox:
+    """Durable queue of emails sent by background workers on the event loop.
+    
+    send(email) is blocking and runs on the tool executor. If send_batch is
+    given, workers hand it up to batch_size queued emails at a time and it
+    returns one error (or None) per email. on_failure(email, error) is
+    awaited once an email has failed for good. Sends are
+    at-least-once: an email whose result was not yet committed when the
+    process died is sent again, with the same Message-ID.
+    
+    One outbox serves every session in the process: each session calls
+    start() and, when it ends, aclose(); the workers stop only once the last
+    session has closed.
+    """
+    
+    def __init__(
+        self,
+        send: Callable[[OutgoingEmail], Any],
+        on_failure: Optional[Callable] = None,
+        store: Optional[OutboxStore] = None,
+        send_batch: Optional[Callable[[List[OutgoingEmail]], List[Optional[Exception]]]] = None,
+        batch_size: int = BATCH_LIMIT,
+        max_attempts: int = EMAIL_SEND_MAX_ATTEMPTS,
+        retry_delay: float = EMAIL_SEND_RETRY_DELAY,
+        workers: int = EMAIL_OUTBOX_WORKERS
+    ):
+        self._send = send
+        self._on_failure = on_failure
+        self._send_batch = send_batch
+        self.batch_size = batch_size
+        self.store = store or OutboxStore()
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.workers = workers
+        self._queue = None
+        self._tasks = []
+        self._loop = None
+        self._recover_task = None
+        self._sessions = 0
+        self._results = []  # (id, status, error) not yet written to the store
+        self._flush_now = None
+    
+    def __len__(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+    
+    async def enqueue(self, email: OutgoingEmail) -> bool:
+        """Store an email and queue it for sending.
+        
+        Returns False if an email with the same idempotency key was already queued.
+        """
+        return bool(await self.enqueue_many([email]))
+    
+    async def enqueue_many(self, emails: List[OutgoingEmail]) -> List[OutgoingEmail]:
+        """Store emails in one transaction, then queue them together.
+        
+        They land on the queue at once, so one worker takes them as a single
+        batch. Returns the emails that weren't already queued.
+        """
+        self._ensure_workers()
+        # The emails must be durable before the tool returns; the SQLite write can wait
+        # on locks held by other processes, so it runs on the tool executor
+        inserted = await run_blocking(
+            self.store.append_many,
+            [(email.id, email.user_id, email.to, email.subject, email.message) for email in emails]
+        )
+        
+        queued = []
+        for email in emails:
+            if email.id not in inserted:
+                print(f"📧 Email {email.id} to {email.to} is already in the outbox")
+                continue
+            inserted.discard(email.id)
+            self._queue.put_nowait(email)
+            queued.append(email)
+        
+        if queued:
+            print(f"📧 Queued {len(queued)} email(s) ({len(self)} pending)")
+        return queued
+    
+    async def start(self):
+        """Register a session; the first one starts the workers and sends whatever earlier processes left in the store"""
+        self._sessions += 1
+        self._ensure_workers()
+        if self._recover_task is None or self._recover_task.cancelled():
+            self._recover_task = self._loop.create_task(self._recover(), name="email-outbox-recover")
+            self._tasks.append(self._recover_task)
+    
+    def _ensure_workers(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._tasks:
+            return
+        
+        if self._loop is not loop:
+            # Workers restarted on the same loop pick up whatever is still queued
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._flush_now = asyncio.Event()
+            self._recover_task = None
+        self._tasks = [
+            loop.create_task(self._run(), name=f"email-outbox-{i}")
+            for i in range(self.workers)
+        ]
+        self._tasks.append(loop.create_task(self._flush_loop(), name="email-outbox-flush"))
+    
+    async def _recover(self):
+        try:
+            await run_blocking(self.store.compact)
+            while True:
+                rows = await run_blocking(self.store.claim_pending, EMAIL_OUTBOX_CLAIM_BATCH)
+                if not rows:
+                    return
+                
+                print(f"📧 Recovered {len(rows)} unsent email(s) from the outbox")
+                for row in rows:
+                    self._queue.put_nowait(OutgoingEmail(
+                        id=row['id'],
+                        user_id=row['user_id'],
+                        to=row['to_addr'],
+                        subject=row['subject'],
+                        message=json.loads(row['message'])
+                    ))
+                # Claim the next batch only once this one is sent, so claims don't outlive their lease
+                await self._queue.join()
+        except Exception as e:
+            logging.error(f"Could not recover emails from the outbox: {e}")
+    
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            # Take whatever else is already waiting, up to one batch request's worth
+            while self._send_batch is not None and len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            
+            try:
+                if len(batch) == 1:
+                    await self._deliver(batch[0])
+                else:
+                    await self._deliver_batch(batch)
+            except Exception as e:
+                logging.error(f"Email outbox worker error for {[email.id for email in batch]}: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+    
+    async def _deliver(self, email: OutgoingEmail):
+        while True:
+            if not await self._owned([email]):
+                return
+            email.attempts += 1
+            try:
+                await run_blocking(self._send, email)
+                self._record(email, 'sent')
+                return
+            except Exception as e:
+                if not await self._should_retry(email, e):
+                    return
+                await asyncio.sleep(self._retry_delay(email))
+    
+    async def _deliver_batch(self, batch: List[OutgoingEmail]):
+        batch = await self._owned(batch)
+        if not batch:
+            return
+        for email in batch:
+            email.attempts += 1
+        
+        try:
+            errors = await run_blocking(self._send_batch, batch)
+        except Exception as e:
+            # The batch request itself failed, so every email in it did
+            errors = [e] * len(batch)
+        
+        retry = []
+        for email, error in zip(batch, errors):
+            if error is None:
+                self._record(email, 'sent')
+            elif await self._should_retry(email, error):
+                retry.append(email)
+        
+        if retry:
+            await asyncio.sleep(self._retry_delay(retry[0]))
+            await asyncio.gather(*(self._deliver(email) for email in retry))
+    
+    async def _owned(self, emails: List[OutgoingEmail]) -> List[OutgoingEmail]:
+        """Renew our lease on emails right before an attempt, dropping any another process took over.
+        
+        Waiting behind a backlog or in retry backoff can outlast the lease,
+        after which another process's recovery may claim and send the email.
+        """
+        owned = await run_blocking(self.store.renew_claims, [email.id for email in emails])
+        for email in emails:
+            if email.id not in owned:
+                logging.warning(f"Email {email.id} to {email.to} was taken over by another process, not sending it here")
+        return [email for email in emails if email.id in owned]
+    
+    async def _should_retry(self, email: OutgoingEmail, error: Exception) -> bool:
+        """Whether to try a failed email again; records and reports it if not"""
+        if email.attempts < self.max_attempts and is_retryable(error):
+            print(f"📧 WARNING: Sending email {email.id} failed ({error}), retrying in {self._retry_delay(email):.0f}s")
+            return True
+        
+        logging.error(f"Giving up on email {email.id} to {email.to} after {email.attempts} attempt(s): {error}")
+        self._record(email, 'failed', str(error))
+        if self._on_failure is not None:
+            await self._on_failure(email, error)
+        return False
+    
+    def _retry_delay(self, email: OutgoingEmail) -> float:
+        return self.retry_delay * 2 ** (email.attempts - 1)
+    
+    def _record(self, email: OutgoingEmail, status: str, error: Optional[str] = None):
+        self._results.append((email.id, status, error))
+        if len(self._results) >= EMAIL_OUTBOX_FLUSH_SIZE:
+            self._flush_now.set()
+    
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_now.wait(), EMAIL_OUTBOX_FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_now.clear()
+            await self._flush()
+    
+    async def _flush(self):
+        """Commit buffered results in one transaction"""
+        results, self._results = self._results, []
+        if not results:
+            return
+        try:
+            await run_blocking(self.store.record_results, results)
+        except Exception as e:
+            # Keep them for the next flush; if the process dies first they're sent again
+            logging.error(f"Could not record {len(results)} outbox result(s): {e}")
+            self._results = results + self._results
+    
+    async def aclose(self, timeout: float = 30):
+        """Unregister a session; after the last one, wait (up to timeout seconds) for queued emails to be sent, then stop the workers"""
+        self._sessions = max(self._sessions - 1, 0)
+        if self._sessions or not self._tasks:
+            return
+        
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logging.warning(f"Email outbox closed with {len(self)} email(s) unsent; they stay in the store")
+        
+        if self._sessions:
+            # A new session started while we were draining; it keeps the workers
+            return
+        
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self._flush()
@@ -1,100 +1,45 @@
 # tools/email_tools.py
-import logging
 import os
-import json
+import re
+import asyncio
+import logging
 import base64
+import uuid
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from email.utils import make_msgid
 from typing import Optional
 from livekit.agents import function_tool, RunContext
-from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
-from google.auth.transport.requests import Request
-from supabase import create_client
-from tools.room_context import get_current_room_name
+from google.auth.exceptions import RefreshError
+from tools.room_context import SessionContext, get_session_context
+from tools.supabase_client import credential_store
+from tools.google_api import build_service, execute, execute_batch
+from tools.executor import run_blocking
+from tools.email_outbox import EmailOutbox, OutgoingEmail, idempotency_key
+from tools.contacts import get_contact_index, record_contacts
+from tools.google_calendar_tools import get_calendar_manager
+from tools.calendar_store import get_calendar_store
 
 logger = logging.getLogger(__name__)
 
 # Gmail API scopes
 SCOPES = ['https://www.googleapis.com/auth/gmail.send']
 
-# Supabase client cache
-_supabase_client_cache = None
+# {field} placeholders in bulk email subjects and bodies
+TEMPLATE_FIELD = re.compile(r'\{(\w+)\}')
 
-def get_supabase_client():
-    """Get Supabase client for agent worker (singleton pattern)"""
-    global _supabase_client_cache
-    
-    if _supabase_client_cache is None:
-        supabase_url = os.getenv("SUPABASE_URL")
-        supabase_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
-        
-        if not supabase_url or not supabase_key:
-            raise Exception("Supabase credentials not found in environment")
-        
-        _supabase_client_cache = create_client(supabase_url, supabase_key)
-    
-    return _supabase_client_cache
+# Domain for generated Message-IDs when the sender has no address of its own ('me');
+# fixed so building a message never does a hostname lookup
+EMAIL_MESSAGE_ID_DOMAIN = os.getenv("EMAIL_MESSAGE_ID_DOMAIN", "jarvis.local")
 
-def get_user_id_from_room(room_name: str) -> str:
-    """Get user_id from room name"""
-    try:
-        print(f"🔍 DEBUG: Looking up user_id for room: {room_name}")
-        client = get_supabase_client()
-        response = client.table("rooms").select("user_id").eq("room_name", room_name).execute()
-        
-        if response.data and len(response.data) > 0:
-            user_id = response.data[0]["user_id"]
-            print(f"🔍 DEBUG: Found user_id: {user_id} for room: {room_name}")
-            return user_id
-        else:
-            print(f"⚠️ WARNING: No user found for room: {room_name}")
-            return None
-    except Exception as e:
-        logging.error(f"Error getting user from room: {e}")
-        print(f"🔍 DEBUG: Error in get_user_id_from_room: {e}")
-        import traceback
-        traceback.print_exc()
-        return None
-
-def get_room_name_from_context(context):
-    """Helper function to get room name from multiple sources"""
-    room_name = None
-    
-    # Method 1: Get from global storage (most reliable)
-    try:
-        room_name = get_current_room_name()
-        if room_name:
-            print(f"🔍 DEBUG: Got room name from global storage: {room_name}")
-            return room_name
-    except:
-        pass
-    
-    # Method 2: Try to get from context
-    if not room_name:
-        try:
-            if hasattr(context, 'room') and hasattr(context.room, 'name'):
-                room_name = context.room.name
-                print(f"🔍 DEBUG: Got room name from context.room.name: {room_name}")
-                return room_name
-            elif hasattr(context, 'room_name'):
-                room_name = context.room_name
-                print(f"🔍 DEBUG: Got room name from context.room_name: {room_name}")
-                return room_name
-        except Exception as e:
-            print(f"🔍 DEBUG: Error getting room name from context: {e}")
-    
-    return None
+# Failures within this many seconds of each other are reported to the user together
+EMAIL_FAILURE_REPORT_DELAY = float(os.getenv("EMAIL_FAILURE_REPORT_DELAY", "2"))
 
-def get_gmail_service(room_name: str = None):
-    """Get Gmail service instance for user"""
-    user_id = None
-    
-    # Try to get user_id from room if provided
-    if room_name:
-        user_id = get_user_id_from_room(room_name)
+def get_gmail_credentials(session: Optional[SessionContext] = None):
+    """Get Gmail credentials for the session's user (cached per user in the credential store)"""
+    user_id = session.user_id if session else None
     
     if not user_id:
         print("⚠️ WARNING: Could not get user_id. Will try fallback credentials.")
@@ -102,50 +47,31 @@ def get_gmail_service(room_name: str = None):
         return None
     
     try:
-        print(f"🔍 DEBUG: Fetching Gmail credentials for user: {user_id}")
-        client = get_supabase_client()
-        response = client.table("email_credentials").select("*").eq("user_id", user_id).execute()
-        
-        if response.data and len(response.data) > 0:
-            print(f"🔍 DEBUG: Found Gmail credentials in Supabase")
-            credentials_json = response.data[0]["credentials_json"]
-            credentials_dict = json.loads(credentials_json)
-            creds = Credentials.from_authorized_user_info(credentials_dict, SCOPES)
-            
-            # Refresh if expired and save back to database
-            if creds.expired:
-                print(f"🔍 DEBUG: Credentials expired, refreshing...")
-                if creds.refresh_token:
-                    creds.refresh(Request())
-                    print(f"🔍 DEBUG: Credentials refreshed successfully")
-                    
-                    # Save refreshed credentials back to database
-                    refreshed_json = creds.to_json()
-                    client.table("email_credentials").update({
-                        "credentials_json": refreshed_json,
-                        "updated_at": "now()"
-                    }).eq("user_id", user_id).execute()
-                    print(f"🔍 DEBUG: Refreshed credentials saved to database")
-                else:
-                    print(f"⚠️ WARNING: Credentials expired but no refresh token")
-                    return None
-            
-            service = build('gmail', 'v1', credentials=creds)
-            print(f"✅ Gmail API authenticated for user {user_id}")
-            return service
-        else:
-            print(f"⚠️ WARNING: No Gmail credentials found in Supabase for user: {user_id}")
-            return None
-            
+        # Shared cache; concurrent callers share one Supabase lookup and token refresh
+        creds = credential_store.get(user_id, 'gmail', SCOPES)
     except Exception as e:
         logging.error(f"Gmail authentication failed: {e}")
         print(f"🔍 DEBUG: Gmail authentication error: {e}")
-        import traceback
-        traceback.print_exc()
         return None
+    
+    if creds is None:
+        print(f"⚠️ WARNING: No Gmail credentials found in Supabase for user: {user_id}")
+        return None
+    
+    return creds
+
+def invalidate_gmail_credentials(session: Optional[SessionContext] = None):
+    """Forget a user's cached Gmail credentials (e.g. after they were revoked)"""
+    user_id = session.user_id if session else None
+    credential_store.invalidate(user_id, 'gmail')
+    print(f"🔍 DEBUG: Invalidated cached Gmail credentials for user: {user_id}")
 
 def create_message(sender: str, to: str, subject: str, message_text: str, cc: Optional[str] = None):
     """Create a message for an email."""
+    return _build_message(sender, to, subject, MIMEText(message_text, 'plain'), cc)
+
+def _build_message(sender: str, to: str, subject: str, body, cc: Optional[str] = None):
+    """Wrap a (possibly shared) MIME body part in a message for one recipient"""
     message = MIMEMultipart()
     message['to'] = to
     message['from'] = sender
@@ -154,22 +80,140 @@ def create_message(sender: str, to: str, subject: str, message_text: str, cc: Op
     if cc:
         message['cc'] = cc
     
-    message.attach(MIMEText(message_text, 'plain'))
+    # Fixed up front so a retried send carries the same Message-ID, which lets Gmail
+    # (and clients that thread on it) recognise a duplicate
+    domain = sender.rpartition('@')[2] if '@' in sender else EMAIL_MESSAGE_ID_DOMAIN
+    message['Message-ID'] = make_msgid(domain=domain)
+    
+    message.attach(body)
     
     # Encode message in base64url format
     raw_message = base64.urlsafe_b64encode(message.as_bytes()).decode('utf-8')
     return {'raw': raw_message}
 
-def send_message(service, user_id: str, message):
+def tool_call_id(context) -> str:
+    """Id of the current tool call, so a redelivered call dedupes but asking again sends again"""
+    call = getattr(context, 'function_call', None)
+    return getattr(call, 'call_id', None) or uuid.uuid4().hex
+
+def render_template(template: str, fields: dict) -> str:
+    """Fill {field} placeholders; raises KeyError naming the first missing field"""
+    return TEMPLATE_FIELD.sub(lambda match: fields[match.group(1)], template)
+
+def parse_recipient(entry: str):
+    """Parse an "email | field=value | ..." bulk entry into (email, fields)"""
+    parts = [part.strip() for part in entry.split('|')]
+    fields = {}
+    for part in parts[1:]:
+        key, sep, value = part.partition('=')
+        if not sep or not key.strip():
+            raise ValueError(f"expected field=value, got '{part}'")
+        fields[key.strip()] = value.strip()
+    return parts[0], fields
+
+def send_message(credentials, user_id: str, message):
     """Send an email message."""
     try:
-        message = service.users().messages().send(userId=user_id, body=message).execute()
+        service = build_service('gmail', 'v1')
+        message = execute(service.users().messages().send(userId=user_id, body=message), credentials)
         print(f"📧 Message sent! Message Id: {message['id']}")
         return message
     except HttpError as error:
         print(f"📧 ERROR: An error occurred: {error}")
         raise
 
+def _credentials_for(email: OutgoingEmail):
+    """Gmail credentials to send an outbox email with"""
+    if email.credentials is None or not email.credentials.valid:
+        # Recovered from the outbox after a restart (credentials are never persisted there),
+        # or expired while queued
+        if not email.user_id:
+            raise Exception("No user for recovered email, cannot load Gmail credentials")
+        email.credentials = credential_store.get(email.user_id, 'gmail', SCOPES)
+        if email.credentials is None:
+            raise Exception(f"No Gmail credentials found for user: {email.user_id}")
+    return email.credentials
+
+def _send_outgoing(email: OutgoingEmail):
+    """Send one email from the outbox (runs on the tool executor)"""
+    send_message(_credentials_for(email), 'me', email.message)
+    logging.info(f"Email {email.id} sent successfully to {email.to}")
+
+def _send_outgoing_batch(emails: list) -> list:
+    """Send outbox emails as Gmail batch requests, one per user (runs on the tool executor)"""
+    errors = [None] * len(emails)
+    by_user = {}
+    for i, email in enumerate(emails):
+        by_user.setdefault(email.user_id, []).append(i)
+    
+    service = build_service('gmail', 'v1')
+    for user_id, indexes in by_user.items():
+        try:
+            creds = _credentials_for(emails[indexes[0]])
+        except Exception as e:
+            for i in indexes:
+                errors[i] = e
+            continue
+        
+        requests = [
+            service.users().messages().send(userId='me', body=emails[i].message)
+            for i in indexes
+        ]
+        results = execute_batch(service, requests, creds)
+        for i, (response, error) in zip(indexes, results):
+            errors[i] = error
+    
+    print(f"📧 Batch sent {errors.count(None)} of {len(emails)} emails")
+    return errors
+
+# Failed emails waiting to be reported, per session, so a failed bulk send is one message
+_unreported_failures = {}
+
+async def _report_send_failure(email: OutgoingEmail, error: Exception):
+    """Tell the user an email they asked for could not be sent"""
+    if isinstance(error, RefreshError) or (isinstance(error, HttpError) and error.resp.status == 401):
+        invalidate_gmail_credentials(email.session)
+        reason = "Gmail access has expired, please reconnect Gmail in settings"
+    else:
+        reason = str(error)
+    
+    if getattr(email.session, 'agent_session', None) is None:
+        return
+    
+    pending = _unreported_failures.setdefault(id(email.session), [])
+    pending.append((email, reason))
+    if len(pending) == 1:
+        asyncio.get_running_loop().call_later(
+            EMAIL_FAILURE_REPORT_DELAY, _flush_failure_report, email.session
+        )
+
+def _flush_failure_report(session: SessionContext):
+    failures = _unreported_failures.pop(id(session), [])
+    if not failures:
+        return
+    
+    if len(failures) == 1:
+        email, reason = failures[0]
+        instructions = (
+            f"Inform the user that the email to {email.to} with subject '{email.subject}' "
+            f"could not be sent: {reason}."
+        )
+    else:
+        details = "; ".join(f"{email.to} ({reason})" for email, reason in failures[:10])
+        instructions = f"Inform the user that {len(failures)} emails could not be sent: {details}."
+    
+    try:
+        session.agent_session.generate_reply(instructions=instructions)
+    except Exception as e:
+        logging.error(f"Could not report {len(failures)} failed email(s) to the session: {e}")
+
+# Emails are sent in the background so the voice turn doesn't wait on Gmail
+email_outbox = EmailOutbox(
+    _send_outgoing,
+    on_failure=_report_send_failure,
+    send_batch=_send_outgoing_batch
+)
+
 @function_tool()    
 async def send_email(
     context: RunContext,  # type: ignore
@@ -200,32 +244,50 @@ async def send_email(
         logging.info(f"send_email function called: to={to_email}, subject='{subject}'")
         print(f"📧 EMAIL TOOL CALLED: Sending to {to_email}")
         
-        # Get room name from context
-        room_name = get_room_name_from_context(context)
+        # Get this session's context
+        session = get_session_context(context)
         
-        if not room_name:
-            print("⚠️ WARNING: Could not extract room name. Will try to use fallback credentials.")
+        if not session:
+            print("⚠️ WARNING: No session context found. Will try to use fallback credentials.")
         
         # Validate email format
         if not to_email or '@' not in to_email:
             return "Email sending failed: Invalid recipient email address."
         
-        # Get Gmail service
-        service = get_gmail_service(room_name)
+        # Get Gmail credentials
+        creds = await run_blocking(get_gmail_credentials, session)
         
-        if not service:
+        if not creds:
             return "Email sending failed: Gmail not connected. Please connect your Gmail account in settings."
         
         # Get sender email from user's profile (from credentials)
         # For now, we'll use 'me' which refers to the authenticated user
         sender = 'me'
         
-        # Create and send message
+        # Create the message and hand it to the outbox; failures are reported back later
         message_obj = create_message(sender, to_email, subject, message, cc_email)
-        result = send_message(service, sender, message_obj)
+        # Keyed per tool call: a redelivered call is sent once, "send that again" sends again
+        email_id = idempotency_key(
+            session.room_name if session else None, tool_call_id(context), to_email, cc_email, subject, message
+        )
+        queued = await email_outbox.enqueue(OutgoingEmail(
+            id=email_id,
+            user_id=session.user_id if session else None,
+            to=to_email,
+            subject=subject,
+            message=message_obj,
+            credentials=creds,
+            session=session
+        ))
+        
+        if not queued:
+            return f"That email to {to_email} has already been sent or queued, Sir."
         
-        logging.info(f"Email sent successfully to {to_email}")
-        return f"Email sent successfully to {to_email}, Sir."
+        # Remember the address so "email them again" resolves next time
+        await run_blocking(record_contacts, session.user_id if session else None, [(to_email, None)])
+        
+        logging.info(f"Email to {to_email} queued for sending")
+        return f"Email to {to_email} is on its way, Sir."
         
     except HttpError as error:
         error_msg = f"Gmail API error: {error}"
@@ -238,4 +300,166 @@ async def send_email(
         print(f"📧 ERROR: {error_msg}")
         import traceback
         traceback.print_exc()
-        return error_msg
\ No newline at end of file
+        return error_msg
+
+@function_tool()
+async def send_bulk_email(
+    context: RunContext,  # type: ignore
+    recipients: list[str],
+    subject: str,
+    message: str,
+    cc_email: Optional[str] = None
+) -> str:
+    """
+    JARVIS Bulk Email System. Send one email to many recipients in a single call.
+    
+    Use this instead of calling send_email repeatedly whenever the same message
+    goes to two or more people ("send this update to the whole team").
+    
+    Args:
+        recipients: One entry per recipient, either "email" or "email | field=value | ...",
+            e.g. ["john@example.com | name=John", "jane@example.com | name=Jane"]
+        subject: Subject line; {field} placeholders are filled per recipient
+        message: Email body; {field} placeholders are filled per recipient, e.g. "Hi {name}, ..."
+        cc_email: Optional carbon copy recipient on every email
+    
+    Returns how many emails were queued and which recipients were skipped.
+    """
+    try:
+        logging.info(f"send_bulk_email function called: {len(recipients)} recipients, subject='{subject}'")
+        print(f"📧 BULK EMAIL TOOL CALLED: Sending to {len(recipients)} recipients")
+        
+        session = get_session_context(context)
+        
+        if not recipients:
+            return "Bulk email failed: No recipients given."
+        
+        creds = await run_blocking(get_gmail_credentials, session)
+        
+        if not creds:
+            return "Email sending failed: Gmail not connected. Please connect your Gmail account in settings."
+        
+        sender = 'me'
+        is_template = bool(TEMPLATE_FIELD.search(subject) or TEMPLATE_FIELD.search(message))
+        # Without placeholders every recipient gets the same body, so it's built once
+        shared_body = None if is_template else MIMEText(message, 'plain')
+        
+        call_id = tool_call_id(context)
+        outgoing = []
+        skipped = []
+        names = {}  # recipient -> name field, for the contact index
+        seen = set()
+        for entry in recipients:
+            try:
+                to_email, fields = parse_recipient(entry)
+                if '@' not in to_email:
+                    raise ValueError("invalid email address")
+                if to_email.lower() in seen:
+                    continue
+                seen.add(to_email.lower())
+                names[to_email] = fields.get('name')
+                
+                if is_template:
+                    email_subject = render_template(subject, fields)
+                    email_text = render_template(message, fields)
+                    body = MIMEText(email_text, 'plain')
+                else:
+                    email_subject, email_text, body = subject, message, shared_body
+            except KeyError as e:
+                skipped.append(f"{entry.split('|')[0].strip()} (missing field {e})")
+                continue
+            except ValueError as e:
+                skipped.append(f"{entry.split('|')[0].strip()} ({e})")
+                continue
+            
+            email_id = idempotency_key(
+                session.room_name if session else None, call_id, to_email, cc_email, email_subject, email_text
+            )
+            outgoing.append(OutgoingEmail(
+                id=email_id,
+                user_id=session.user_id if session else None,
+                to=to_email,
+                subject=email_subject,
+                message=_build_message(sender, to_email, email_subject, body, cc_email),
+                credentials=creds,
+                session=session
+            ))
+        
+        # One transaction for every recipient, queued together so they go out as one batch request
+        new_emails = await email_outbox.enqueue_many(outgoing)
+        new_ids = {email.id for email in new_emails}
+        queued = [email.to for email in new_emails]
+        skipped.extend(f"{email.to} (already sent)" for email in outgoing if email.id not in new_ids)
+        
+        await run_blocking(
+            record_contacts,
+            session.user_id if session else None,
+            [(to_email, names.get(to_email)) for to_email in queued]
+        )
+        
+        print(f"📧 Queued {len(queued)} bulk emails, skipped {len(skipped)}")
+        result = f"Queued {len(queued)} of {len(recipients)} emails for sending, Sir."
+        if skipped:
+            result += f" Skipped: {', '.join(skipped)}."
+        return result
+        
+    except Exception as e:
+        error_msg = f"An error occurred while sending bulk email: {str(e)}"
+        logging.error(error_msg)
+        print(f"📧 ERROR: {error_msg}")
+        import traceback
+        traceback.print_exc()
+        return error_msg
+
+@function_tool()
+async def resolve_contact(
+    context: RunContext,  # type: ignore
+    name: str
+) -> str:
+    """
+    Look up a person's email address by name from the user's contacts.
+    
+    Use this BEFORE asking the user to spell an email address: whenever they
+    name a recipient ("email John", "send it to Sarah from marketing") call
+    this with the name and use the returned address.
+    
+    Args:
+        name: The person's name or part of it, as the user said it (e.g. "John", "Sarah Lee")
+    
+    Returns the best matching contacts with their email addresses.
+    """
+    try:
+        logging.info(f"resolve_contact function called: name='{name}'")
+        print(f"📇 CONTACT LOOKUP: {name}")
+        
+        session = get_session_context(context)
+        user_id = session.user_id if session else None
+        index = await run_blocking(get_contact_index, user_id)
+        
+        if not len(index) and session is not None:
+            # Nothing seen yet for this user: sync the calendar once to learn its attendees
+            try:
+                manager = await run_blocking(get_calendar_manager, session)
+                await run_blocking(get_calendar_store, manager)
+            except Exception as e:
+                logging.warning(f"Could not load contacts from the calendar: {e}")
+        
+        matches = index.search(name)
+        if not matches:
+            return f"No contact found matching '{name}', Sir. Ask the user for the email address."
+        
+        def describe(email, display):
+            return f"{display.title()} <{email}>" if display else email
+        
+        best_email, best_display, best_score = matches[0]
+        if len(matches) == 1 or best_score - matches[1][2] >= 0.1:
+            return f"Found {describe(best_email, best_display)}, Sir."
+        
+        options = "; ".join(describe(email, display) for email, display, _ in matches)
+        return f"Several contacts match '{name}', Sir: {options}. Ask the user which one they mean."
+        
+    except Exception as e:
+        error_msg = f"An error occurred while looking up the contact: {str(e)}"
+        logging.error(error_msg)
+        print(f"📇 ERROR: {error_msg}")
+        return error_msg
@@ -0,0 +1,28 @@
+# tools/executor.py
+"""Bounded executor for blocking tool I/O"""
+import asyncio
+import contextvars
+import functools
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# Google API and Supabase calls are blocking; running them here keeps the
+# worker's event loop (and audio) flowing while a request is in flight
+TOOL_IO_WORKERS = int(os.getenv("TOOL_IO_WORKERS", "8"))
+
+_executor = ThreadPoolExecutor(
+    max_workers=TOOL_IO_WORKERS,
+    thread_name_prefix="tool-io"
+)
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a blocking function on the tool executor, keeping the session context"""
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    call = functools.partial(ctx.run, func, *args, **kwargs)
+    return await loop.run_in_executor(_executor, call)
+
+def run_in_background(func, *args, **kwargs) -> Future:
+    """Start a blocking function on the tool executor without waiting for it, keeping the session context"""
+    ctx = contextvars.copy_context()
+    return _executor.submit(ctx.run, func, *args, **kwargs)
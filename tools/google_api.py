@@ -0,0 +1,144 @@
+# tools/google_api.py
+"""Shared Google API helpers for tools"""
+import json
+import logging
+import threading
+from collections import OrderedDict
+import httplib2
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+
+# APIs used by the calendar and email tools
+DISCOVERY_APIS = (
+    ('calendar', 'v3'),
+    ('gmail', 'v1'),
+)
+
+# Parsed discovery documents keyed by (api_name, version)
+_discovery_documents = {}
+
+# Service objects keyed by (api_name, version), shared by every user. They are
+# built without credentials; each request is executed on an authorized transport.
+_services = {}
+_services_lock = threading.Lock()
+
+# Google recommends at most 50 calls per batch request
+BATCH_LIMIT = 50
+
+# Authorized transports each thread keeps around for recently used credentials
+AUTHORIZED_HTTP_POOL_SIZE = 32
+
+# httplib2.Http is not thread-safe, so each executor thread gets its own
+# connection plus its pool of authorized wrappers around it
+_thread_local = threading.local()
+
+def get_discovery_document(api_name: str, version: str) -> dict:
+    """Get the parsed discovery document for an API (loaded once per process)"""
+    key = (api_name, version)
+    document = _discovery_documents.get(key)
+    
+    if document is None:
+        # Discovery documents ship with google-api-python-client, no network needed
+        content = get_static_doc(api_name, version)
+        if content is None:
+            raise Exception(f"No discovery document available for {api_name} {version}")
+        document = json.loads(content)
+        _discovery_documents[key] = document
+    
+    return document
+
+def load_discovery_documents() -> dict:
+    """Load every discovery document the tools need (used when prewarming)"""
+    for api_name, version in DISCOVERY_APIS:
+        get_discovery_document(api_name, version)
+    logging.info(f"Loaded {len(_discovery_documents)} Google API discovery documents")
+    return dict(_discovery_documents)
+
+def build_service(api_name: str, version: str):
+    """Get the shared service object for an API, building it once per process.
+    
+    The service carries no credentials: pass them to execute()/execute_batch()
+    so the same service object can serve every user.
+    """
+    key = (api_name, version)
+    service = _services.get(key)
+    
+    if service is None:
+        with _services_lock:
+            service = _services.get(key)
+            if service is None:
+                # Placeholder transport; requests are never executed on it
+                service = build_from_document(
+                    get_discovery_document(api_name, version),
+                    http=httplib2.Http()
+                )
+                _services[key] = service
+    
+    return service
+
+def load_services() -> dict:
+    """Build every service the tools need (used when prewarming)"""
+    services = {key: build_service(*key) for key in DISCOVERY_APIS}
+    logging.info(f"Built {len(services)} shared Google API services")
+    return services
+
+def get_thread_http() -> httplib2.Http:
+    """Get the calling thread's own HTTP connection"""
+    http = getattr(_thread_local, 'http', None)
+    if http is None:
+        http = httplib2.Http()
+        _thread_local.http = http
+        # Authorized wrappers around this connection, keyed by id(credentials)
+        _thread_local.authorized = OrderedDict()
+    return http
+
+def get_authorized_http(credentials) -> AuthorizedHttp:
+    """Get this thread's authorized transport for a set of credentials"""
+    http = get_thread_http()
+    pool = _thread_local.authorized
+    key = id(credentials)
+    
+    authorized = pool.get(key)
+    # An id can be reused once its credentials are gone, so check it's the same object
+    if authorized is None or authorized.credentials is not credentials:
+        authorized = AuthorizedHttp(credentials, http=http)
+        pool[key] = authorized
+        if len(pool) > AUTHORIZED_HTTP_POOL_SIZE:
+            pool.popitem(last=False)
+    else:
+        pool.move_to_end(key)
+    return authorized
+
+def _authorized_http(request, credentials=None):
+    """Pick the transport to execute a request on"""
+    if credentials is None:
+        # Fall back to the credentials the request was built with, if any
+        credentials = getattr(request.http, 'credentials', None)
+    
+    if credentials is None:
+        return get_thread_http()
+    return get_authorized_http(credentials)
+
+def execute(request, credentials=None):
+    """Execute an API request on the calling thread's own HTTP connection"""
+    return request.execute(http=_authorized_http(request, credentials))
+
+def execute_batch(service, requests: list, credentials=None, batch_size: int = BATCH_LIMIT) -> list:
+    """Execute requests as multipart batches, one HTTP round trip per batch_size requests.
+    
+    Returns a (response, error) tuple per request, in request order.
+    """
+    results = [(None, None)] * len(requests)
+    
+    def callback(request_id, response, exception):
+        results[int(request_id)] = (response, exception)
+    
+    for offset in range(0, len(requests), batch_size):
+        chunk = requests[offset:offset + batch_size]
+        batch = service.new_batch_http_request(callback=callback)
+        for i, request in enumerate(chunk, offset):
+            batch.add(request, request_id=str(i))
+        batch.execute(http=_authorized_http(chunk[0], credentials))
+    
+    return results
@@ -1,16 +1,22 @@
 import os
 import logging
-import json
 from datetime import datetime, timedelta
-from typing import Optional, Union
+from typing import Optional, Tuple, Union
 from google.auth.transport.requests import Request
+from google.auth.exceptions import RefreshError
 from google.oauth2.credentials import Credentials
+from googleapiclient.errors import HttpError
 from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
 from livekit.agents import function_tool, RunContext
-from supabase import create_client
 from dotenv import load_dotenv
-from tools.room_context import get_current_room_name
+from tools.room_context import SessionContext, get_session_context
+from tools.supabase_client import credential_store
+from tools.google_api import build_service, execute, execute_batch
+from tools.executor import run_blocking
+from tools.date_parsing import parse_datetime_string, parse_duration_string, parse_date_range
+from tools.calendar_index import merge_intervals, free_slots
+from tools.calendar_store import CALENDAR_SYNC_FUTURE_DAYS, get_calendar_store, get_cached_calendar_store, fetch_events_between, query_events, parse_event_time
+from tools.cache import TTLCache
 from zoneinfo import ZoneInfo
 
 load_dotenv()
@@ -18,214 +24,32 @@ load_dotenv()
 # Calendar API scopes
 SCOPES = ['https://www.googleapis.com/auth/calendar']
 
-# Add at module level (after imports)
-_supabase_client_cache = None
+# The freebusy API accepts at most 50 calendars per query; longer lists are split
+FREEBUSY_MAX_ITEMS = 50
 
-def get_room_name_from_context(context):
-    """Helper function to get room name from multiple sources"""
-    room_name = None
-    
-    # Method 1: Get from global storage (most reliable)
-    try:
-        room_name = get_current_room_name()
-        if room_name:
-            print(f"🔍 DEBUG: Got room name from global storage: {room_name}")
-            return room_name
-    except:
-        pass
-    
-    # Method 2: Try to get from context
-    try:
-        if hasattr(context, 'room') and hasattr(context.room, 'name'):
-            room_name = context.room.name
-            print(f"🔍 DEBUG: Got room name from context.room.name: {room_name}")
-            return room_name
-        elif hasattr(context, 'room_name'):
-            room_name = context.room_name
-            print(f"🔍 DEBUG: Got room name from context.room_name: {room_name}")
-            return room_name
-    except Exception as e:
-        print(f"🔍 DEBUG: Error getting room name from context: {e}")
-    
-    return None
-
-def get_supabase_client():
-    """Get Supabase client for agent worker (singleton pattern)"""
-    global _supabase_client_cache
-    
-    if _supabase_client_cache is None:
-        supabase_url = os.getenv("SUPABASE_URL")
-        supabase_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
-        
-        if not supabase_url or not supabase_key:
-            raise Exception("Supabase credentials not found in environment")
-        
-        _supabase_client_cache = create_client(supabase_url, supabase_key)
-    
-    return _supabase_client_cache
-
-def get_user_id_from_room(room_name: str) -> str:
-    """Get user_id from room name"""
-    try:
-        print(f"🔍 DEBUG: Looking up user_id for room: {room_name}")
-        client = get_supabase_client()
-        response = client.table("rooms").select("user_id").eq("room_name", room_name).execute()
-        
-        if response.data and len(response.data) > 0:
-            user_id = response.data[0]["user_id"]
-            print(f"🔍 DEBUG: Found user_id: {user_id} for room: {room_name}")
-            return user_id
-        else:
-            print(f"⚠️ WARNING: No user found for room: {room_name}")
-            return None
-    except Exception as e:
-        logging.error(f"Error getting user from room: {e}")
-        print(f"🔍 DEBUG: Error in get_user_id_from_room: {e}")
-        import traceback
-        traceback.print_exc()
-        return None
-
-# Helper functions for parsing dates and durations
-def parse_datetime_string(date_str: str, user_timezone: str = 'UTC') -> datetime:
-    """Parse natural language date/time strings with proper timezone handling"""
-    from dateutil import parser
-    
-    # Get timezone object
-    try:
-        tz = ZoneInfo(user_timezone)
-    except:
-        # Fallback to UTC if timezone is invalid
-        tz = ZoneInfo('UTC')
-    
-    # Get current time in user's timezone as reference
-    now = datetime.now(tz)
-    
-    # Normalize the date string for better parsing
-    date_str_lower = date_str.lower().strip()
-    
-    try:
-        # Handle relative dates explicitly
-        if 'tomorrow' in date_str_lower:
-            # Extract time if present
-            if any(time_word in date_str_lower for time_word in ['am', 'pm', ':', 'at']):
-                # Parse the time part (remove "tomorrow" and parse time)
-                time_part = date_str_lower.replace('tomorrow', '').strip()
-                # Use tomorrow as the default date
-                tomorrow = now + timedelta(days=1)
-                parsed = parser.parse(time_part, default=tomorrow)
-            else:
-                # Default to 9am tomorrow if no time specified
-                tomorrow = now + timedelta(days=1)
-                parsed = tomorrow.replace(hour=9, minute=0, second=0, microsecond=0)
-        elif 'today' in date_str_lower:
-            # Extract time if present
-            if any(time_word in date_str_lower for time_word in ['am', 'pm', ':', 'at']):
-                time_part = date_str_lower.replace('today', '').strip()
-                parsed = parser.parse(time_part, default=now)
-            else:
-                # Default to 1 hour from now if no time specified
-                parsed = now + timedelta(hours=1)
-        elif 'next week' in date_str_lower:
-            parsed = parser.parse(date_str_lower, default=now + timedelta(days=7))
-        elif 'next' in date_str_lower:
-            # Handle "next [day of week]" patterns like "next Tuesday", "next Monday"
-            days_of_week = {
-                'monday': 0, 'mon': 0,
-                'tuesday': 1, 'tue': 1, 'tues': 1,
-                'wednesday': 2, 'wed': 2,
-                'thursday': 3, 'thu': 3, 'thur': 3, 'thurs': 3,
-                'friday': 4, 'fri': 4,
-                'saturday': 5, 'sat': 5,
-                'sunday': 6, 'sun': 6
-            }
-            
-            # Find the day of week in the string
-            target_day = None
-            for day_name, day_num in days_of_week.items():
-                if day_name in date_str_lower:
-                    target_day = day_num
-                    break
-            
-            if target_day is not None:
-                # Calculate days until next occurrence of that day
-                # Use date only (midnight) for calculation to avoid timezone issues
-                now_date_only = now.replace(hour=0, minute=0, second=0, microsecond=0)
-                current_day = now_date_only.weekday()  # Monday = 0, Sunday = 6
-                days_ahead = target_day - current_day
-                
-                # If the day has already passed this week OR it's today, get next week's occurrence
-                if days_ahead <= 0:
-                    days_ahead += 7
-                
-                # Calculate the target date (date only, no time)
-                target_date = now_date_only + timedelta(days=days_ahead)
-                
-                # Extract time if present
-                if any(time_word in date_str_lower for time_word in ['am', 'pm', ':', 'at']):
-                    # Try to parse time from the string
-                    time_part = date_str_lower.replace('next', '').strip()
-                    # Remove day name from time part
-                    for day_name in days_of_week.keys():
-                        time_part = time_part.replace(day_name, '').strip()
-                    
-                    if time_part:
-                        try:
-                            # Parse just the time part
-                            from dateutil import parser
-                            time_parsed = parser.parse(time_part, default=target_date)
-                            parsed = time_parsed
-                        except:
-                            # If time parsing fails, default to 9am
-                            parsed = target_date.replace(hour=9, minute=0, second=0, microsecond=0)
-                    else:
-                        parsed = target_date.replace(hour=9, minute=0, second=0, microsecond=0)
-                else:
-                    # Default to 9am if no time specified (but this will be reset to midnight in view function)
-                    parsed = target_date.replace(hour=9, minute=0, second=0, microsecond=0)
-            else:
-                # "next" without a day of week - use generic parser
-                parsed = parser.parse(date_str, default=now + timedelta(days=7))
-        else:
-            # Use dateutil parser with current time as default
-            parsed = parser.parse(date_str, default=now)
-        
-        # If parsed datetime is naive, make it timezone-aware
-        if parsed.tzinfo is None:
-            # Assume it's in the user's timezone
-            parsed = parsed.replace(tzinfo=tz)
-        else:
-            # Convert to user's timezone if it has a different timezone
-            parsed = parsed.astimezone(tz)
-        
-        return parsed
-        
-    except Exception as e:
-        logging.warning(f"Failed to parse date string '{date_str}': {e}")
-        # Fallback to 1 hour from now in user's timezone
-        return now + timedelta(hours=1)
+# Hours searched when a free-slot question names no time of day
+WORKING_HOURS = (9, 17)
+DAY_PARTS = {
+    'morning': (9, 12),
+    'afternoon': (12, 17),
+    'evening': (17, 21),
+}
 
-def parse_duration_string(duration_str: str) -> timedelta:
-    """Parse duration strings like '1 hour', '30 minutes'"""
-    duration_str = duration_str.lower().strip()
-    
-    if 'hour' in duration_str or 'hr' in duration_str:
-        hours = float(''.join(filter(str.isdigit, duration_str.split()[0])))
-        return timedelta(hours=hours)
-    elif 'minute' in duration_str or 'min' in duration_str:
-        minutes = float(''.join(filter(str.isdigit, duration_str.split()[0])))
-        return timedelta(minutes=minutes)
-    else:
-        # Default to 1 hour
-        return timedelta(hours=1)
+# Authenticated managers keyed by user_id, shared by every session of that user
+_calendar_managers = TTLCache(
+    maxsize=int(os.getenv("CALENDAR_MANAGER_CACHE_SIZE", "256")),
+    ttl=float(os.getenv("CALENDAR_MANAGER_CACHE_TTL", "1800"))
+)
 
 class GoogleCalendarManager:
     """Manages Google Calendar operations"""
     
     def __init__(self, user_id: str = None):
         self.user_id = user_id
-        self.creds = None
+        self._fallback_creds = None  # token.json credentials in development
         self.service = None
         self.timezone = None  # Cache the user's timezone
+        self.calendar_ids = None  # Cache the user's calendars for free/busy queries
         self._authenticate()
         self._get_timezone()
     
@@ -234,61 +58,31 @@ class GoogleCalendarManager:
         try:
             print(f"🔍 DEBUG: Authenticating calendar manager for user_id: {self.user_id}")
             
-            # If user_id provided, get credentials from Supabase
+            # If user_id provided, check the shared credential store has credentials
             if self.user_id:
-                print(f"🔍 DEBUG: Fetching credentials from Supabase for user: {self.user_id}")
-                client = get_supabase_client()
-                response = client.table("calendar_credentials").select("*").eq(
-                    "user_id", self.user_id
-                ).execute()
-                
-                if response.data and len(response.data) > 0:
-                    print(f"🔍 DEBUG: Found credentials in Supabase")
-                    credentials_json = response.data[0]["credentials_json"]
-                    credentials_dict = json.loads(credentials_json)
-                    self.creds = Credentials.from_authorized_user_info(
-                        credentials_dict, SCOPES
-                    )
-                    
-                    # Refresh if expired and save back to database
-                    if self.creds.expired:
-                        print(f"🔍 DEBUG: Credentials expired, refreshing...")
-                        if self.creds.refresh_token:
-                            self.creds.refresh(Request())
-                            print(f"🔍 DEBUG: Credentials refreshed successfully")
-                            
-                            # Save refreshed credentials back to database
-                            refreshed_json = self.creds.to_json()
-                            client.table("calendar_credentials").update({
-                                "credentials_json": refreshed_json,
-                                "updated_at": "now()"
-                            }).eq("user_id", self.user_id).execute()
-                            print(f"🔍 DEBUG: Refreshed credentials saved to database")
-                        else:
-                            print(f"⚠️ WARNING: Credentials expired but no refresh token")
-                    
-                    self.service = build('calendar', 'v3', credentials=self.creds)
+                if credential_store.get(self.user_id, 'calendar', SCOPES) is not None:
+                    self.service = build_service('calendar', 'v3')
                     print(f"✅ Google Calendar API authenticated for user {self.user_id}")
                     return
-                else:
-                    print(f"⚠️ WARNING: No credentials found in Supabase for user: {self.user_id}")
+                print(f"⚠️ WARNING: No credentials found in Supabase for user: {self.user_id}")
             
             # Fallback to token.json for development
             if os.path.exists('token.json'):
                 print(f"🔍 DEBUG: Using fallback token.json")
-                self.creds = Credentials.from_authorized_user_file('token.json', SCOPES)
+                self._fallback_creds = Credentials.from_authorized_user_file('token.json', SCOPES)
             else:
                 print(f"⚠️ WARNING: token.json not found")
             
-            if not self.creds or not self.creds.valid:
-                if self.creds and self.creds.expired and self.creds.refresh_token:
+            creds = self._fallback_creds
+            if not creds or not creds.valid:
+                if creds and creds.expired and creds.refresh_token:
                     print(f"🔍 DEBUG: Refreshing expired credentials from token.json")
-                    self.creds.refresh(Request())
+                    creds.refresh(Request())
                 else:
                     raise Exception("No valid calendar credentials found")
             
             if not self.service:
-                self.service = build('calendar', 'v3', credentials=self.creds)
+                self.service = build_service('calendar', 'v3')
                 print("✅ Google Calendar API authenticated successfully!")
                 
         except Exception as e:
@@ -298,6 +92,28 @@ class GoogleCalendarManager:
             traceback.print_exc()
             raise
     
+    def get_credentials(self):
+        """Current credentials (blocking).
+        
+        Looked up in the shared store on every call rather than kept on the
+        manager, so an expired token is refreshed there (single-flight, written
+        back) instead of inline on a private copy.
+        """
+        if self._fallback_creds is not None:
+            return self._fallback_creds
+        creds = credential_store.get(self.user_id, 'calendar', SCOPES)
+        if creds is None:
+            raise Exception(f"No calendar credentials found for user: {self.user_id}")
+        return creds
+    
+    def execute(self, request):
+        """Execute a Calendar API request with the user's current credentials (blocking)"""
+        return execute(request, self.get_credentials())
+    
+    def execute_batch(self, requests: list) -> list:
+        """Execute Calendar API requests as batches with the user's current credentials (blocking)"""
+        return execute_batch(self.service, requests, self.get_credentials())
+    
     def _get_timezone(self):
         """Get user's timezone from Google Calendar settings"""
         try:
@@ -308,7 +124,7 @@ class GoogleCalendarManager:
                 return
             
             # Get calendar metadata which includes timezone
-            calendar = self.service.calendarList().get(calendarId='primary').execute()
+            calendar = self.execute(self.service.calendarList().get(calendarId='primary'))
             self.timezone = calendar.get('timeZone', 'UTC')
             print(f"🔍 DEBUG: Retrieved user timezone: {self.timezone}")
         except Exception as e:
@@ -316,20 +132,166 @@ class GoogleCalendarManager:
             # Fallback to UTC
             self.timezone = 'UTC'
             print(f"⚠️ WARNING: Using UTC as fallback timezone: {e}")
+    
+    def get_calendar_ids(self) -> list:
+        """Get the IDs of the calendars the user has selected (cached)"""
+        if self.calendar_ids is None:
+            try:
+                result = self.execute(self.service.calendarList().list(
+                    minAccessRole='freeBusyReader',
+                    fields='items(id,selected)'
+                ))
+                calendar_ids = [
+                    item['id'] for item in result.get('items', [])
+                    if item.get('selected')
+                ]
+            except Exception as e:
+                logging.warning(f"Could not list calendars, using primary only: {e}")
+                calendar_ids = []
+            self.calendar_ids = calendar_ids or ['primary']
+        return self.calendar_ids
+    
+    def query_free_busy(self, time_min: datetime, time_max: datetime, attendees: list = None) -> dict:
+        """Get busy intervals for the user's calendars and attendees.
+        
+        One freebusy query covers up to FREEBUSY_MAX_ITEMS calendars; beyond
+        that the queries go out together in one batch request. Calendars whose
+        query failed come back with 'errors', so they're never taken as free.
+        """
+        ids = list(dict.fromkeys(self.get_calendar_ids() + list(attendees or [])))
+        chunks = [ids[i:i + FREEBUSY_MAX_ITEMS] for i in range(0, len(ids), FREEBUSY_MAX_ITEMS)]
+        requests = [
+            self.service.freebusy().query(body={
+                'timeMin': time_min.astimezone(ZoneInfo('UTC')).isoformat().replace('+00:00', 'Z'),
+                'timeMax': time_max.astimezone(ZoneInfo('UTC')).isoformat().replace('+00:00', 'Z'),
+                'timeZone': self.timezone,
+                'items': [{'id': calendar_id} for calendar_id in chunk],
+            })
+            for chunk in chunks
+        ]
+        
+        if len(requests) == 1:
+            return self.execute(requests[0]).get('calendars', {})
+        
+        calendars = {}
+        for chunk, (response, error) in zip(chunks, self.execute_batch(requests)):
+            if error is not None:
+                logging.warning(f"Freebusy query for {len(chunk)} calendar(s) failed: {error}")
+                calendars.update({calendar_id: {'errors': [{'reason': str(error)}]} for calendar_id in chunk})
+            else:
+                calendars.update(response.get('calendars', {}))
+        return calendars
 
-# Global calendar manager instance
-calendar_manager = None
+def get_calendar_manager(session: Optional[SessionContext] = None):
+    """Get the cached calendar manager for the session's user, creating it on first use"""
+    user_id = session.user_id if session else None
+    
+    # Concurrent tool calls for the same user share a single construction
+    manager = _calendar_managers.get_or_create(
+        user_id,
+        lambda: GoogleCalendarManager(user_id=user_id)
+    )
+    
+    if session is not None:
+        session.calendar_manager = manager
+        session.timezone = manager.timezone
+    
+    return manager
+
+def invalidate_calendar_manager(user_id: Optional[str] = None):
+    """Drop a user's cached calendar manager (e.g. after their credentials change)"""
+    _calendar_managers.invalidate(user_id)
+    print(f"🔍 DEBUG: Invalidated cached calendar manager for user: {user_id}")
+
+async def start_calendar_sync(session: SessionContext):
+    """Start mirroring the session user's calendar so the first tool call doesn't wait on a full sync"""
+    try:
+        manager = await run_blocking(get_calendar_manager, session)
+        if manager.service:
+            await run_blocking(get_calendar_store, manager)
+    except Exception as e:
+        invalidate_on_auth_error(e, session)
+        logging.warning(f"Could not start calendar sync for user {session.user_id}: {e}")
+
+def invalidate_on_auth_error(error: Exception, session: Optional[SessionContext] = None):
+    """Drop the cached manager if the error shows its credentials stopped working"""
+    is_auth_error = isinstance(error, RefreshError) or (
+        isinstance(error, HttpError) and error.resp.status == 401
+    )
+    if is_auth_error:
+        user_id = session.user_id if session else None
+        invalidate_calendar_manager(user_id)
+        credential_store.invalidate(user_id, 'calendar')
+
+def describe_conflicts(store, start: datetime, duration: timedelta, timezone: str, exclude_id: str = None) -> str:
+    """Spoken warning about busy events overlapping a slot, with the next free slot"""
+    if not store.covers(start, start + duration):
+        # Beyond the mirror's window there's nothing to check against
+        return ""
+    conflicts = store.find_conflicts(start, start + duration, exclude_id=exclude_id)
+    if not conflicts:
+        return ""
+    
+    user_tz = ZoneInfo(timezone) if timezone else ZoneInfo('UTC')
+    names = ", ".join(f"'{event.get('summary', 'No Title')}'" for event in conflicts[:3])
+    note = f" Note that you already have {names} at that time."
+    
+    next_slot = store.next_free_slot(start, duration, exclude_id=exclude_id)
+    if next_slot:
+        note += f" The next free slot is {next_slot.astimezone(user_tz).strftime('%B %d at %I:%M %p')}."
+    
+    print(f"⚠️ WARNING: Slot {start} overlaps {len(conflicts)} event(s)")
+    return note
+
+def find_by_title(store, manager, title: str) -> list:
+    """Events within the usual search window whose title contains `title`, from the API while the mirror is still syncing (blocking)"""
+    user_tz = ZoneInfo(manager.timezone) if manager.timezone else ZoneInfo('UTC')
+    now = datetime.now(user_tz)
+    time_min = now - timedelta(days=7)  # Look back 7 days
+    time_max = now + timedelta(days=30)  # Look forward 30 days
+    if store.covers(time_min, time_max):
+        return store.find_by_title(title, time_min, time_max)
+    
+    title_lower = title.lower()
+    return [
+        event for event in fetch_events_between(manager, time_min, time_max)
+        if title_lower in event.get('summary', '').lower()
+    ]
+
+def find_cached_event(store, manager, identifier: str) -> Optional[dict]:
+    """Find an event in the local mirror by ID, or by title within the usual search window (blocking)"""
+    event = store.get(identifier.strip())
+    if event:
+        return event
+    
+    matches = find_by_title(store, manager, identifier.strip())
+    return matches[0] if matches else None
 
-def get_calendar_manager(room_name: str = None):
-    """Get or create calendar manager instance"""
-    user_id = None
+def reschedule_fields(event: dict, start: datetime, duration: Optional[timedelta], timezone: str) -> Tuple[dict, timedelta]:
+    """PATCH fields moving an event to a timed slot at start, and the slot's length.
     
-    # Try to get user_id from room if provided
-    if room_name:
-        user_id = get_user_id_from_room(room_name)
+    Without a duration the event keeps its length, except that an all-day event
+    becomes a timed event of the default hour.
+    """
+    if duration is None:
+        if 'date' in event['start']:
+            duration = timedelta(hours=1)
+        else:
+            user_tz = ZoneInfo(timezone) if timezone else ZoneInfo('UTC')
+            duration = parse_event_time(event['end'], user_tz) - parse_event_time(event['start'], user_tz)
+    end = start + duration
     
-    # Create manager with user_id (or None for fallback)
-    return GoogleCalendarManager(user_id=user_id)
+    # PATCH merges fields, so an all-day event's 'date' has to be cleared explicitly
+    return {
+        'start': {'date': None, 'dateTime': start.isoformat(), 'timeZone': timezone},
+        'end': {'date': None, 'dateTime': end.isoformat(), 'timeZone': timezone},
+    }, duration
+
+def describe_batch_failures(failures: list) -> str:
+    """Spoken summary of the items a bulk operation couldn't complete"""
+    if not failures:
+        return ""
+    return " Failed: " + "; ".join(f"'{name}' ({reason})" for name, reason in failures) + "."
 
 @function_tool()
 async def add_calendar_event_google(
@@ -368,28 +330,8 @@ async def add_calendar_event_google(
     try:
         # Parameters already have defaults, no conversion needed
         
-        # Try multiple ways to get room name
-        room_name = None
-        
-        # Method 1: Get from global storage (most reliable)
-        try:
-            room_name = get_current_room_name()
-            if room_name:
-                print(f"🔍 DEBUG: Got room name from global storage: {room_name}")
-        except:
-            pass
-        
-        # Method 2: Try to get from context
-        if not room_name:
-            try:
-                if hasattr(context, 'room') and hasattr(context.room, 'name'):
-                    room_name = context.room.name
-                    print(f"🔍 DEBUG: Got room name from context.room.name: {room_name}")
-                elif hasattr(context, 'room_name'):
-                    room_name = context.room_name
-                    print(f"🔍 DEBUG: Got room name from context.room_name: {room_name}")
-            except Exception as e:
-                print(f"🔍 DEBUG: Error getting room name from context: {e}")
+        session = get_session_context(context)
+        room_name = session.room_name if session else None
         
         if not room_name:
             print("⚠️ WARNING: Could not extract room name. Will try to use fallback credentials.")
@@ -398,8 +340,8 @@ async def add_calendar_event_google(
         print(f"🔍 DEBUG: Room name: {room_name}")
         logging.info(f"Adding Google Calendar event: {title} at {date_time}, room: {room_name}")
         
-        # Get calendar manager with room context
-        manager = get_calendar_manager(room_name)
+        # Get calendar manager for this session
+        manager = await run_blocking(get_calendar_manager, session)
         
         # Verify manager has service
         if not manager.service:
@@ -450,19 +392,27 @@ async def add_calendar_event_google(
             else:
                 print(f"🔍 DEBUG: No attendees to add (empty list after parsing)")
                 
+        # Check the local calendar mirror for clashes before inserting
+        store = await run_blocking(get_calendar_store, manager)
+        conflict_note = describe_conflicts(store, parsed_datetime, parsed_duration, manager.timezone)
+        
         # Insert event
         print("🔍 DEBUG: Attempting to insert event into Google Calendar...")
-        event_result = manager.service.events().insert(
+        event_result = await run_blocking(manager.execute, manager.service.events().insert(
             calendarId='primary',
             body=event,
             sendUpdates='all' if event.get('attendees') else 'none'  # Only send updates if we actually have attendees
-        ).execute()
+        ))
         
         print(f"📅 SUCCESS: Event created with ID {event_result['id']}")
         
-        return f"Event '{title}' scheduled successfully in Google Calendar for {parsed_datetime.strftime('%B %d, %Y at %I:%M %p')}, Sir. Duration: {duration}."
+        # Keep the local calendar mirror in step with our own writes
+        store.apply(event_result)
+        
+        return f"Event '{title}' scheduled successfully in Google Calendar for {parsed_datetime.strftime('%B %d, %Y at %I:%M %p')}, Sir. Duration: {duration}.{conflict_note}"
         
     except Exception as e:
+        invalidate_on_auth_error(e, get_session_context(context))
         error_msg = str(e)
         print(f"📅 ERROR: {error_msg}")
         print(f"🔍 DEBUG: Full error traceback:")
@@ -471,122 +421,6 @@ async def add_calendar_event_google(
         logging.error(f"Error adding Google Calendar event: {e}", exc_info=True)
         return f"Google Calendar operation failed: {error_msg}"
 
-
-    """
-    View events from Google Calendar.
-    
-    TRIGGER WORDS: show calendar, what's on schedule, check calendar, view events, what's today
-    
-    Args:
-        date: Date to view events for (e.g., "today", "tomorrow", "2024-01-15"). Defaults to today.
-        max_results: Maximum number of events to return (default: 10)
-    """
-    try:
-        # Get room name using helper function
-        room_name = get_room_name_from_context(context)
-        
-        if not room_name:
-            print("⚠️ WARNING: Could not extract room name. Will try to use fallback credentials.")
-        
-        print(f"📅 JARVIS GOOGLE CALENDAR: Viewing events")
-        logging.info(f"Viewing Google Calendar events for {date or 'today'}")
-        
-        manager = get_calendar_manager(room_name)
-        
-        # Get timezone for date parsing
-        user_tz = ZoneInfo(manager.timezone) if manager.timezone else ZoneInfo('UTC')
-        
-        # Parse date
-        if date:
-            target_date = parse_datetime_string(date, manager.timezone)
-            # For date queries, we only care about the date, not the time
-            # Reset to start of day in user's timezone
-            target_date = target_date.replace(hour=0, minute=0, second=0, microsecond=0)
-        else:
-            target_date = datetime.now(user_tz).replace(hour=0, minute=0, second=0, microsecond=0)
-        
-        # Determine if this is a date range query
-        is_range_query = False
-        date_lower = date.lower().strip() if date else ""
-        
-        # Check for range queries FIRST, before single day logic
-        if 'next week' in date_lower:
-            is_range_query = True
-            # Calculate next Monday
-            current_day = target_date.weekday()  # Use target_date, not now
-            days_ahead = 7 - current_day  # Monday is 0
-            if days_ahead == 0:  # If target date is Monday, go to next Monday
-                days_ahead = 7
-            time_min = target_date + timedelta(days=days_ahead)
-            time_max = time_min + timedelta(days=7)  # 7 days for a week
-            range_description = f"next week (starting {time_min.strftime('%B %d')})"
-        elif 'this week' in date_lower:
-            is_range_query = True
-            # Start from Monday of current week
-            days_back = target_date.weekday()
-            time_min = target_date - timedelta(days=days_back)
-            time_max = time_min + timedelta(days=7)  # 7 days for a week
-            range_description = f"this week (starting {time_min.strftime('%B %d')})"
-        else:
-            # Single day query - use the date we parsed (already reset to midnight)
-            time_min = target_date
-            time_max = time_min + timedelta(days=1)
-            range_description = target_date.strftime('%B %d, %Y')
-        
-        # Add debug logging
-        print(f"🔍 DEBUG: Query date: {date}, Parsed: {target_date}, Range: {time_min} to {time_max}")
-        
-        # Set time range for the day (in user's timezone)
-        time_min_utc = time_min.astimezone(ZoneInfo('UTC'))
-        time_max_utc = time_max.astimezone(ZoneInfo('UTC'))
-        
-        # Get events
-        events_result = manager.service.events().list(
-            calendarId='primary',
-            timeMin=time_min_utc.isoformat().replace('+00:00', 'Z'),
-            timeMax=time_max_utc.isoformat().replace('+00:00', 'Z'),
-            maxResults=max_results,
-            singleEvents=True,
-            orderBy='startTime'
-        ).execute()
-        
-        events = events_result.get('items', [])
-        
-        if not events:
-            if is_range_query:
-                return f"No events found for {range_description}, Sir."
-            else:
-                return f"No events found for {range_description}, Sir."
-        
-        # Format events
-        event_list = []
-        for event in events:
-            start = event['start'].get('dateTime', event['start'].get('date'))
-            if 'T' in start:
-                # Parse as datetime with timezone
-                if start.endswith('Z'):
-                    start_time = datetime.fromisoformat(start.replace('Z', '+00:00'))
-                else:
-                    start_time = datetime.fromisoformat(start)
-                # Convert to user's timezone for display
-                if start_time.tzinfo:
-                    start_time = start_time.astimezone(user_tz)
-                title = event.get('summary', 'No Title')
-                event_list.append(f"{start_time.strftime('%I:%M %p')} - {title}")
-            else:
-                # All-day event
-                title = event.get('summary', 'No Title')
-                event_list.append(f"All day - {title}")
-        
-        result = f"📅 Events for {target_date.strftime('%B %d, %Y')}, Sir:\n" + "\n".join(event_list)
-        print(f"📅 SUCCESS: Found {len(events)} events")
-        return result
-        
-    except Exception as e:
-        print(f"📅 ERROR: {e}")
-        logging.error(f"Error viewing Google Calendar events: {e}")
-        return f"Failed to retrieve calendar events: {str(e)}"
-
 @function_tool()
 async def view_calendar_events_google(
     context: RunContext,  # type: ignore
@@ -607,8 +441,8 @@ async def view_calendar_events_google(
         A string describing the events in natural language that should be spoken to the user.
     """
     try:
-        # Get room name using helper function
-        room_name = get_room_name_from_context(context)
+        session = get_session_context(context)
+        room_name = session.room_name if session else None
         
         if not room_name:
             print("⚠️ WARNING: Could not extract room name. Will try to use fallback credentials.")
@@ -616,7 +450,7 @@ async def view_calendar_events_google(
         print(f"📅 JARVIS GOOGLE CALENDAR: Viewing events")
         logging.info(f"Viewing Google Calendar events for {date or 'today'}")
         
-        manager = get_calendar_manager(room_name)
+        manager = await run_blocking(get_calendar_manager, session)
         
         # Verify manager has service (CRITICAL - was missing!)
         if not manager.service:
@@ -625,60 +459,25 @@ async def view_calendar_events_google(
         # Get timezone for date parsing
         user_tz = ZoneInfo(manager.timezone) if manager.timezone else ZoneInfo('UTC')
         
-        # Determine if this is a date range query
-        is_range_query = False
-        date_lower = date.lower().strip() if date else ""
+        # Resolve the day or week being asked about (midnight to midnight in user's timezone)
+        time_min, time_max, is_range_query = parse_date_range(date, manager.timezone)
+        target_date = time_min
         
-        if date:
-            target_date = parse_datetime_string(date, manager.timezone)
-            # For date queries, we only care about the date, not the time
-            # Reset to start of day in user's timezone
-            target_date = target_date.replace(hour=0, minute=0, second=0, microsecond=0)
+        if is_range_query:
+            week_label = "next week" if "next" in date.lower() else "this week"
+            if "weekend" in date.lower():
+                week_label = week_label.replace("week", "weekend")
+            range_description = f"{week_label} (starting {time_min.strftime('%B %d')})"
         else:
-            target_date = datetime.now(user_tz).replace(hour=0, minute=0, second=0, microsecond=0)
-        
-        # Check for range queries FIRST, before single day logic
-        if 'next week' in date_lower:
-            is_range_query = True
-            # Calculate next Monday
-            current_day = target_date.weekday()  # Use target_date, not now
-            days_ahead = 7 - current_day  # Monday is 0
-            if days_ahead == 0:  # If target date is Monday, go to next Monday
-                days_ahead = 7
-            time_min = target_date + timedelta(days=days_ahead)
-            time_max = time_min + timedelta(days=7)  # 7 days for a week
-            range_description = f"next week (starting {time_min.strftime('%B %d')})"
-        elif 'this week' in date_lower:
-            is_range_query = True
-            # Start from Monday of current week
-            days_back = target_date.weekday()
-            time_min = target_date - timedelta(days=days_back)
-            time_max = time_min + timedelta(days=7)  # 7 days for a week
-            range_description = f"this week (starting {time_min.strftime('%B %d')})"
-        else:
-            # Single day query - use the date we parsed (already reset to midnight)
-            time_min = target_date
-            time_max = time_min + timedelta(days=1)
             range_description = target_date.strftime('%B %d, %Y')
         
         # Add debug logging
         print(f"🔍 DEBUG: Query date: {date}, Parsed: {target_date}, Range: {time_min} to {time_max}")
         
-        # Convert to UTC for API call
-        time_min_utc = time_min.astimezone(ZoneInfo('UTC'))
-        time_max_utc = time_max.astimezone(ZoneInfo('UTC'))
-        
-        # Get events
-        events_result = manager.service.events().list(
-            calendarId='primary',
-            timeMin=time_min_utc.isoformat().replace('+00:00', 'Z'),
-            timeMax=time_max_utc.isoformat().replace('+00:00', 'Z'),
-            maxResults=max_results,
-            singleEvents=True,
-            orderBy='startTime'
-        ).execute()
-        
-        events = events_result.get('items', [])
+        # Serve the query from the local calendar mirror (synced if stale), or from
+        # the API for dates outside the mirror's window
+        store = await run_blocking(get_calendar_store, manager)
+        events = await run_blocking(query_events, store, manager, time_min, time_max, max_results)
         
         if not events:
             if is_range_query:
@@ -724,6 +523,7 @@ async def view_calendar_events_google(
         return result
         
     except Exception as e:
+        invalidate_on_auth_error(e, get_session_context(context))
         print(f"📅 ERROR: {e}")
         logging.error(f"Error viewing Google Calendar events: {e}")
         import traceback
@@ -746,7 +546,7 @@ async def update_calendar_event_google(
     TRIGGER WORDS: reschedule, move meeting, change appointment, update event
     
     Args:
-        event_id: The ID of the event to update
+        event_id: The ID or title of the event to update
         title: New event title (optional)
         date_time: New date and time (optional)
         duration: New duration (optional)
@@ -754,8 +554,8 @@ async def update_calendar_event_google(
         location: New location (optional)
     """
     try:
-        # Get room name using helper function (same as other calendar functions)
-        room_name = get_room_name_from_context(context)
+        session = get_session_context(context)
+        room_name = session.room_name if session else None
         
         if not room_name:
             print("⚠️ WARNING: Could not extract room name. Will try to use fallback credentials.")
@@ -763,47 +563,74 @@ async def update_calendar_event_google(
         print(f"📅 JARVIS GOOGLE CALENDAR: Updating event {event_id}")
         logging.info(f"Updating Google Calendar event: {event_id}")
         
-        manager = get_calendar_manager(room_name)
+        manager = await run_blocking(get_calendar_manager, session)
         
         # Verify manager has service
         if not manager.service:
             raise Exception("Calendar service not initialized. Check credentials.")
         
-        # Get existing event
-        event = manager.service.events().get(
-            calendarId='primary',
-            eventId=event_id
-        ).execute()
+        # Use the cached copy of the event when we have one; it carries the ETag
+        store = await run_blocking(get_calendar_store, manager)
+        event = await run_blocking(find_cached_event, store, manager, event_id)
+        if event is None:
+            event = await run_blocking(manager.execute, manager.service.events().get(
+                calendarId='primary',
+                eventId=event_id
+            ))
+        event_id = event['id']
         
-        # Update fields
+        # Only send the fields that change
+        changes = {}
         if title:
-            event['summary'] = title
+            changes['summary'] = title
         if description:
-            event['description'] = description
+            changes['description'] = description
         if location:
-            event['location'] = location
+            changes['location'] = location
+        conflict_note = ""
         if date_time:
             parsed_datetime = parse_datetime_string(date_time, manager.timezone)
-            event['start']['dateTime'] = parsed_datetime.isoformat()
-            event['start']['timeZone'] = manager.timezone
+            time_changes, parsed_duration = reschedule_fields(
+                event,
+                parsed_datetime,
+                parse_duration_string(duration) if duration else None,
+                manager.timezone
+            )
+            changes.update(time_changes)
             
-            if duration:
-                parsed_duration = parse_duration_string(duration)
-                end_time = parsed_datetime + parsed_duration
-                event['end']['dateTime'] = end_time.isoformat()
-                event['end']['timeZone'] = manager.timezone
-        
-        # Update event
-        updated_event = manager.service.events().update(
+            # Warn about clashes at the new time, ignoring the event itself
+            conflict_note = describe_conflicts(store, parsed_datetime, parsed_duration, manager.timezone, exclude_id=event_id)
+        
+        if not changes:
+            return "Nothing to change on that event, Sir."
+        
+        # PATCH the changed fields, failing if the event was edited since we read it
+        request = manager.service.events().patch(
             calendarId='primary',
             eventId=event_id,
-            body=event
-        ).execute()
+            body=changes
+        )
+        if event.get('etag'):
+            request.headers['If-Match'] = event['etag']
+        
+        try:
+            updated_event = await run_blocking(manager.execute, request)
+        except HttpError as e:
+            if e.resp.status != 412:
+                raise
+            # Someone else changed the event - refresh our copy rather than overwrite theirs
+            print(f"⚠️ WARNING: Event {event_id} changed since it was read, not overwriting")
+            if store.ready:
+                await run_blocking(store.sync, manager)
+            return "That event was changed elsewhere since I last looked, Sir. I've refreshed the calendar; shall I apply the change again?"
+        
+        store.apply(updated_event)
         
         print(f"📅 SUCCESS: Event updated")
-        return f"Event updated successfully, Sir."
+        return f"Event updated successfully, Sir.{conflict_note}"
         
     except Exception as e:
+        invalidate_on_auth_error(e, get_session_context(context))
         print(f"📅 ERROR: {e}")
         logging.error(f"Error updating Google Calendar event: {e}")
         return f"Failed to update event: {str(e)}"
@@ -824,13 +651,13 @@ async def delete_calendar_event_google(
         event_title: The title/name of the event to delete. Used if event_id is not provided or looks like a title.
     """
     try:
-        # Get room name using helper function (same as other calendar functions)
-        room_name = get_room_name_from_context(context)
+        session = get_session_context(context)
+        room_name = session.room_name if session else None
         
         if not room_name:
             print("⚠️ WARNING: Could not extract room name. Will try to use fallback credentials.")
         
-        manager = get_calendar_manager(room_name)
+        manager = await run_blocking(get_calendar_manager, session)
         
         # Verify manager has service
         if not manager.service:
@@ -857,35 +684,9 @@ async def delete_calendar_event_google(
             print(f"📅 JARVIS GOOGLE CALENDAR: Searching for event with title '{search_title}'")
             logging.info(f"Searching for event to delete: {search_title}")
             
-            # Get timezone for date parsing
-            user_tz = ZoneInfo(manager.timezone) if manager.timezone else ZoneInfo('UTC')
-            
-            # Search for events in the next 30 days (reasonable window for finding events)
-            now = datetime.now(user_tz)
-            time_min = now - timedelta(days=7)  # Look back 7 days
-            time_max = now + timedelta(days=30)  # Look forward 30 days
-            
-            time_min_utc = time_min.astimezone(ZoneInfo('UTC'))
-            time_max_utc = time_max.astimezone(ZoneInfo('UTC'))
-            
-            # Search for events matching the title
-            events_result = manager.service.events().list(
-                calendarId='primary',
-                timeMin=time_min_utc.isoformat().replace('+00:00', 'Z'),
-                timeMax=time_max_utc.isoformat().replace('+00:00', 'Z'),
-                maxResults=50,
-                singleEvents=True,
-                orderBy='startTime',
-                q=search_title  # Search query for title
-            ).execute()
-            
-            events = events_result.get('items', [])
-            
-            # Filter events that match the title (case-insensitive partial match)
-            matching_events = [
-                event for event in events
-                if search_title.lower() in event.get('summary', '').lower()
-            ]
+            # Search the local calendar mirror (or the API while it syncs) for events matching the title
+            store = await run_blocking(get_calendar_store, manager)
+            matching_events = await run_blocking(find_by_title, store, manager, search_title)
             
             if not matching_events:
                 return f"No event found with title '{search_title}', Sir. Please check the event name and try again."
@@ -910,16 +711,21 @@ async def delete_calendar_event_google(
         
         # Delete the event
         logging.info(f"Deleting Google Calendar event: {actual_event_id}")
-        manager.service.events().delete(
+        await run_blocking(manager.execute, manager.service.events().delete(
             calendarId='primary',
             eventId=actual_event_id
-        ).execute()
+        ))
+        
+        store = get_cached_calendar_store(manager.user_id)
+        if store:
+            store.remove(actual_event_id)
         
         event_name = search_title if search_title else actual_event_id
         print(f"📅 SUCCESS: Event deleted")
         return f"Event '{event_name}' deleted successfully, Sir."
         
     except Exception as e:
+        invalidate_on_auth_error(e, get_session_context(context))
         error_msg = str(e)
         print(f"📅 ERROR: {error_msg}")
         logging.error(f"Error deleting Google Calendar event: {e}")
@@ -945,8 +751,8 @@ async def list_all_events_google(
         max_results: Maximum number of events to return (default: 50)
     """
     try:
-        # Get room name using helper function (same as other calendar functions)
-        room_name = get_room_name_from_context(context)
+        session = get_session_context(context)
+        room_name = session.room_name if session else None
         
         if not room_name:
             print("⚠️ WARNING: Could not extract room name. Will try to use fallback credentials.")
@@ -954,7 +760,7 @@ async def list_all_events_google(
         print(f"📅 JARVIS GOOGLE CALENDAR: Listing all events")
         logging.info(f"Listing all Google Calendar events")
         
-        manager = get_calendar_manager(room_name)
+        manager = await run_blocking(get_calendar_manager, session)
         
         # Verify manager has service
         if not manager.service:
@@ -963,19 +769,16 @@ async def list_all_events_google(
         # Get timezone for date parsing
         user_tz = ZoneInfo(manager.timezone) if manager.timezone else ZoneInfo('UTC')
         
-        # Get events from now onwards (in user's timezone, then convert to UTC)
+        # Get events from now onwards from the local calendar mirror
         now = datetime.now(user_tz)
-        now_utc = now.astimezone(ZoneInfo('UTC'))
-        
-        events_result = manager.service.events().list(
-            calendarId='primary',
-            timeMin=now_utc.isoformat().replace('+00:00', 'Z'),
-            maxResults=max_results,
-            singleEvents=True,
-            orderBy='startTime'
-        ).execute()
-        
-        events = events_result.get('items', [])
+        store = await run_blocking(get_calendar_store, manager)
+        if store.ready:
+            events = store.events_between(now)[:max_results]
+        else:
+            # Still syncing: ask the API for the mirror's forward window instead
+            events = await run_blocking(
+                fetch_events_between, manager, now, now + timedelta(days=CALENDAR_SYNC_FUTURE_DAYS), max_results
+            )
         
         if not events:
             return "No upcoming events found, Sir."
@@ -1005,6 +808,371 @@ async def list_all_events_google(
         return result
         
     except Exception as e:
+        invalidate_on_auth_error(e, get_session_context(context))
         print(f"📅 ERROR: {e}")
         logging.error(f"Error listing Google Calendar events: {e}")
-        return f"Failed to list events: {str(e)}"
\ No newline at end of file
+        return f"Failed to list events: {str(e)}"
+
+@function_tool()
+async def find_free_slots_google(
+    context: RunContext,  # type: ignore
+    date: str = "today",
+    duration: str = "30 minutes",
+    attendees: str = "",
+    max_slots: int = 3
+) -> str:
+    """
+    Find free time slots in Google Calendar, optionally shared with other attendees.
+    
+    TRIGGER WORDS: when am I free, find a slot, find time with, free time, availability, when can I meet
+    
+    Args:
+        date: Day or range to search (e.g., "today", "Thursday afternoon", "tomorrow morning", "next week"). Defaults to today.
+        duration: Length of the slot needed (default: "30 minutes")
+        attendees: Comma-separated email addresses of people who must also be free (optional)
+        max_slots: Maximum number of slots to suggest (default: 3)
+    """
+    try:
+        session = get_session_context(context)
+        
+        print(f"📅 JARVIS GOOGLE CALENDAR: Finding free slots for {date}")
+        logging.info(f"Finding free slots: {date}, duration: {duration}, attendees: {attendees}")
+        
+        manager = await run_blocking(get_calendar_manager, session)
+        
+        if not manager.service:
+            raise Exception("Calendar service not initialized. Check credentials.")
+        
+        user_tz = ZoneInfo(manager.timezone) if manager.timezone else ZoneInfo('UTC')
+        now = datetime.now(user_tz)
+        date_lower = date.lower().strip() if date else "today"
+        slot_duration = parse_duration_string(duration)
+        
+        # Hours of the day to search
+        start_hour, end_hour = WORKING_HOURS
+        for part, hours in DAY_PARTS.items():
+            if part in date_lower:
+                start_hour, end_hour = hours
+                date_lower = date_lower.replace(part, '').strip()
+                break
+        
+        # Days to search, resolved the same way as when viewing the calendar
+        range_start, range_end, is_range_query = parse_date_range(date_lower or "today", manager.timezone, now)
+        days = []
+        day = range_start
+        while day < range_end:
+            days.append(day)
+            day += timedelta(days=1)
+        if is_range_query and 'weekend' not in date_lower:
+            # "this week" / "next week" means the working week
+            days = [day for day in days if day.weekday() < 5]
+        
+        # Search windows, skipping time that has already passed
+        windows = []
+        for day in days:
+            window_start = max(day.replace(hour=start_hour), now)
+            window_end = day.replace(hour=end_hour)
+            if window_end - window_start >= slot_duration:
+                windows.append((window_start, window_end))
+        
+        if not windows:
+            return f"There's no time left in that window for a {duration} slot, Sir."
+        
+        attendee_list = [email.strip() for email in attendees.split(',') if '@' in email] if attendees else []
+        
+        # One freebusy query covers every calendar and attendee
+        calendars = await run_blocking(
+            manager.query_free_busy, windows[0][0], windows[-1][1], attendee_list
+        )
+        
+        busy = []
+        unavailable = []
+        for calendar_id, info in calendars.items():
+            if info.get('errors'):
+                unavailable.append(calendar_id)
+                continue
+            for interval in info.get('busy', []):
+                busy.append((
+                    parse_event_time({'dateTime': interval['start']}, user_tz),
+                    parse_event_time({'dateTime': interval['end']}, user_tz),
+                ))
+        
+        merged = merge_intervals(busy)
+        slots = []
+        for window_start, window_end in windows:
+            slots.extend(free_slots(merged, window_start, window_end, slot_duration))
+            if len(slots) >= max_slots:
+                break
+        slots = slots[:max_slots]
+        
+        who = "you and " + ", ".join(attendee_list) if attendee_list else "you"
+        note = ""
+        if unavailable:
+            note = f" I couldn't see the calendar of {', '.join(unavailable)}, Sir."
+        
+        if not slots:
+            return f"I couldn't find a free {duration} slot for {who} in that window, Sir.{note}"
+        
+        slot_text = ", ".join(
+            f"{start.astimezone(user_tz).strftime('%A %B %d from %I:%M %p')} to {end.astimezone(user_tz).strftime('%I:%M %p')}"
+            for start, end in slots
+        )
+        print(f"📅 SUCCESS: Found {len(slots)} free slots")
+        return f"Free time for {who}, Sir: {slot_text}.{note}"
+        
+    except Exception as e:
+        invalidate_on_auth_error(e, get_session_context(context))
+        print(f"📅 ERROR: {e}")
+        logging.error(f"Error finding free slots: {e}")
+        return f"Failed to find free time: {str(e)}"
+
+
+@function_tool()
+async def add_calendar_events_bulk_google(
+    context: RunContext,  # type: ignore
+    events: list[str]
+) -> str:
+    """
+    Add several events to Google Calendar at once.
+    
+    TRIGGER WORDS: add these meetings, schedule these events, book all of these
+    
+    Args:
+        events: One entry per event formatted as "title | date_time | duration", e.g. "Standup | tomorrow 9am | 15 minutes". Duration is optional (default: 1 hour).
+    """
+    try:
+        session = get_session_context(context)
+        
+        print(f"📅 JARVIS GOOGLE CALENDAR: Adding {len(events)} events in bulk")
+        logging.info(f"Adding {len(events)} Google Calendar events in bulk")
+        
+        manager = await run_blocking(get_calendar_manager, session)
+        
+        if not manager.service:
+            raise Exception("Calendar service not initialized. Check credentials.")
+        
+        names = []
+        requests = []
+        failures = []
+        for entry in events:
+            parts = [part.strip() for part in entry.split('|')]
+            if len(parts) < 2 or not parts[0] or not parts[1]:
+                failures.append((entry, "expected 'title | date_time | duration'"))
+                continue
+            
+            title, date_time = parts[0], parts[1]
+            duration = parts[2] if len(parts) > 2 and parts[2] else "1 hour"
+            start = parse_datetime_string(date_time, manager.timezone)
+            end = start + parse_duration_string(duration)
+            
+            names.append(title)
+            requests.append(manager.service.events().insert(
+                calendarId='primary',
+                body={
+                    'summary': title,
+                    'start': {'dateTime': start.isoformat(), 'timeZone': manager.timezone},
+                    'end': {'dateTime': end.isoformat(), 'timeZone': manager.timezone},
+                },
+                sendUpdates='none'
+            ))
+        
+        # All inserts go out in a single batch round trip
+        results = await run_blocking(manager.execute_batch, requests) if requests else []
+        
+        store = get_cached_calendar_store(manager.user_id)
+        added = []
+        for name, (response, error) in zip(names, results):
+            if error is not None:
+                failures.append((name, str(error)))
+                continue
+            added.append(name)
+            if store:
+                store.apply(response)
+        
+        print(f"📅 SUCCESS: Added {len(added)} of {len(events)} events")
+        result = f"Added {len(added)} of {len(events)} events, Sir."
+        if added:
+            result += " Scheduled: " + ", ".join(f"'{name}'" for name in added) + "."
+        return result + describe_batch_failures(failures)
+        
+    except Exception as e:
+        invalidate_on_auth_error(e, get_session_context(context))
+        print(f"📅 ERROR: {e}")
+        logging.error(f"Error adding Google Calendar events in bulk: {e}")
+        return f"Failed to add events: {str(e)}"
+
+@function_tool()
+async def update_calendar_events_bulk_google(
+    context: RunContext,  # type: ignore
+    updates: list[str]
+) -> str:
+    """
+    Reschedule several Google Calendar events at once.
+    
+    TRIGGER WORDS: move all of these, reschedule these meetings, push these events
+    
+    Args:
+        updates: One entry per event formatted as "event title or ID | new date_time | new duration", e.g. "Standup | Friday 10am". Duration is optional (keeps the current length).
+    """
+    try:
+        session = get_session_context(context)
+        
+        print(f"📅 JARVIS GOOGLE CALENDAR: Updating {len(updates)} events in bulk")
+        logging.info(f"Updating {len(updates)} Google Calendar events in bulk")
+        
+        manager = await run_blocking(get_calendar_manager, session)
+        
+        if not manager.service:
+            raise Exception("Calendar service not initialized. Check credentials.")
+        
+        store = await run_blocking(get_calendar_store, manager)
+        
+        names = []
+        requests = []
+        failures = []
+        for entry in updates:
+            parts = [part.strip() for part in entry.split('|')]
+            if len(parts) < 2 or not parts[0] or not parts[1]:
+                failures.append((entry, "expected 'event | date_time | duration'"))
+                continue
+            
+            event = await run_blocking(find_cached_event, store, manager, parts[0])
+            if not event:
+                failures.append((parts[0], "not found"))
+                continue
+            
+            start = parse_datetime_string(parts[1], manager.timezone)
+            duration = parse_duration_string(parts[2]) if len(parts) > 2 and parts[2] else None
+            body, _ = reschedule_fields(event, start, duration, manager.timezone)
+            
+            # PATCH only the times rather than PUTting the whole event
+            request = manager.service.events().patch(
+                calendarId='primary',
+                eventId=event['id'],
+                body=body
+            )
+            if event.get('etag'):
+                request.headers['If-Match'] = event['etag']
+            names.append(event.get('summary', parts[0]))
+            requests.append(request)
+        
+        results = await run_blocking(manager.execute_batch, requests) if requests else []
+        
+        updated = []
+        for name, (response, error) in zip(names, results):
+            if error is not None:
+                failures.append((name, str(error)))
+                continue
+            updated.append(name)
+            store.apply(response)
+        
+        print(f"📅 SUCCESS: Updated {len(updated)} of {len(updates)} events")
+        result = f"Updated {len(updated)} of {len(updates)} events, Sir."
+        if updated:
+            result += " Moved: " + ", ".join(f"'{name}'" for name in updated) + "."
+        return result + describe_batch_failures(failures)
+        
+    except Exception as e:
+        invalidate_on_auth_error(e, get_session_context(context))
+        print(f"📅 ERROR: {e}")
+        logging.error(f"Error updating Google Calendar events in bulk: {e}")
+        return f"Failed to update events: {str(e)}"
+
+def starts_on_day(event: dict, day: datetime) -> bool:
+    """Whether an event belongs to a day when clearing it: it starts that day and
+    doesn't run on past it (events carried over from earlier days and multi-day
+    all-day events such as holidays don't count)"""
+    start, end = event['start'], event['end']
+    if 'date' in start:
+        # All-day events: exactly that one date (end dates are exclusive)
+        start_date = datetime.fromisoformat(start['date']).date()
+        end_date = datetime.fromisoformat(end['date']).date()
+        return start_date == day.date() and end_date - start_date == timedelta(days=1)
+    
+    start_time = parse_event_time(start, day.tzinfo)
+    end_time = parse_event_time(end, day.tzinfo)
+    return day <= start_time < day + timedelta(days=1) and end_time - start_time <= timedelta(days=1)
+
+@function_tool()
+async def delete_calendar_events_bulk_google(
+    context: RunContext,  # type: ignore
+    events: Optional[list[str]] = None,
+    date: Optional[str] = None
+) -> str:
+    """
+    Delete several Google Calendar events at once, or clear a whole day.
+    
+    TRIGGER WORDS: clear my day, cancel all of these, delete these meetings, clear my calendar for
+    
+    Args:
+        events: Titles or IDs of the events to delete (optional)
+        date: Delete every event on this day, e.g. "Friday", "tomorrow" (optional)
+    """
+    try:
+        session = get_session_context(context)
+        
+        if not events and not date:
+            return "Please tell me which events or which day to clear, Sir."
+        
+        print(f"📅 JARVIS GOOGLE CALENDAR: Deleting events in bulk (events={events}, date={date})")
+        logging.info(f"Deleting Google Calendar events in bulk: events={events}, date={date}")
+        
+        manager = await run_blocking(get_calendar_manager, session)
+        
+        if not manager.service:
+            raise Exception("Calendar service not initialized. Check credentials.")
+        
+        store = await run_blocking(get_calendar_store, manager)
+        
+        targets = {}
+        failures = []
+        kept = []
+        if date:
+            day = parse_datetime_string(date, manager.timezone).replace(hour=0, minute=0, second=0, microsecond=0)
+            day_events = await run_blocking(query_events, store, manager, day, day + timedelta(days=1))
+            for event in day_events:
+                if starts_on_day(event, day):
+                    targets[event['id']] = event.get('summary', 'No Title')
+                elif 'date' in event['start'] or parse_event_time(event['start'], day.tzinfo) >= day:
+                    # Multi-day events starting here (a holiday, a conference) aren't "that day's" events
+                    kept.append(event.get('summary', 'No Title'))
+        for identifier in events or []:
+            event = await run_blocking(find_cached_event, store, manager, identifier)
+            if event:
+                targets[event['id']] = event.get('summary', identifier)
+            else:
+                failures.append((identifier, "not found"))
+        
+        if not targets and not failures:
+            if kept:
+                return "Only multi-day events touch that day, Sir: " + ", ".join(f"'{name}'" for name in kept) + ". Delete them by name if you meant to."
+            return "There's nothing on the calendar to clear, Sir."
+        
+        event_ids = list(targets)
+        requests = [
+            manager.service.events().delete(calendarId='primary', eventId=event_id)
+            for event_id in event_ids
+        ]
+        results = await run_blocking(manager.execute_batch, requests) if requests else []
+        
+        deleted = []
+        for event_id, (response, error) in zip(event_ids, results):
+            if error is not None:
+                failures.append((targets[event_id], str(error)))
+                continue
+            deleted.append(targets[event_id])
+            store.remove(event_id)
+        
+        print(f"📅 SUCCESS: Deleted {len(deleted)} events")
+        result = f"Deleted {len(deleted)} events, Sir."
+        if deleted:
+            result += " Removed: " + ", ".join(f"'{name}'" for name in deleted) + "."
+        if kept:
+            result += " Kept multi-day events: " + ", ".join(f"'{name}'" for name in kept) + " (delete them by name if you meant to)."
+        return result + describe_batch_failures(failures)
+        
+    except Exception as e:
+        invalidate_on_auth_error(e, get_session_context(context))
+        print(f"📅 ERROR: {e}")
+        logging.error(f"Error deleting Google Calendar events in bulk: {e}")
+        return f"Failed to delete events: {str(e)}"
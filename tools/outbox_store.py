@@ -0,0 +1,202 @@
+# tools/outbox_store.py
+"""Durable, append-only email outbox in a local SQLite database (WAL mode)"""
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Iterable, List, Optional, Set, Tuple
+
+# Where the outbox lives; shared by every job process on this machine
+EMAIL_OUTBOX_PATH = os.getenv("EMAIL_OUTBOX_PATH", "email_outbox.db")
+
+# How long a process owns an email it claimed before another process may take it over (seconds)
+EMAIL_OUTBOX_CLAIM_LEASE = float(os.getenv("EMAIL_OUTBOX_CLAIM_LEASE", "300"))
+
+# How long finished emails are kept before compaction (seconds)
+EMAIL_OUTBOX_RETENTION = float(os.getenv("EMAIL_OUTBOX_RETENTION", str(7 * 24 * 60 * 60)))
+
+# Rows are only ever inserted: an email is pending until it has a result, and
+# owned by whichever process holds its latest unexpired claim
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id TEXT PRIMARY KEY,
+    user_id TEXT,
+    to_addr TEXT NOT NULL,
+    subject TEXT,
+    message TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS outbox_claims (
+    id TEXT NOT NULL,
+    owner TEXT NOT NULL,
+    claimed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS outbox_claims_by_id ON outbox_claims (id, claimed_at);
+CREATE TABLE IF NOT EXISTS outbox_results (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    error TEXT,
+    finished_at REAL NOT NULL
+);
+"""
+
+class OutboxStore:
+    """SQLite-backed outbox keyed by idempotency key.
+    
+    One connection per process, serialized by a lock; calls are blocking and
+    meant to run on the tool executor.
+    """
+    
+    def __init__(self, path: str = EMAIL_OUTBOX_PATH, claim_lease: float = EMAIL_OUTBOX_CLAIM_LEASE):
+        self.path = path
+        self.claim_lease = claim_lease
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._conn = None
+        self._lock = threading.Lock()
+    
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            # WAL lets senders commit while other processes append; NORMAL sync is
+            # still durable across process crashes
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+    
+    def append(self, email_id: str, user_id: Optional[str], to: str, subject: str, message: dict) -> bool:
+        """Add an email (claimed by this process); False if its idempotency key already exists"""
+        return email_id in self.append_many([(email_id, user_id, to, subject, message)])
+    
+    def append_many(self, emails: Iterable[Tuple[str, Optional[str], str, str, dict]]) -> Set[str]:
+        """Add (id, user_id, to, subject, message) emails in one transaction; returns the ids that were new"""
+        now = time.time()
+        inserted = set()
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for email_id, user_id, to, subject, message in emails:
+                    cursor = conn.execute(
+                        "INSERT OR IGNORE INTO outbox (id, user_id, to_addr, subject, message, created_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (email_id, user_id, to, subject, json.dumps(message), now)
+                    )
+                    if cursor.rowcount == 1:
+                        inserted.add(email_id)
+                conn.executemany(
+                    "INSERT INTO outbox_claims (id, owner, claimed_at) VALUES (?, ?, ?)",
+                    [(email_id, self.owner, now) for email_id in inserted]
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return inserted
+    
+    def claim_pending(self, limit: int = 500) -> List[sqlite3.Row]:
+        """Claim pending emails nobody else holds a live claim on, oldest first"""
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = conn.execute(
+                    "SELECT o.* FROM outbox o "
+                    "WHERE NOT EXISTS (SELECT 1 FROM outbox_results r WHERE r.id = o.id) "
+                    "AND NOT EXISTS (SELECT 1 FROM outbox_claims c WHERE c.id = o.id AND c.claimed_at > ?) "
+                    "ORDER BY o.created_at LIMIT ?",
+                    (now - self.claim_lease, limit)
+                ).fetchall()
+                conn.executemany(
+                    "INSERT INTO outbox_claims (id, owner, claimed_at) VALUES (?, ?, ?)",
+                    [(row['id'], self.owner, now) for row in rows]
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return rows
+    
+    def renew_claims(self, email_ids: Iterable[str]) -> Set[str]:
+        """Restart this process's lease on emails it's about to send; returns the ids it still owns.
+        
+        An email is lost to this process once another one has claimed it (our
+        lease ran out while it waited) or it already has a result.
+        """
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                owned = set()
+                for email_id in email_ids:
+                    latest = conn.execute(
+                        "SELECT owner FROM outbox_claims WHERE id = ? ORDER BY claimed_at DESC LIMIT 1",
+                        (email_id,)
+                    ).fetchone()
+                    finished = conn.execute("SELECT 1 FROM outbox_results WHERE id = ?", (email_id,)).fetchone()
+                    if latest is not None and latest['owner'] == self.owner and finished is None:
+                        owned.add(email_id)
+                conn.executemany(
+                    "INSERT INTO outbox_claims (id, owner, claimed_at) VALUES (?, ?, ?)",
+                    [(email_id, self.owner, now) for email_id in owned]
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return owned
+    
+    def record_results(self, results: Iterable[Tuple[str, str, Optional[str]]]):
+        """Record (id, status, error) outcomes in a single transaction"""
+        now = time.time()
+        rows = [(email_id, status, error, now) for email_id, status, error in results]
+        if not rows:
+            return
+        
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO outbox_results (id, status, error, finished_at) VALUES (?, ?, ?, ?)",
+                    rows
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+    
+    def compact(self, retention: float = EMAIL_OUTBOX_RETENTION) -> int:
+        """Delete emails that finished more than retention seconds ago"""
+        cutoff = time.time() - retention
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                finished = "SELECT id FROM outbox_results WHERE finished_at < ?"
+                deleted = conn.execute(f"DELETE FROM outbox WHERE id IN ({finished})", (cutoff,)).rowcount
+                conn.execute(f"DELETE FROM outbox_claims WHERE id IN ({finished})", (cutoff,))
+                conn.execute("DELETE FROM outbox_results WHERE finished_at < ?", (cutoff,))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        
+        if deleted:
+            logging.info(f"Compacted {deleted} finished email(s) from the outbox")
+        return deleted
+    
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -1,13 +1,92 @@
 # tools/room_context.py
-"""Shared room context for tools"""
+"""Per-session context shared by tools"""
+import contextvars
+import logging
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
+from tools.supabase_client import get_supabase_client
+from tools.cache import TTLCache
+from shared.room_identity import read_identity_metadata
 
-_current_room_name = None
+@dataclass
+class SessionContext:
+    """State for one agent session (one room), shared by every tool call in it"""
+    room_name: str
+    user_id: Optional[str] = None
+    timezone: Optional[str] = None
+    # Per-user Google handles, created on first use by the tools
+    calendar_manager: Any = None
+    # The AgentSession, so background work can speak up (e.g. a failed email)
+    agent_session: Any = None
 
-def set_current_room_name(room_name: str):
-    """Set the current room name"""
-    global _current_room_name
-    _current_room_name = room_name
+# Task-local so several sessions can share one worker process without cross-talk
+_session_context: contextvars.ContextVar = contextvars.ContextVar("session_context", default=None)
 
-def get_current_room_name():
-    """Get the current room name"""
-    return _current_room_name
\ No newline at end of file
+def set_session_context(session_ctx: SessionContext):
+    """Set the session context for the current task (and tasks it spawns)"""
+    return _session_context.set(session_ctx)
+
+def get_session_context(context=None) -> Optional[SessionContext]:
+    """Get the session context, preferring the userdata attached to the RunContext"""
+    if context is not None:
+        try:
+            userdata = context.userdata
+            if isinstance(userdata, SessionContext):
+                return userdata
+        except Exception:
+            # Session has no userdata attached
+            pass
+    
+    return _session_context.get()
+
+# Room -> user lookups from the rooms table; rooms never change owner
+_room_users = TTLCache(
+    maxsize=int(os.getenv("ROOM_USER_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("ROOM_USER_CACHE_TTL", "86400"))
+)
+
+def get_user_id_from_metadata(*metadata: str, room_name: str) -> Optional[str]:
+    """User id signed into room or participant metadata by the API server, if any"""
+    secret = os.getenv("LIVEKIT_API_SECRET", "")
+    for value in metadata:
+        user_id = read_identity_metadata(value, room_name, secret)
+        if user_id:
+            print(f"🔍 DEBUG: Found user_id: {user_id} in metadata for room: {room_name}")
+            return user_id
+    return None
+
+def get_user_id_from_room(room_name: str, max_age: Optional[float] = None) -> str:
+    """Get user_id from room name (fallback when the metadata carries none).
+    
+    With max_age, only a rooms row written in the last max_age seconds counts
+    and the cache is skipped; otherwise lookups are cached.
+    """
+    user_id = _room_users.get(room_name) if max_age is None else None
+    if user_id:
+        return user_id
+    
+    try:
+        print(f"🔍 DEBUG: Looking up user_id for room: {room_name}")
+        client = get_supabase_client()
+        query = client.table("rooms").select("user_id").eq("room_name", room_name)
+        if max_age is not None:
+            cutoff = datetime.now(timezone.utc) - timedelta(seconds=max_age)
+            query = query.gte("updated_at", cutoff.isoformat())
+        response = query.execute()
+        
+        if response.data and len(response.data) > 0:
+            user_id = response.data[0]["user_id"]
+            print(f"🔍 DEBUG: Found user_id: {user_id} for room: {room_name}")
+            _room_users.set(room_name, user_id)
+            return user_id
+        else:
+            print(f"⚠️ WARNING: No user found for room: {room_name}")
+            return None
+    except Exception as e:
+        logging.error(f"Error getting user from room: {e}")
+        print(f"🔍 DEBUG: Error in get_user_id_from_room: {e}")
+        import traceback
+        traceback.print_exc()
+        return None
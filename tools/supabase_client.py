@@ -0,0 +1,45 @@
+# tools/supabase_client.py
+"""Shared Supabase client for the agent worker"""
+import os
+from supabase import create_client
+from dotenv import load_dotenv
+from shared.credential_store import CredentialStore
+from shared.write_behind import WriteBehindQueue
+
+load_dotenv()
+
+_supabase_client_cache = None
+
+def get_supabase_client():
+    """Get Supabase client for agent worker (singleton pattern)"""
+    global _supabase_client_cache
+    
+    if _supabase_client_cache is None:
+        supabase_url = os.getenv("SUPABASE_URL")
+        supabase_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+        
+        if not supabase_url or not supabase_key:
+            raise Exception("Supabase credentials not found in environment")
+        
+        _supabase_client_cache = create_client(supabase_url, supabase_key)
+    
+    return _supabase_client_cache
+
+# Writes nothing in a tool call waits on (refreshed tokens), batched in the background
+# and drained when the job shuts down
+write_queue = WriteBehindQueue(
+    get_supabase_client,
+    flush_interval=float(os.getenv("WRITE_BEHIND_INTERVAL", "1")),
+    flush_size=int(os.getenv("WRITE_BEHIND_BATCH", "100"))
+)
+
+# Google credentials shared by the calendar and email tools, refreshed single-flight per user
+credential_store = CredentialStore(
+    get_supabase_client,
+    maxsize=int(os.getenv("CREDENTIAL_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("CREDENTIAL_CACHE_TTL", "1800")),
+    writes=write_queue,
+    # How stale a cached entry may be before it's checked against the row, so a
+    # re-auth or disconnect handled by the API server reaches this worker (seconds)
+    revalidate_interval=float(os.getenv("CREDENTIAL_REVALIDATE_INTERVAL", "30"))
+)
@@ -0,0 +1,156 @@
+# tools/token_refresher.py
+"""Refreshes active users' Google tokens before they expire, off the voice critical path"""
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional, Sequence
+from google.auth.exceptions import RefreshError
+from tools.supabase_client import credential_store
+from tools.executor import run_blocking
+from tools.google_calendar_tools import SCOPES as CALENDAR_SCOPES
+from tools.email_tools import SCOPES as GMAIL_SCOPES
+
+# Refresh access tokens this many seconds before they expire
+TOKEN_REFRESH_MARGIN = float(os.getenv("TOKEN_REFRESH_MARGIN", "300"))
+
+# Longest the refresher sleeps between checks (seconds)
+TOKEN_REFRESH_POLL_INTERVAL = float(os.getenv("TOKEN_REFRESH_POLL_INTERVAL", "300"))
+
+# How often to look again for credentials a user hasn't connected yet (seconds)
+TOKEN_MISSING_RECHECK = float(os.getenv("TOKEN_MISSING_RECHECK", "600"))
+
+# First retry delay after a failed refresh, doubled on each further failure (seconds)
+TOKEN_REFRESH_RETRY_INITIAL = float(os.getenv("TOKEN_REFRESH_RETRY_INITIAL", "15"))
+
+# Longest delay between refresh retries; kept well below the refresh margin (seconds)
+TOKEN_REFRESH_RETRY_MAX = float(os.getenv("TOKEN_REFRESH_RETRY_MAX", "60"))
+
+def is_permanent_failure(error: Exception) -> bool:
+    """Whether a refresh failed for good, e.g. invalid_grant after the user revoked access"""
+    return isinstance(error, RefreshError) and not getattr(error, 'retryable', False)
+
+class TokenRefresher:
+    """Background task keeping the credentials of users with live sessions fresh.
+    
+    Each (user, kind) is checked when its token is due for refresh, so tool
+    calls find a valid access token instead of paying for the OAuth round trip.
+    """
+    
+    def __init__(
+        self,
+        kinds: Dict[str, Sequence[str]],
+        margin: float = TOKEN_REFRESH_MARGIN,
+        poll_interval: float = TOKEN_REFRESH_POLL_INTERVAL
+    ):
+        self.kinds = kinds  # credential kind -> scopes
+        self.margin = margin
+        self.poll_interval = poll_interval
+        self._sessions = {}  # user_id -> number of live sessions
+        self._next_check = {}  # (user_id, kind) -> monotonic time of the next check
+        self._failures = {}  # (user_id, kind) -> consecutive failed refreshes
+        self._revoked = set()  # (user_id, kind) whose refresh token Google rejected
+        self._task = None
+        self._wake = None
+    
+    def track(self, user_id: Optional[str]):
+        """Keep a user's tokens fresh while they have a live session (call from the event loop)"""
+        if not user_id:
+            return
+        
+        self._sessions[user_id] = self._sessions.get(user_id, 0) + 1
+        if self._task is None or self._task.done():
+            self._wake = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run(), name="token-refresher")
+        self._wake.set()
+    
+    def untrack(self, user_id: Optional[str]):
+        """Stop refreshing for a session that ended"""
+        count = self._sessions.get(user_id, 0) - 1
+        if count > 0:
+            self._sessions[user_id] = count
+            return
+        
+        self._sessions.pop(user_id, None)
+        for key in [key for key in self._next_check if key[0] == user_id]:
+            del self._next_check[key]
+        for key in [key for key in self._failures if key[0] == user_id]:
+            del self._failures[key]
+        self._revoked = {key for key in self._revoked if key[0] != user_id}
+    
+    async def _run(self):
+        while self._sessions:
+            self._wake.clear()
+            await self._refresh_due()
+            
+            now = time.monotonic()
+            due = min(self._next_check.values(), default=now + self.poll_interval)
+            delay = min(max(due - now, 1.0), self.poll_interval)
+            try:
+                await asyncio.wait_for(self._wake.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+    
+    async def _refresh_due(self):
+        for user_id in list(self._sessions):
+            for kind, scopes in self.kinds.items():
+                key = (user_id, kind)
+                if key in self._revoked or self._next_check.get(key, 0) > time.monotonic():
+                    continue
+                
+                try:
+                    expiry = await run_blocking(
+                        credential_store.refresh_if_expiring, user_id, kind, scopes, self.margin
+                    )
+                except Exception as e:
+                    if user_id not in self._sessions:
+                        continue
+                    
+                    if is_permanent_failure(e):
+                        # Retrying can't help until the user reconnects
+                        self._revoked.add(key)
+                        self._next_check.pop(key, None)
+                        self._failures.pop(key, None)
+                        credential_store.invalidate(user_id, kind)
+                        logging.error(
+                            f"Stopped refreshing {kind} token for user {user_id}; "
+                            f"the integration needs to be reconnected: {e}"
+                        )
+                        continue
+                    
+                    # Retry soon: the token may expire before the next regular check
+                    failures = self._failures.get(key, 0) + 1
+                    self._failures[key] = failures
+                    retry_in = self._retry_delay(failures)
+                    self._next_check[key] = time.monotonic() + retry_in
+                    logging.warning(
+                        f"Background refresh of {kind} token for user {user_id} failed "
+                        f"(attempt {failures}), retrying in {retry_in:.0f}s: {e}"
+                    )
+                    continue
+                
+                if user_id not in self._sessions:
+                    # Session ended while we were refreshing
+                    continue
+                
+                self._failures.pop(key, None)
+                if expiry is None:
+                    # No credentials connected yet
+                    self._next_check[key] = time.monotonic() + TOKEN_MISSING_RECHECK
+                else:
+                    now = datetime.now(timezone.utc).replace(tzinfo=None)
+                    seconds_left = (expiry - now).total_seconds() - self.margin
+                    self._next_check[key] = time.monotonic() + max(seconds_left, 1.0)
+                    print(f"🔍 DEBUG: {kind} token for user {user_id} next refresh in {max(seconds_left, 0):.0f}s")
+    
+    def _retry_delay(self, failures: int) -> float:
+        """Exponential backoff for failed refreshes, capped so several retries fit in the margin"""
+        delay = TOKEN_REFRESH_RETRY_INITIAL * 2 ** min(failures - 1, 10)
+        return max(min(delay, TOKEN_REFRESH_RETRY_MAX, self.margin / 4), 1.0)
+
+# Shared by every session in this worker process
+token_refresher = TokenRefresher({
+    'calendar': CALENDAR_SCOPES,
+    'gmail': GMAIL_SCOPES,
+})